@@ -0,0 +1,405 @@
+# JunkArchive.py
+# Columnar archive of finished sales for historical price analytics. Each sale is written once, as a partition
+# of NumPy column files under ARCHIVE_DIR/house=<domain>/year=<yyyy>/, with a keyword index alongside. Queries
+# prune partitions by house and date range and memory-map only the columns they need, so multi-year questions
+# never load the archive into RAM. Lot text stays in SQLite; the archive holds prices, dates and codes.
+#   python JunkArchive.py export              archive every finished sale not archived yet
+#   python JunkArchive.py compact             merge each house/year into one partition
+#   python JunkArchive.py stats --keyword waterford --since 2023-01-01
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from glob import glob
+from JunkComparables import keywords
+from JunkCompare import house_from_url
+from JunkFilter import CATEGORY_RULES, get_prefilter, is_art_item
+from JunkModel import singular
+from JunkStore import BARGAIN, COMPLETED, DROPPED, FAILED, PENDING, connect
+
+ARCHIVE_DIR = "archive"
+PARTITION_NAME = re.compile(r"^(run-\d+|runs-\d+-\d+)(\.old)?$")
+HAMMER_WINDOW = 600        # seconds; a bid last refreshed this close to closing is taken as the hammer price
+MAX_KEYWORD_CHARS = 32
+STATUSES = [PENDING, BARGAIN, DROPPED, FAILED]
+CATEGORIES = list(dict.fromkeys([rule["name"] for rule in CATEGORY_RULES] + ["art", "other"]))
+COLUMN_TYPES = {
+    "bid": "float64",        # last bid seen; NaN when there was none
+    "hammer": "float64",     # NaN when the outcome is unknown, 0 when the lot closed unsold
+    "estimate": "float64",   # researched market value
+    "date": "float64",       # closing time, or scrape time when the site gives none (epoch seconds)
+    "category": "int8",      # index into the partition's "categories"
+    "status": "int8",        # index into the partition's "statuses"
+}
+
+ARCHIVABLE_RUNS = f'''
+    SELECT r.id FROM runs r
+    WHERE r.status = ? AND r.archived_at IS NULL AND NOT EXISTS (
+        SELECT 1 FROM lot_items l WHERE l.run_id = r.id AND (l.status = '{PENDING}' OR l.closes_at > ?)
+    )
+    ORDER BY r.id
+'''
+
+
+def lot_category(name, description=""):
+    matches = get_prefilter().matching_categories(name, description)
+    if matches:
+        return matches[0]
+    return "art" if is_art_item(name, description) else "other"
+
+def lot_keywords(name):
+    return {singular(word)[:MAX_KEYWORD_CHARS] for word in keywords(name)}
+
+def hammer_price(bid_value, closes_at, bid_updated_at, now=None):
+    if not closes_at or closes_at > (now or time.time()) or bid_updated_at is None:
+        return float("nan")
+    if bid_updated_at < closes_at - HAMMER_WINDOW:
+        return float("nan")
+    return bid_value or 0.0
+
+def year_of(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).year
+
+def parse_date(text):
+    return datetime.strptime(text, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp() if text else None
+
+
+# --- Writing ---
+
+def write_partition(path, records, meta):
+    # Written next to its final place and renamed in, so readers never see half a partition.
+    import numpy as np
+    temporary = path + ".tmp"
+    shutil.rmtree(temporary, ignore_errors=True)
+    os.makedirs(temporary)
+    for name, dtype in COLUMN_TYPES.items():
+        np.save(os.path.join(temporary, f"{name}.npy"), np.array([r[name] for r in records], dtype=dtype))
+    # Keyword index: sorted vocabulary; rows with keyword i are postings[offsets[i]:offsets[i + 1]].
+    index = defaultdict(list)
+    for row, record in enumerate(records):
+        for word in record["keywords"]:
+            index[word].append(row)
+    vocabulary = sorted(index)
+    save_index(temporary, np.array(vocabulary, dtype=f"<U{MAX_KEYWORD_CHARS}"),
+               np.cumsum([0] + [len(index[word]) for word in vocabulary], dtype=np.int64),
+               np.array([row for word in vocabulary for row in index[word]], dtype=np.int32))
+    dates = [r["date"] for r in records]
+    meta = dict(meta, rows=len(records), first=min(dates), last=max(dates), categories=CATEGORIES, statuses=STATUSES)
+    with open(os.path.join(temporary, "meta.json"), "w") as f:
+        json.dump(meta, f)
+    swap_in(temporary, path)
+
+def swap_in(temporary, path):
+    # Moves a finished partition into place. A directory cannot be renamed over a non-empty one, so an existing
+    # partition is first renamed aside; if that is interrupted, partition_paths reads the old copy.
+    old = path + ".old"
+    shutil.rmtree(old, ignore_errors=True)
+    if os.path.exists(path):
+        os.replace(path, old)
+    os.replace(temporary, path)
+    shutil.rmtree(old, ignore_errors=True)
+
+def save_index(path, vocabulary, offsets, postings):
+    import numpy as np
+    np.save(os.path.join(path, "keywords.npy"), vocabulary)
+    np.save(os.path.join(path, "offsets.npy"), offsets)
+    np.save(os.path.join(path, "postings.npy"), postings)
+
+def export_run(conn, run_id, root=ARCHIVE_DIR, now=None):
+    # Writes one partition per house and year the sale's lots fall in; returns the number of lots archived.
+    now = now or time.time()
+    rows = conn.execute(
+        "SELECT name, description, url, bid_value, market_value, status, closes_at, bid_updated_at, scraped_at "
+        "FROM lot_items WHERE run_id = ?", (run_id,),
+    ).fetchall()
+    partitions = defaultdict(list)
+    for name, description, url, bid_value, market_value, status, closes_at, bid_updated_at, scraped_at in rows:
+        date = closes_at or scraped_at or now
+        partitions[(house_from_url(url) or "unknown", year_of(date))].append({
+            "bid": bid_value if bid_value is not None else float("nan"),
+            "hammer": hammer_price(bid_value, closes_at, bid_updated_at, now),
+            "estimate": market_value if market_value is not None else float("nan"),
+            "date": date,
+            "category": CATEGORIES.index(lot_category(name, description)),
+            "status": STATUSES.index(status) if status in STATUSES else STATUSES.index(FAILED),
+            "keywords": lot_keywords(name),
+        })
+    for (house, year), records in partitions.items():
+        path = os.path.join(root, f"house={house}", f"year={year}", f"run-{run_id}")
+        write_partition(path, records, {"runs": [run_id], "house": house, "year": year})
+    # Only once every partition is in place: a sale whose export was interrupted is exported again in full.
+    with conn:
+        conn.execute("UPDATE runs SET archived_at = ? WHERE id = ?", (now, run_id))
+    return len(rows)
+
+def archive_finished_runs(conn=None, root=ARCHIVE_DIR):
+    # Completed sales whose lots are all researched and closed (lots without a closing time do not hold a
+    # sale back). Returns the ids of the runs archived.
+    own_conn = conn is None
+    conn = conn or connect()
+    try:
+        now = time.time()
+        run_ids = [row[0] for row in conn.execute(ARCHIVABLE_RUNS, (COMPLETED, now)).fetchall()]
+        for run_id in run_ids:
+            lots = export_run(conn, run_id, root, now)
+            print(f"[Archive] Run {run_id}: {lots} lots archived.")
+        return run_ids
+    finally:
+        if own_conn:
+            conn.close()
+
+def compact(root=ARCHIVE_DIR, conn=None):
+    # One partition per house and year instead of one per sale, so long-range queries open fewer files.
+    # Sales whose export has not finished (runs.archived_at unset) are left alone until it is redone.
+    import numpy as np
+    own_conn = conn is None
+    conn = conn or connect()
+    archived = {row[0] for row in conn.execute("SELECT id FROM runs WHERE archived_at IS NOT NULL")}
+    if own_conn:
+        conn.close()
+    for year_dir in sorted(glob(os.path.join(root, "house=*", "year=*"))):
+        for path in superseded_paths(year_dir):
+            shutil.rmtree(path)
+        parts = [part for part in map(Partition, partition_paths(year_dir))
+                 if set(part.meta["runs"]) <= archived]
+        if len(parts) < 2:
+            continue
+        runs = sorted(run for part in parts for run in part.meta["runs"])
+        path = os.path.join(year_dir, f"runs-{runs[0]}-{runs[-1]}")
+        temporary = path + ".tmp"
+        shutil.rmtree(temporary, ignore_errors=True)
+        os.makedirs(temporary)
+        for name in COLUMN_TYPES:
+            columns = [part.column(name) for part in parts]
+            if name in ("category", "status"):
+                columns = [part.codes(name, column) for part, column in zip(parts, columns)]
+            np.save(os.path.join(temporary, f"{name}.npy"), np.concatenate(columns).astype(COLUMN_TYPES[name]))
+        # Merge the keyword indexes: one (keyword, row) pair per posting, shifted by each part's first row.
+        words, rows, base = [], [], 0
+        for part in parts:
+            offsets = np.asarray(part.column("offsets"))
+            words.append(np.repeat(np.asarray(part.column("keywords")), np.diff(offsets)))
+            rows.append(np.asarray(part.column("postings")) + base)
+            base += part.meta["rows"]
+        words = np.concatenate(words).astype(f"<U{MAX_KEYWORD_CHARS}")
+        rows = np.concatenate(rows).astype(np.int32)
+        order = np.lexsort((rows, words))
+        vocabulary, starts = np.unique(words[order], return_index=True)
+        save_index(temporary, vocabulary, np.append(starts, len(order)).astype(np.int64), rows[order])
+        meta = dict(parts[0].meta, runs=runs, rows=base, first=min(p.meta["first"] for p in parts),
+                    last=max(p.meta["last"] for p in parts), categories=CATEGORIES, statuses=STATUSES)
+        with open(os.path.join(temporary, "meta.json"), "w") as f:
+            json.dump(meta, f)
+        # From here the merged partition supersedes the parts, so a crash before they are removed does not
+        # count their rows twice.
+        swap_in(temporary, path)
+        for part in parts:
+            if part.path != path:
+                shutil.rmtree(part.path)
+        print(f"[Archive] Compacted {len(parts)} partitions into {path}.")
+
+
+# --- Reading ---
+
+def candidate_paths(year_dir):
+    # Finished partitions, plus the old copy of any partition whose swap_in was interrupted midway.
+    paths = [path for path in sorted(glob(os.path.join(year_dir, "run*")))
+             if PARTITION_NAME.match(os.path.basename(path))]
+    live = [path for path in paths if not path.endswith(".old")]
+    return sorted(live + [path for path in paths if path.endswith(".old") and path[:-4] not in live])
+
+def superseded_paths(year_dir):
+    # Partitions whose runs are all in a compacted partition: left behind when compact() stopped midway.
+    runs = {}
+    for path in candidate_paths(year_dir):
+        with open(os.path.join(path, "meta.json")) as f:
+            runs[path] = set(json.load(f)["runs"])
+    return [path for path, own in runs.items()
+            if any(other != path and len(runs[other]) > len(own) and own <= runs[other] for other in runs)]
+
+def partition_paths(year_dir):
+    superseded = set(superseded_paths(year_dir))
+    return [path for path in candidate_paths(year_dir) if path not in superseded]
+
+class Partition:
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+
+    def column(self, name):
+        import numpy as np
+        return np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode="r")
+
+    def codes(self, name, values):
+        # Category and status codes re-mapped to the current CATEGORIES/STATUSES, in case either list changed.
+        import numpy as np
+        labels = self.meta["categories"] if name == "category" else self.meta["statuses"]
+        current = CATEGORIES if name == "category" else STATUSES
+        fallback = current.index("other" if name == "category" else FAILED)
+        lookup = np.array([current.index(label) if label in current else fallback for label in labels], dtype=np.int8)
+        return lookup[np.asarray(values)] if len(values) else np.asarray(values)
+
+    def rows_with(self, keyword):
+        import numpy as np
+        vocabulary = self.column("keywords")
+        position = int(np.searchsorted(vocabulary, keyword)) if len(vocabulary) else 0
+        if position >= len(vocabulary) or vocabulary[position] != keyword:
+            return np.empty(0, dtype=np.int32)
+        offsets = self.column("offsets")
+        return np.asarray(self.column("postings")[offsets[position]:offsets[position + 1]])
+
+
+class Archive:
+    def __init__(self, root=ARCHIVE_DIR):
+        self.root = root
+
+    def partitions(self, house=None, since=None, until=None):
+        # Pruned on directory names first, then on each partition's date range, before any column is opened.
+        for house_dir in sorted(glob(os.path.join(self.root, "house=*"))):
+            if house and os.path.basename(house_dir) != f"house={house}":
+                continue
+            for year_dir in sorted(glob(os.path.join(house_dir, "year=*"))):
+                year = int(os.path.basename(year_dir)[5:])
+                if (since and year < year_of(since)) or (until and year > year_of(until)):
+                    continue
+                for path in partition_paths(year_dir):
+                    part = Partition(path)
+                    if (since and part.meta["last"] < since) or (until and part.meta["first"] >= until):
+                        continue
+                    yield part
+
+    def select(self, fields, keyword=None, category=None, house=None, since=None, until=None):
+        # Matching rows of `fields` from every partition, concatenated. Only the selected values are copied
+        # out of the memory maps.
+        import numpy as np
+        keyword = singular(keyword.lower())[:MAX_KEYWORD_CHARS] if keyword else None
+        chunks = defaultdict(list)
+        for part in self.partitions(house, since, until):
+            rows = part.rows_with(keyword) if keyword else None
+            if rows is not None and not len(rows):
+                continue
+
+            def take(name):
+                values = part.column(name)
+                values = values[rows] if rows is not None else values
+                return part.codes(name, values) if name in ("category", "status") else values
+
+            mask = None
+            if category:
+                mask = take("category") == CATEGORIES.index(category)
+            if since or until:
+                dates = take("date")
+                in_range = (dates >= (since or -np.inf)) & (dates < (until or np.inf))
+                mask = in_range if mask is None else mask & in_range
+            for field in fields:
+                values = take(field)
+                chunks[field].append(np.asarray(values[mask] if mask is not None else values))
+        return {
+            field: np.concatenate(chunks[field]) if chunks[field] else np.empty(0, dtype=COLUMN_TYPES[field])
+            for field in fields
+        }
+
+    def price_distribution(self, field="hammer", **filters):
+        values = self.select([field], **filters)[field]
+        return distribution(values)
+
+    def by_category(self, field="hammer", **filters):
+        import numpy as np
+        data = self.select([field, "category"], **filters)
+        return {
+            category: distribution(data[field][data["category"] == code])
+            for code, category in enumerate(CATEGORIES)
+            if np.any(data["category"] == code)
+        }
+
+    def sell_through(self, **filters):
+        # Lots whose outcome is known, and how many of them sold (a hammer price above zero).
+        import numpy as np
+        hammer = self.select(["hammer"], **filters)["hammer"]
+        known = hammer[np.isfinite(hammer)]
+        sold = int(np.count_nonzero(known > 0))
+        return {"offered": len(known), "sold": sold, "rate": round(sold / len(known), 4) if len(known) else None}
+
+    def estimate_accuracy(self, **filters):
+        # How the researched estimate compared with the hammer price, for lots that have both.
+        import numpy as np
+        data = self.select(["hammer", "estimate"], **filters)
+        hammer, estimate = data["hammer"], data["estimate"]
+        both = np.isfinite(hammer) & (hammer > 0) & np.isfinite(estimate) & (estimate > 0)
+        ratios = hammer[both] / estimate[both]
+        if not len(ratios):
+            return {"lots": 0}
+        errors = np.abs(ratios - 1)
+        return {
+            "lots": len(ratios),
+            "median_ratio": round(float(np.median(ratios)), 4),
+            "median_error": round(float(np.median(errors)), 4),
+            "within_25_percent": round(float(np.mean(errors <= 0.25)), 4),
+        }
+
+    def stats(self, **filters):
+        return {
+            "hammer": self.price_distribution("hammer", **filters),
+            "estimate": self.price_distribution("estimate", **filters),
+            "sell_through": self.sell_through(**filters),
+            "estimate_accuracy": self.estimate_accuracy(**filters),
+        }
+
+
+def distribution(values):
+    import numpy as np
+    values = values[np.isfinite(values) & (values > 0)]
+    if not len(values):
+        return {"lots": 0}
+    p10, p25, p50, p75, p90 = np.percentile(values, [10, 25, 50, 75, 90])
+    return {
+        "lots": len(values), "mean": round(float(values.mean()), 2), "min": round(float(values.min()), 2),
+        "p10": round(float(p10), 2), "p25": round(float(p25), 2), "median": round(float(p50), 2),
+        "p75": round(float(p75), 2), "p90": round(float(p90), 2), "max": round(float(values.max()), 2),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Columnar archive of finished sales.")
+    parser.add_argument("--archive", default=ARCHIVE_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_command = commands.add_parser("export", help="archive finished sales")
+    export_command.add_argument("--run", type=int, help="archive this run now, even if some of its lots are still open")
+    commands.add_parser("compact", help="merge each house/year into one partition")
+    stats_command = commands.add_parser("stats", help="price distribution, sell-through and estimate accuracy")
+    stats_command.add_argument("--keyword")
+    stats_command.add_argument("--category", choices=CATEGORIES)
+    stats_command.add_argument("--house", help="auction-site domain, e.g. example-auctions.com")
+    stats_command.add_argument("--since", help="YYYY-MM-DD")
+    stats_command.add_argument("--until", help="YYYY-MM-DD (exclusive)")
+    stats_command.add_argument("--by-category", action="store_true", help="hammer price distribution per category")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        if args.run is not None:
+            conn = connect()
+            row = conn.execute("SELECT archived_at FROM runs WHERE id = ?", (args.run,)).fetchone()
+            if row is None:
+                sys.exit(f"Unknown run: {args.run}")
+            if row[0] is not None:
+                sys.exit(f"Run {args.run} is already archived.")
+            print(f"[Archive] Run {args.run}: {export_run(conn, args.run, args.archive)} lots archived.")
+            conn.close()
+        else:
+            archive_finished_runs(root=args.archive)
+    elif args.command == "compact":
+        compact(args.archive)
+    else:
+        filters = {"keyword": args.keyword, "category": args.category, "house": args.house,
+                   "since": parse_date(args.since), "until": parse_date(args.until)}
+        archive = Archive(args.archive)
+        started = time.perf_counter()
+        result = archive.by_category(**filters) if args.by_category else archive.stats(**filters)
+        print(json.dumps(result, indent=2))
+        print(f"[Archive] Query took {(time.perf_counter() - started) * 1000:.0f} ms.")
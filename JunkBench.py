@@ -0,0 +1,526 @@
+# JunkBench.py
+# Offline benchmark: lot and comparable pages are replayed from a local HTTP server, googlesearch.search is
+# replaced by a fake that points at those pages, and OpenAI calls go to JunkStub. Reports lots/second,
+# p50/p95 per-lot latency, CPU and peak memory for the scraper, researcher, sniper and compare_prices:
+#   python JunkBench.py --sizes 100,1000,10000 --llm-latency 0.3 --search-latency 0.2
+#   python JunkBench.py record START_URL --corpus bench_corpus --max-items 200
+#   python JunkBench.py imports    (import time of each module against its budget; exits 1 on a regression)
+# Without --corpus, lot pages are generated in the auction site's markup. Each measurement runs in a fresh
+# process and working directory, so databases, caches and peak RSS never carry over between runs.
+import argparse
+import hashlib
+import io
+import json
+import os
+import random
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from glob import glob
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urljoin
+
+TARGETS = ["scrape", "analyze", "sniper", "compare"]
+SIZES = (100, 1000, 10000)
+SEARCH_RESULTS = 10
+COMPARABLE_PAGE_CHARS = 30_000   # padding so condensation and streamed truncation have real work to do
+COMPARE_PASSES = 5
+SCRIPT = os.path.abspath(__file__)
+
+MAKERS = ["Waterford", "Royal Doulton", "Wedgwood", "Belleek", "Georgian", "Victorian", "Edwardian", "Art Deco"]
+MATERIALS = ["sterling silver", "oak", "mahogany", "bronze", "porcelain", "crystal", "brass", "9ct gold"]
+OBJECTS = ["candlesticks", "mantel clock", "writing desk", "tea service", "vase", "oil on canvas, signed",
+           "pocket watch", "decanter", "side table", "figurine", "watercolour", "bookcase"]
+JUNK = ["Box of assorted paperbacks", "Quantity of costume jewellery", "Flat pack MDF wardrobe",
+        "Framed print after Jack B. Yeats", "Job lot of DVDs"]
+# Seconds each module may take to import in a fresh interpreter, and libraries none of them may load while
+# importing: those belong on first use (JunkClients, or a function-level import).
+IMPORT_BUDGETS = {
+    "app": 0.5,
+    "JunkCompare": 0.1,
+    "JunkStore": 0.05,
+    "JunkFilter": 0.1,
+    "JunkJobs": 0.1,
+    "JunkReader": 0.3,
+    "JunkResearcher": 0.5,
+}
+HEAVY_MODULES = ["openai", "selenium", "googlesearch", "numpy", "requests"]
+IMPORT_PROBE = (
+    "import json, sys, time\n"
+    "started = time.perf_counter()\n"
+    "import {module}\n"
+    "seconds = time.perf_counter() - started\n"
+    "print(json.dumps({{'seconds': seconds, 'heavy': [m for m in {heavy!r} if m in sys.modules]}}))\n"
+)
+NEXT_LINK = re.compile(r"<a\b[^>]*\brel=[\"']next[\"'][^>]*>.*?</a>", re.IGNORECASE | re.DOTALL)
+
+
+# --- Corpus and replay server (parent process) ---
+
+def synthetic_lot(index):
+    # Deterministic per index; about one lot in eight is the kind of junk the prefilter drops.
+    rng = random.Random(index)
+    if rng.random() < 0.125:
+        name = f"{rng.choice(JUNK)} (lot {index})"
+    else:
+        name = f"{rng.choice(MAKERS)} {rng.choice(MATERIALS)} {rng.choice(OBJECTS)} no. {index}"
+    description = (f"{name}. {rng.choice(['Good', 'Fair', 'Some wear', 'Excellent'])} condition, "
+                   f"{rng.randint(10, 90)}cm. Provenance: private collection, County {rng.choice(['Cork', 'Meath', 'Kerry'])}.")
+    return name, rng.choice([5, 10, 20, 40, 60, 80, 120, 200, 350]), description
+
+def lot_html(index, next_href):
+    name, bid, description = synthetic_lot(index)
+    closes_at = int(time.time()) + 3600 + index * 30
+    next_link = f'<a rel="next" href="{next_href}">Next lot</a>' if next_href else ""
+    return (
+        f"<html><head><title>Lot {index} - {name}</title></head><body>"
+        f'<div class="lot" data-end-time="{closes_at}"><h1 class="lot-desc-h1">{name}</h1>'
+        f'<div class="bid">Current bid: <span id="timedBid">€{bid}</span></div>'
+        f'<p class="translate">{description}</p><p class="translate">Collection only.</p></div>'
+        f"{next_link}</body></html>"
+    )
+
+def comparable_html(key):
+    rng = random.Random(key)
+    title = f"{rng.choice(MAKERS)} {rng.choice(MATERIALS)} {rng.choice(OBJECTS)}"
+    price = rng.choice([45, 90, 150, 300, 650, 1200, 2400])
+    filler = "".join(
+        f"<p>Related item {i}: {rng.choice(MAKERS)} {rng.choice(OBJECTS)}, ships worldwide.</p>"
+        for i in range(COMPARABLE_PAGE_CHARS // 60)
+    )
+    return (
+        f"<html><head><title>{title} | Antiques Marketplace</title>"
+        f'<meta property="og:price:amount" content="{price}"><meta property="og:price:currency" content="EUR">'
+        f'</head><body><h1>{title}</h1><p class="price">Price: €{price}.00</p>{filler}</body></html>'
+    )
+
+
+class Corpus:
+    # Recorded pages live in DIR/lots/*.html and DIR/comparables/*.html; missing parts are generated.
+    def __init__(self, directory=None):
+        self.lots = self.load(directory, "lots")
+        self.comparables = self.load(directory, "comparables")
+
+    @staticmethod
+    def load(directory, kind):
+        if not directory:
+            return []
+        pages = []
+        for path in sorted(glob(os.path.join(directory, kind, "*.html"))):
+            with open(path, encoding="utf-8", errors="replace") as f:
+                pages.append(f.read())
+        return pages
+
+    def lot_page(self, index, total):
+        next_href = f"/sale/{total}/lot/{index + 1}" if index + 1 < total else None
+        if not self.lots:
+            return lot_html(index, next_href)
+        # Recorded pages are replayed in a loop, with their next link pointed at our own next lot.
+        page = NEXT_LINK.sub("", self.lots[index % len(self.lots)])
+        link = f'<a rel="next" href="{next_href}">Next lot</a>' if next_href else ""
+        return page.replace("</body>", f"{link}</body>") if "</body>" in page else page + link
+
+    def comparable_page(self, key):
+        if not self.comparables:
+            return comparable_html(key)
+        return self.comparables[int(hashlib.sha1(key.encode("utf-8")).hexdigest(), 16) % len(self.comparables)]
+
+
+def make_handler(corpus, latency):
+    class ReplayHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            if latency:
+                time.sleep(latency)
+            lot = re.fullmatch(r"/sale/(\d+)/lot/(\d+)", self.path)
+            comparable = re.fullmatch(r"/comparable/([\w-]+)", self.path)
+            if lot and int(lot.group(2)) < int(lot.group(1)):
+                self.send_html(corpus.lot_page(int(lot.group(2)), int(lot.group(1))))
+            elif comparable:
+                self.send_html(corpus.comparable_page(comparable.group(1)))
+            else:
+                self.send_html("<html><body>Not found</body></html>", 404)
+
+        def send_html(self, page, status=200):
+            data = page.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return ReplayHandler
+
+def start_corpus_server(corpus, latency=0.0):
+    # Returns (server, base URL); lot i of an n-lot sale is at /sale/n/lot/i.
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(corpus, latency))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+# --- Fakes used inside the measured process ---
+
+def make_search(base_url, latency=0.0):
+    # Stands in for googlesearch.search: deterministic comparable URLs on the replay server.
+    def search(query, num_results=SEARCH_RESULTS, **kwargs):
+        if latency:
+            time.sleep(latency)
+        key = hashlib.sha1(query.encode("utf-8")).hexdigest()[:10]
+        return [f"{base_url}/comparable/{key}-{i}" for i in range(num_results)]
+    return search
+
+
+class ReplayElement:
+    def __init__(self, text="", href=None):
+        self.text = text
+        self.href = href
+
+    def is_displayed(self):
+        return True
+
+    def get_attribute(self, name):
+        return self.href if name == "href" else None
+
+
+class ReplayDriver:
+    # Just enough of a Selenium WebDriver for JunkSniper.main: pages come over HTTP and are parsed with
+    # JunkReader.LotPageParser, so the benchmark measures the sniper rather than Chrome.
+    def __init__(self):
+        import requests
+        self.session = requests.Session()
+        self.url = None
+        self.site = None
+        self.parser = None
+
+    def get(self, url):
+        from JunkReader import LotPageParser
+        from JunkSites import adapter_for
+        self.url = url
+        self.site = adapter_for(url)
+        self.parser = LotPageParser(self.site)
+        self.parser.feed(self.session.get(url, timeout=10).text)
+        self.parser.close()
+
+    @property
+    def title(self):
+        return self.parser.title if self.parser else ""
+
+    def find_elements(self, by, value):
+        # Only the site adapter's own selectors are answered, the way JunkReader asks for them.
+        parser, site = self.parser, self.site
+        if by != "css selector" or parser is None:
+            return []
+        if value == site.name_selector and parser.name:
+            return [ReplayElement(parser.name)]
+        if value == site.bid_selector and parser.bid:
+            return [ReplayElement(parser.bid)]
+        if value == site.description_selector:
+            return [ReplayElement(text) for text in parser.description]
+        if value == site.next_selector and parser.next_href:
+            return [ReplayElement("Next", urljoin(self.url, parser.next_href))]
+        return []
+
+    def find_element(self, by, value):
+        from selenium.common.exceptions import NoSuchElementException
+        elements = self.find_elements(by, value)
+        if not elements:
+            raise NoSuchElementException(f"{by}={value}")
+        return elements[0]
+
+    def quit(self):
+        self.session.close()
+
+
+def prepare_workdir():
+    # No network: default exchange rates instead of the ECB feed, and no client-side rate limits
+    # (the fakes are the only thing being called).
+    from JunkLimits import SERVICE_LIMITS
+    from JunkPrice import DEFAULT_RATES, RATES_FILE
+    from JunkStore import init_db
+    with open(RATES_FILE, "w") as f:
+        json.dump({"fetched_at": time.time(), "rates": DEFAULT_RATES}, f)
+    for limits in SERVICE_LIMITS.values():
+        for key in limits:
+            limits[key] = 10 ** 9
+    init_db().close()
+
+def seed_lots(size, server, analysed=False):
+    from JunkStore import BARGAIN, DROPPED, get_writer
+    writer = get_writer()
+    for index in range(size):
+        name, bid, description = synthetic_lot(index)
+        url = f"{server}/sale/{size}/lot/{index}"
+        if analysed:
+            market_value = float(random.Random(-index - 1).choice([30, 90, 300, 900, 2500]))
+            status = BARGAIN if bid * 1.3 < market_value * 0.3 else DROPPED
+            writer.save_analysed_item(name, f"€{bid}", description, url, "Seeded.", status, market_value)
+        else:
+            writer.save_item(name, f"€{bid}", description, url)
+    writer.flush()
+
+def completion_gaps(started, finished):
+    # Serial loops: a lot's latency is the time since the previous lot finished.
+    return [end - start for start, end in zip([started] + finished[:-1], finished)]
+
+
+def run_scrape(size, options):
+    from JunkReader import scrape_auction_items
+    finished = []
+    started = time.perf_counter()
+    scrape_auction_items(f"{options.server}/sale/{size}/lot/0", size,
+                         on_lot=lambda *lot: finished.append(time.perf_counter()))
+    return completion_gaps(started, finished)
+
+def setup_analyze(size, options):
+    seed_lots(size, options.server)
+
+def run_analyze(size, options):
+    # analyze_items polls forever; it runs on a daemon thread until every seeded lot has been through
+    # analyze_single_item once.
+    import JunkClients
+    import JunkResearcher
+    from JunkStore import get_writer
+    JunkClients.override("search", make_search(options.server, options.search_latency))
+    analyze_single_item = JunkResearcher.analyze_single_item
+    latencies = []
+    lock = threading.Lock()
+    done = threading.Event()
+
+    def timed_analysis(item):
+        started = time.perf_counter()
+        try:
+            return analyze_single_item(item)
+        finally:
+            with lock:
+                latencies.append(time.perf_counter() - started)
+                if len(latencies) >= size:
+                    done.set()
+
+    JunkResearcher.analyze_single_item = timed_analysis
+    threading.Thread(target=JunkResearcher.analyze_items, daemon=True).start()
+    done.wait()
+    get_writer().flush()
+    return latencies
+
+def run_sniper(size, options):
+    import JunkClients
+    import JunkSniper
+    from JunkStore import get_writer
+    JunkClients.override("search", make_search(options.server, options.search_latency))
+    JunkSniper.setup_driver = ReplayDriver
+    JunkSniper.START_URL = f"{options.server}/sale/{size}/lot/0"
+    JunkSniper.MAX_ITEMS = size
+    JunkSniper.PAGE_LOAD_WAIT = 0
+    analyze_item = JunkSniper.analyze_item
+    finished = []
+
+    def timed_analysis(item):
+        try:
+            return analyze_item(item)
+        finally:
+            finished.append(time.perf_counter())
+
+    JunkSniper.analyze_item = timed_analysis
+    started = time.perf_counter()
+    JunkSniper.main()
+    get_writer().flush()
+    return completion_gaps(started, finished)
+
+def setup_compare(size, options):
+    seed_lots(size, options.server, analysed=True)
+
+def run_compare(size, options):
+    # One pass scores every lot at once, so latencies here are per pass, not per lot.
+    from JunkCompare import compare_prices
+    latencies = []
+    for _ in range(COMPARE_PASSES):
+        started = time.perf_counter()
+        compare_prices(output=io.StringIO(), fmt="json")
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+BENCHMARKS = {
+    "scrape": (None, run_scrape, 1),
+    "analyze": (setup_analyze, run_analyze, 1),
+    "sniper": (None, run_sniper, 1),
+    "compare": (setup_compare, run_compare, COMPARE_PASSES),
+}
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def measure(target, size, options):
+    # Runs one benchmark in this process and returns its result row.
+    from JunkMetrics import registry, summarize
+    setup, run, passes = BENCHMARKS[target]
+    prepare_workdir()
+    if setup:
+        setup(size, options)
+    before = resource.getrusage(resource.RUSAGE_SELF)
+    started = time.perf_counter()
+    latencies = run(size, options)
+    elapsed = time.perf_counter() - started
+    after = resource.getrusage(resource.RUSAGE_SELF)
+    cpu = (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+    return {
+        "target": target,
+        "lots": size,
+        "seconds": round(elapsed, 3),
+        "lots_per_second": round(size * passes / elapsed, 1) if elapsed else None,
+        "latency_per": "pass" if target == "compare" else "lot",
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 2) if latencies else None,
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2) if latencies else None,
+        "cpu_seconds": round(cpu, 3),
+        "cpu_percent": round(100 * cpu / elapsed, 1) if elapsed else None,
+        "peak_rss_mb": round(after.ru_maxrss / 1024, 1),  # ru_maxrss is in KiB on Linux
+        "stages": summarize(registry.snapshot()),
+    }
+
+
+# --- Driver (parent process) ---
+
+def run_one(target, size, server, stub_url, search_latency, verbose=False):
+    with tempfile.TemporaryDirectory(prefix="junkbench-") as workdir:
+        result_path = os.path.join(workdir, "result.json")
+        command = [sys.executable, SCRIPT, "run", target, str(size), "--server", server,
+                   "--search-latency", str(search_latency), "--result", result_path]
+        env = dict(os.environ, OPENAI_API_KEY="stub", OPENAI_BASE_URL=stub_url, NO_PROXY="127.0.0.1,localhost")
+        output = None if verbose else subprocess.DEVNULL
+        completed = subprocess.run(command, cwd=workdir, env=env, stdout=output, stderr=output)
+        if completed.returncode or not os.path.exists(result_path):
+            return {"target": target, "lots": size, "error": f"exit code {completed.returncode}"}
+        with open(result_path) as f:
+            return json.load(f)
+
+def format_row(result):
+    if "error" in result:
+        return f"{result['target']:<8} {result['lots']:>6}  failed ({result['error']}; rerun with --verbose)"
+    return (f"{result['target']:<8} {result['lots']:>6} {result['seconds']:>9.2f} {result['lots_per_second']:>9} "
+            f"{result['p50_ms']!s:>9} {result['p95_ms']!s:>9} {result['latency_per']:>5} "
+            f"{result['cpu_percent']!s:>6} {result['peak_rss_mb']:>8}")
+
+def run_benchmarks(targets, sizes, corpus_dir=None, page_latency=0.0, search_latency=0.0, llm_latency=0.0,
+                   verbose=False):
+    from JunkStub import start_stub_server
+    server, base_url = start_corpus_server(Corpus(corpus_dir), page_latency)
+    stub, stub_url = start_stub_server(latency=llm_latency)
+    print(f"{'target':<8} {'lots':>6} {'seconds':>9} {'lots/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'per':>5} "
+          f"{'cpu %':>6} {'rss MB':>8}")
+    results = []
+    try:
+        for target in targets:
+            for size in sizes:
+                result = run_one(target, size, base_url, stub_url, search_latency, verbose)
+                print(format_row(result), flush=True)
+                results.append(result)
+    finally:
+        server.shutdown()
+        stub.shutdown()
+    return results
+
+def import_time(module, repeat=3):
+    # Best of `repeat` fresh interpreters, so a cold disk cache on the first run does not count.
+    best = None
+    for _ in range(repeat):
+        completed = subprocess.run([sys.executable, "-c", IMPORT_PROBE.format(module=module, heavy=HEAVY_MODULES)],
+                                   cwd=os.path.dirname(SCRIPT), capture_output=True, text=True)
+        if completed.returncode:
+            return {"module": module, "error": completed.stderr.strip().splitlines()[-1:]}
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        if best is None or result["seconds"] < best["seconds"]:
+            best = result
+    return {"module": module, "seconds": round(best["seconds"], 3), "heavy": best["heavy"]}
+
+def check_imports(budgets=IMPORT_BUDGETS):
+    # Returns True when every module imports within budget and without loading a heavy client library.
+    ok = True
+    print(f"{'module':<16} {'seconds':>8} {'budget':>7}  result")
+    for module, budget in budgets.items():
+        result = import_time(module)
+        if "error" in result:
+            print(f"{module:<16} {'-':>8} {budget:>7}  failed: {' '.join(result['error'])}")
+            ok = False
+            continue
+        problems = []
+        if result["seconds"] > budget:
+            problems.append("over budget")
+        if result["heavy"]:
+            problems.append(f"loads {', '.join(result['heavy'])}")
+        ok = ok and not problems
+        print(f"{module:<16} {result['seconds']:>8} {budget:>7}  {'; '.join(problems) or 'ok'}")
+    return ok
+
+def record(start_url, corpus_dir, max_items=200):
+    # Saves live lot pages (following rel=next) for later replay; this is the only part that uses the network.
+    from JunkReader import get_lot_page, parse_lot_page
+    from JunkSites import adapter_for
+    lots_dir = os.path.join(corpus_dir, "lots")
+    os.makedirs(lots_dir, exist_ok=True)
+    url = start_url
+    count = 0
+    while url and count < max_items:
+        response = get_lot_page(url)
+        response.raise_for_status()
+        with open(os.path.join(lots_dir, f"{count:05d}.html"), "w", encoding="utf-8") as f:
+            f.write(response.text)
+        parser = parse_lot_page(response.text, adapter_for(url))
+        url = urljoin(url, parser.next_href) if parser.next_href else None
+        count += 1
+    print(f"[Bench] Recorded {count} lot pages in {lots_dir}.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark JunkProspector offline against recorded pages and stubs.")
+    parser.add_argument("--targets", default=",".join(TARGETS), help=f"comma-separated, from {', '.join(TARGETS)}")
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)), help="comma-separated lot counts")
+    parser.add_argument("--corpus", help="directory with recorded lots/*.html and comparables/*.html")
+    parser.add_argument("--page-latency", type=float, default=0.0, help="seconds per page served")
+    parser.add_argument("--search-latency", type=float, default=0.0, help="seconds per fake Google search")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds per stub OpenAI reply")
+    parser.add_argument("--json", dest="json_path", help="also write all results (with per-stage metrics) here")
+    parser.add_argument("--verbose", action="store_true", help="show the benchmarked code's own output")
+    commands = parser.add_subparsers(dest="command")
+    record_command = commands.add_parser("record", help="save live lot pages into a corpus directory")
+    record_command.add_argument("start_url")
+    record_command.add_argument("--corpus", required=True)
+    record_command.add_argument("--max-items", type=int, default=200)
+    commands.add_parser("imports", help="check each module's import time and that no heavy library loads eagerly")
+    run_command = commands.add_parser("run", help=argparse.SUPPRESS)
+    run_command.add_argument("target", choices=TARGETS)
+    run_command.add_argument("size", type=int)
+    run_command.add_argument("--server", required=True)
+    run_command.add_argument("--search-latency", type=float, default=0.0)
+    run_command.add_argument("--result", required=True)
+    args = parser.parse_args()
+
+    if args.command == "record":
+        record(args.start_url, args.corpus, args.max_items)
+    elif args.command == "imports":
+        sys.exit(0 if check_imports() else 1)
+    elif args.command == "run":
+        result = measure(args.target, args.size, args)
+        with open(args.result, "w") as f:
+            json.dump(result, f)
+    else:
+        targets = [t for t in args.targets.split(",") if t]
+        unknown = set(targets) - set(TARGETS)
+        if unknown:
+            parser.error(f"unknown targets: {', '.join(sorted(unknown))}")
+        results = run_benchmarks(targets, [int(s) for s in args.sizes.split(",") if s], args.corpus,
+                                 args.page_latency, args.search_latency, args.llm_latency, args.verbose)
+        if args.json_path:
+            with open(args.json_path, "w") as f:
+                json.dump(results, f, indent=2)
@@ -0,0 +1,30 @@
+# JunkCLI.py
+# One entry point per stage, so each command only imports what that stage uses:
+#   python JunkCLI.py scrape URL [--workers N ...]    crawl a sale; lots are saved as pending
+#   python JunkCLI.py research [--batch|--offline]    research pending lots
+#   python JunkCLI.py compare [--format csv|json]     rank analysed lots by bargain margin
+#   python JunkCLI.py serve [--no-supervisor ...]     web interface
+# Everything after the command is passed on unchanged to that module's own argument parser.
+import runpy
+import sys
+
+COMMANDS = {
+    "scrape": "JunkReader",
+    "research": "JunkResearcher",
+    "compare": "JunkCompare",
+    "serve": "app",
+}
+
+
+def usage():
+    return f"usage: {sys.argv[0]} {{{','.join(COMMANDS)}}} [args...]"
+
+def main(argv):
+    if not argv or argv[0] not in COMMANDS:
+        sys.exit(usage())
+    command, rest = argv[0], argv[1:]
+    sys.argv = [sys.argv[0]] + rest
+    runpy.run_module(COMMANDS[command], run_name="__main__", alter_sys=True)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,112 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from JunkMetrics import event
+
+CACHE_DB = "llm_cache.db"
+CACHE_TTL = 30 * 24 * 3600   # seconds; catalogues repeat week after week
+CACHE_MAX_ENTRIES = 50000    # least recently used entries are evicted past this
+
+_MISSING = object()
+
+
+def normalize_text(text):
+    text = (text or "").lower()
+    text = re.sub(r"[^\w€£$.,]+", " ", text)
+    return " ".join(text.split())
+
+def make_key(model, template_version, *parts):
+    payload = json.dumps([model, template_version] + [normalize_text(p) for p in parts])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    def __init__(self, path=CACHE_DB, ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            ''')
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache (last_used)")
+
+    def get(self, key, default=None):
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute("SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row and now - row[1] <= self.ttl:
+                with self.conn:
+                    self.conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (now, key))
+                self.hits += 1
+                event("cache_hit")
+                return json.loads(row[0])
+            if row:
+                with self.conn:
+                    self.conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            self.misses += 1
+            event("cache_miss")
+            return default
+
+    def set(self, key, value):
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now),
+            )
+            self.evict(now)
+
+    def evict(self, now):
+        self.conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl,))
+        count = self.conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        if count > self.max_entries:
+            # Drop a tenth extra so we are not evicting on every insert.
+            excess = count - self.max_entries + self.max_entries // 10
+            self.conn.execute(
+                "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+
+    def cached(self, model, template_version, parts, compute, store_if=None):
+        # Return the cached result for these inputs, or compute and store it.
+        # Results are stored only if store_if(value) is true (by default: not None), so errors are retried.
+        key = make_key(model, template_version, *parts)
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        value = compute()
+        if (store_if(value) if store_if else value is not None):
+            self.set(key, value)
+        return value
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMCache()
+        return _cache
@@ -0,0 +1,92 @@
+# JunkClients.py
+# Heavy clients (OpenAI, Google search, Chrome) are created on first use instead of at import time, so the
+# web UI, compare and each worker process only load the libraries they actually call. Anything can be swapped
+# with override(), which is how the benchmark plugs in its fakes.
+import os
+import threading
+
+OPENAI_BASE_URL = "https://api.openai.com/v1"
+
+_factories = {}
+_instances = {}
+_lock = threading.Lock()
+
+
+def provider(name):
+    def register(factory):
+        _factories[name] = factory
+        return factory
+    return register
+
+def get(name):
+    with _lock:
+        if name not in _instances:
+            _instances[name] = _factories[name]()
+        return _instances[name]
+
+def override(name, instance):
+    with _lock:
+        _instances[name] = instance
+
+def reset(name=None):
+    # Drops cached clients so the next get() builds them again, e.g. after the API key changes.
+    with _lock:
+        if name is None:
+            _instances.clear()
+        else:
+            _instances.pop(name, None)
+
+
+def openai_api_key():
+    key = os.getenv("OPENAI_API_KEY")
+    if not key:
+        raise ValueError("OPENAI_API_KEY environment variable is not set.")
+    return key
+
+def openai_base_url():
+    return os.getenv("OPENAI_BASE_URL", OPENAI_BASE_URL)
+
+@provider("openai")
+def make_openai_client():
+    from openai import OpenAI
+    # Retries go through JunkLimits so every thread shares one budget and backoff.
+    return OpenAI(api_key=openai_api_key(), base_url=openai_base_url(), max_retries=0)
+
+@provider("search")
+def load_google_search():
+    from googlesearch import search
+    return search
+
+def openai_client():
+    return get("openai")
+
+def google_search(query, **kwargs):
+    return get("search")(query, **kwargs)
+
+def openai_error():
+    # Base exception of the openai package, for except clauses; only imported once an error is being handled.
+    from openai import OpenAIError
+    return OpenAIError
+
+def request_error():
+    # Base exception of requests, for except clauses; only imported once an error is being handled.
+    from requests import RequestException
+    return RequestException
+
+
+def new_browser():
+    # One headless Chrome per caller: drivers are not thread-safe, so they are never shared.
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.chrome.service import Service
+    options = Options()
+    options.add_argument("--headless")
+    options.add_argument("--disable-gpu")
+    return webdriver.Chrome(service=Service(), options=options)
+
+def browser_tools():
+    # (By, WebDriverWait, expected_conditions) for code that drives a browser from new_browser().
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions
+    from selenium.webdriver.support.ui import WebDriverWait
+    return By, WebDriverWait, expected_conditions
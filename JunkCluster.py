@@ -0,0 +1,238 @@
+# JunkCluster.py
+# Groups near-duplicate lots ("Pair of Waterford glasses", "Set of six Waterford glasses") so only one lot per
+# group is researched. Lots are fingerprinted with MinHash over keyword shingles of name and description and
+# matched through an LSH index in the database; the first lot of a cluster is researched and its value, per
+# item, is shared with every later member, scaled by the quantity each lot states.
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import namedtuple
+from JunkComparables import keywords
+from JunkMetrics import event
+from JunkStore import DB_NAME, connect, get_writer
+
+NUM_HASHES = 64
+BANDS = 16                   # 16 bands of 4 rows: lots with ~60% shingle overlap become candidates
+SIMILARITY_THRESHOLD = 0.6   # estimated Jaccard similarity needed to join a cluster
+DESCRIPTION_KEYWORDS = 30    # the name carries the identity; long descriptions would drown it out
+MAX_CLUSTER_AGE_DAYS = 30    # older valuations are researched again, like the LLM cache
+CLUSTER_WAIT = 120           # seconds a member waits for its representative's research
+MAX_QUANTITY = 500
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(0x4A554E4B)
+# Fixed coefficients: signatures are stored in the database and compared across processes and runs.
+COEFFICIENTS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_HASHES)]
+
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8, "nine": 9,
+    "ten": 10, "eleven": 11, "twelve": 12, "twenty": 20,
+}
+_COUNT = r"(\d{1,3}|" + "|".join(NUMBER_WORDS) + r")"
+QUANTITY_PATTERNS = [
+    (re.compile(r"\bhalf (?:a )?dozen\b", re.IGNORECASE), lambda m: 6),
+    (re.compile(rf"\b{_COUNT} dozen\b", re.IGNORECASE), lambda m: 12 * count(m.group(1))),
+    (re.compile(r"\bdozen\b", re.IGNORECASE), lambda m: 12),
+    (re.compile(rf"\b{_COUNT} pairs\b", re.IGNORECASE), lambda m: 2 * count(m.group(1))),
+    (re.compile(r"\bpair\b", re.IGNORECASE), lambda m: 2),
+    (re.compile(r"\btrio\b", re.IGNORECASE), lambda m: 3),
+    (re.compile(rf"\b(?:set|lot|group|collection|box|quantity) of {_COUNT}\b", re.IGNORECASE),
+     lambda m: count(m.group(1))),
+    # A leading count: "Six Belleek cups", "12 x crystal tumblers", but not "19th century", "20cm" or "30 x 40".
+    (re.compile(rf"^\s*{_COUNT}\s+(?:x\s+)?(?!(?:cm|mm|in|inch|inches|ct|carat|kg|g|ml|cl|x)\b)[a-z]", re.IGNORECASE),
+     lambda m: count(m.group(1))),
+]
+QUANTITY_WORDS = set(NUMBER_WORDS) | {"pair", "pairs", "dozen", "half", "trio", "set", "sets", "lot", "group"}
+
+Assignment = namedtuple("Assignment", ["cluster_id", "quantity", "valuation", "researcher"])
+Valuation = namedtuple("Valuation", ["unit_value", "urls", "reasoning", "representative"])
+
+
+def count(word):
+    return int(word) if word.isdigit() else NUMBER_WORDS[word.lower()]
+
+def stated_quantity(name):
+    # Number of items a lot title says it holds; 1 when it does not say.
+    for pattern, quantity in QUANTITY_PATTERNS:
+        match = pattern.search(name or "")
+        if match:
+            return max(1, min(quantity(match), MAX_QUANTITY))
+    return 1
+
+def shingles(name, description=""):
+    # Keywords and keyword pairs of the name plus the leading keywords of the description; counts and
+    # quantity words are left out so "Pair of ..." and "Set of six ..." fingerprint alike.
+    def terms(text):
+        return [t for t in keywords(text) if not t.isdigit() and t not in QUANTITY_WORDS]
+    name_terms = terms(name)
+    result = set(name_terms) | {f"{a} {b}" for a, b in zip(name_terms, name_terms[1:])}
+    result.update(f"d:{t}" for t in terms(description)[:DESCRIPTION_KEYWORDS])
+    return result
+
+def shingle_hash(shingle):
+    return int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+
+def minhash(shingle_set):
+    hashes = [shingle_hash(s) for s in shingle_set]
+    if not hashes:
+        return None
+    return [min((a * h + b) % _PRIME for h in hashes) for a, b in COEFFICIENTS]
+
+def similarity(first, second):
+    return sum(a == b for a, b in zip(first, second)) / len(first)
+
+def band_buckets(signature, bands=BANDS):
+    rows = len(signature) // bands
+    return [
+        (band, hashlib.blake2b(repr(signature[band * rows:(band + 1) * rows]).encode("ascii"), digest_size=8).hexdigest())
+        for band in range(bands)
+    ]
+
+def share(valuation, quantity):
+    # (value, urls, reasoning) for a member lot of `quantity` items.
+    value = round(valuation.unit_value * quantity, 2)
+    reasoning = f"Grouped with near-duplicate lot '{valuation.representative}'. {valuation.reasoning}"
+    return value, valuation.urls, reasoning
+
+
+class LotClusterer:
+    def __init__(self, db_name=DB_NAME, threshold=SIMILARITY_THRESHOLD, max_age_days=MAX_CLUSTER_AGE_DAYS):
+        self.threshold = threshold
+        self.max_age = max_age_days * 86400
+        self.conn = connect(db_name)
+        self.lock = threading.Lock()
+        # Clusters whose representative is being researched in this process, and the event set when it is done.
+        self.researching = {}
+        self.prune()
+
+    def prune(self):
+        cutoff = time.time() - self.max_age
+        with self.lock, self.conn:
+            self.conn.execute(
+                "DELETE FROM cluster_buckets WHERE cluster_id IN (SELECT id FROM lot_clusters WHERE created_at < ?)",
+                (cutoff,),
+            )
+            self.conn.execute("DELETE FROM lot_clusters WHERE created_at < ?", (cutoff,))
+
+    def assign(self, name, description, item_id=None, url=None):
+        # Returns an Assignment, or None when the lot has no usable text. With a valuation the lot can be
+        # valued straight away; as researcher it must research and then call record() and release();
+        # otherwise another thread is researching its cluster and the lot should wait().
+        signature = minhash(shingles(name, description))
+        if signature is None:
+            return None
+        buckets = band_buckets(signature)
+        now = time.time()
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                cluster = self.best_match(signature, buckets)
+                if cluster:
+                    cluster_id = cluster[0]
+                    self.conn.execute("UPDATE lot_clusters SET members = members + 1 WHERE id = ?", (cluster_id,))
+                else:
+                    cluster_id = self.conn.execute(
+                        "INSERT INTO lot_clusters (representative, signature, created_at) VALUES (?, ?, ?)",
+                        (name, json.dumps(signature), now),
+                    ).lastrowid
+                    self.conn.executemany(
+                        "INSERT OR IGNORE INTO cluster_buckets (band, bucket, cluster_id) VALUES (?, ?, ?)",
+                        [(band, bucket, cluster_id) for band, bucket in buckets],
+                    )
+                self.conn.commit()
+            except BaseException:
+                self.conn.rollback()
+                raise
+            valuation = self.fresh_valuation(cluster, now) if cluster else None
+            researcher = valuation is None and cluster_id not in self.researching
+            if researcher:
+                self.researching[cluster_id] = threading.Event()
+        if item_id is not None or url is not None:
+            get_writer().set_cluster(cluster_id, item_id=item_id, url=url)
+        event("cluster_hit" if valuation else "cluster_new" if not cluster else "cluster_member")
+        return Assignment(cluster_id, stated_quantity(name), valuation, researcher)
+
+    def best_match(self, signature, buckets):
+        clauses = " OR ".join("(band = ? AND bucket = ?)" for _ in buckets)
+        params = [value for pair in buckets for value in pair]
+        rows = self.conn.execute(
+            "SELECT id, signature, representative, unit_value, urls, reasoning, valued_at FROM lot_clusters "
+            f"WHERE id IN (SELECT cluster_id FROM cluster_buckets WHERE {clauses})",
+            params,
+        ).fetchall()
+        scored = [(similarity(signature, json.loads(row[1])), row) for row in rows]
+        scored = [(score, row) for score, row in scored if score >= self.threshold]
+        return max(scored, key=lambda pair: pair[0])[1] if scored else None
+
+    def fresh_valuation(self, row, now=None):
+        _, _, representative, unit_value, urls, reasoning, valued_at = row
+        if unit_value is None or (now or time.time()) - (valued_at or 0) > self.max_age:
+            return None
+        return Valuation(unit_value, [tuple(url) for url in json.loads(urls or "[]")], reasoning, representative)
+
+    def valuation(self, cluster_id):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT id, signature, representative, unit_value, urls, reasoning, valued_at FROM lot_clusters WHERE id = ?",
+                (cluster_id,),
+            ).fetchone()
+        return self.fresh_valuation(row) if row else None
+
+    def wait(self, cluster_id, timeout=CLUSTER_WAIT):
+        with self.lock:
+            done = self.researching.get(cluster_id)
+        if done is not None:
+            done.wait(timeout)
+        return self.valuation(cluster_id)
+
+    def record(self, cluster_id, value, quantity, urls, reasoning):
+        # Stores the researched value as a value per item, for members that hold a different quantity.
+        if value is None:
+            return
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE lot_clusters SET unit_value = ?, urls = ?, reasoning = ?, valued_at = ? WHERE id = ?",
+                (value / max(quantity, 1), json.dumps(urls or []), reasoning, time.time(), cluster_id),
+            )
+
+    def release(self, cluster_id):
+        # Wakes waiting members whether or not the research produced a value.
+        with self.lock:
+            done = self.researching.pop(cluster_id, None)
+        if done is not None:
+            done.set()
+
+    def value(self, name, description, research, item_id=None, url=None):
+        # research() returns (value, urls, reasoning) or None; it is only called when no near-duplicate
+        # of this lot has been valued (or is being valued) already.
+        assignment = self.assign(name, description, item_id, url)
+        if assignment is None:
+            return research()
+        if assignment.valuation:
+            return share(assignment.valuation, assignment.quantity)
+        if not assignment.researcher:
+            valuation = self.wait(assignment.cluster_id)
+            if valuation:
+                return share(valuation, assignment.quantity)
+        try:
+            result = research()
+            if result:
+                self.record(assignment.cluster_id, result[0], assignment.quantity, result[1], result[2])
+            return result
+        finally:
+            if assignment.researcher:
+                self.release(assignment.cluster_id)
+
+
+_clusterer = None
+_clusterer_lock = threading.Lock()
+
+def get_clusterer():
+    global _clusterer
+    with _clusterer_lock:
+        if _clusterer is None:
+            _clusterer = LotClusterer()
+        return _clusterer
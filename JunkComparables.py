@@ -0,0 +1,84 @@
+# JunkComparables.py
+# Local index of every comparable page we have fetched (title, price, domain, time), searchable with FTS5.
+# Research checks it first and only goes to Google when there are too few fresh matches.
+import html
+import re
+import statistics
+import threading
+import time
+from urllib.parse import urlparse
+from JunkStore import connect, get_writer, parse_bid
+
+MIN_LOCAL_MATCHES = 3
+MAX_COMPARABLE_AGE_DAYS = 90
+MIN_SHARED_KEYWORDS = 2
+SNIPPET_CHARS = 300
+
+STOPWORDS = {
+    "and", "the", "with", "for", "from", "of", "a", "an", "in", "on", "to", "set", "pair", "lot", "box",
+    "two", "three", "four", "five", "six", "various", "assorted", "quantity", "collection", "vintage",
+}
+
+_local = threading.local()
+
+
+def get_conn():
+    # One read connection per thread; writes go through the store writer.
+    if getattr(_local, "conn", None) is None:
+        _local.conn = connect()
+    return _local.conn
+
+def page_title(page_html):
+    match = re.search(r"<title[^>]*>(.*?)</title>", page_html, re.IGNORECASE | re.DOTALL)
+    return " ".join(html.unescape(match.group(1)).split()) if match else ""
+
+def page_snippet(page_html, price_text):
+    text = re.sub(r"(?is)<(script|style)\b.*?</\1>", " ", page_html)
+    text = " ".join(html.unescape(re.sub(r"<[^>]+>", " ", text)).split())
+    position = text.find(price_text) if price_text else -1
+    start = max(0, position - SNIPPET_CHARS // 2) if position >= 0 else 0
+    return text[start:start + SNIPPET_CHARS]
+
+def keywords(text):
+    words = re.findall(r"[a-z0-9]{3,}", (text or "").lower())
+    return list(dict.fromkeys(w for w in words if w not in STOPWORDS))
+
+def record_comparable(url, page_html, price_text):
+    price = parse_bid(price_text)
+    if price is None:
+        return
+    get_writer().save_comparable(
+        url, page_title(page_html), page_snippet(page_html, price_text), price,
+        urlparse(url).netloc.replace("www.", ""), time.time(),
+    )
+
+def find_local_comparables(name, limit=10, max_age_days=MAX_COMPARABLE_AGE_DAYS):
+    terms = keywords(name)
+    if not terms:
+        return []
+    match = " OR ".join(f'"{term}"' for term in terms)
+    rows = get_conn().execute('''
+        SELECT c.url, c.title, c.price, c.domain, c.fetched_at
+        FROM comparables_fts JOIN comparables c ON c.id = comparables_fts.rowid
+        WHERE comparables_fts MATCH ? AND c.fetched_at >= ?
+        ORDER BY bm25(comparables_fts)
+        LIMIT ?
+    ''', (match, time.time() - max_age_days * 86400, limit * 3)).fetchall()
+    # OR queries are loose; keep only titles sharing enough of the lot's keywords.
+    needed = min(MIN_SHARED_KEYWORDS, len(terms))
+    matches = [row for row in rows if len(set(terms) & set(keywords(row[1]))) >= needed]
+    return matches[:limit]
+
+def local_valuation(name):
+    # Returns (value, [(url, price text)], reasoning) from local matches, or None if there are too few.
+    matches = find_local_comparables(name)
+    if len(matches) < MIN_LOCAL_MATCHES:
+        return None
+    prices = [price for _, _, price, _, _ in matches]
+    value = round(statistics.median(prices), 2)
+    reasoning = (
+        f"Median of {len(matches)} comparable listings from the local index "
+        f"(range €{min(prices):.2f}–€{max(prices):.2f})."
+    )
+    print(f"[Comparables] Valued '{name}' locally from {len(matches)} matches: €{value}")
+    return value, [(url, f"€{price:.2f}") for url, _, price, _, _ in matches[:3]], reasoning
@@ -1,40 +1,133 @@
 # JunkCompare.py
-import sqlite3
+import argparse
+import csv
+import json
+import sys
+from urllib.parse import urlparse
+from JunkStore import connect
 
-DB_NAME = "auction_items.db"
 BARGAIN_THRESHOLD = 0.3  # 70% cheaper than market price after adding premium
 BUYER_PREMIUM = 0.30
 
-def parse_price(analysis):
-    try:
-        price_str = analysis.split('€')[1].split()[0]
-        return float(price_str)
-    except (IndexError, ValueError):
-        return None
-
-def compare_prices():
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-
-    cursor.execute("SELECT name, current_bid, analysis, url FROM lot_items")
-    items = cursor.fetchall()
-
-    for name, current_bid, analysis, url in items:
-        market_price = parse_price(analysis)
-        try:
-            auction_price = float(current_bid.replace('€', '').replace(',', '').strip())
-        except ValueError:
-            auction_price = None
-
-        if market_price and auction_price:
-            total_auction_price = auction_price * (1 + BUYER_PREMIUM)
-            if total_auction_price < market_price * BARGAIN_THRESHOLD:
-                print(f"Bargain Found: {name}")
-                print(f"Auction Price (with premium): €{total_auction_price:.2f}")
-                print(f"Estimated Market Price: €{market_price:.2f}")
-                print(f"Link: {url}\n")
+# Scoring profiles, all evaluated in one pass. "houses" limits a profile to those auction-site domains;
+# leave it out to apply the profile to every lot.
+PROFILES = [
+    {"name": "default", "buyer_premium": BUYER_PREMIUM, "threshold": BARGAIN_THRESHOLD},
+]
 
+RESULT_FIELDS = ["profile", "rank", "name", "house", "auction_price", "total_price", "market_price", "ratio",
+                 "margin", "url"]
+
+
+def is_bargain(auction_price, market_price, buyer_premium=BUYER_PREMIUM, threshold=BARGAIN_THRESHOLD):
+    # Same rule as score_lots: an unknown or zero bid is never a bargain.
+    if not market_price or market_price <= 0 or not auction_price or auction_price <= 0:
+        return False
+    return auction_price * (1 + buyer_premium) < market_price * threshold
+
+def house_from_url(url):
+    return urlparse(url or "").netloc.replace("www.", "")
+
+def load_lots(conn):
+    # Columnar view of every lot with both a bid and a market value. numpy is imported here rather than at
+    # the top: JunkFilter and the web UI import this module only for its constants.
+    import numpy as np
+    rows = conn.execute(
+        "SELECT name, url, bid_value, market_value FROM lot_items "
+        "WHERE bid_value IS NOT NULL AND market_value IS NOT NULL"
+    ).fetchall()
+    names, urls, bids, markets = zip(*rows) if rows else ((), (), (), ())
+    return {
+        "name": np.array(names, dtype=object),
+        "url": np.array(urls, dtype=object),
+        "house": np.array([house_from_url(url) for url in urls], dtype=object),
+        "bid": np.array(bids, dtype=np.float64),
+        "market": np.array(markets, dtype=np.float64),
+    }
+
+def score_lots(lots, profiles=PROFILES):
+    # Premium-adjusted totals, ratios and margins for every lot under every profile. Returns the bargains as
+    # columns keyed by RESULT_FIELDS, ranked by margin within each profile; no Python object is built per lot.
+    import numpy as np
+    bids = lots["bid"]
+    markets = lots["market"]
+    premiums = np.array([p["buyer_premium"] for p in profiles], dtype=np.float64)[:, None]
+    thresholds = np.array([p["threshold"] for p in profiles], dtype=np.float64)[:, None]
+
+    totals = bids[None, :] * (1 + premiums)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratios = np.where(markets > 0, totals / markets, np.inf)
+    margins = markets[None, :] - totals
+    bargains = (bids > 0) & (markets > 0) & (totals < markets * thresholds)
+
+    orders = []
+    for index, profile in enumerate(profiles):
+        mask = bargains[index]
+        if profile.get("houses"):
+            mask = mask & np.isin(lots["house"], list(profile["houses"]))
+        selected = np.flatnonzero(mask)
+        orders.append(selected[np.argsort(-margins[index, selected], kind="stable")])
+
+    counts = [len(order) for order in orders]
+    rows = np.repeat(np.arange(len(profiles)), counts)
+    picked = np.concatenate(orders) if orders else np.empty(0, dtype=np.intp)
+    return {
+        "profile": np.repeat(np.array([p["name"] for p in profiles], dtype=object), counts),
+        "rank": np.concatenate([np.arange(1, count + 1) for count in counts]) if counts else np.empty(0, dtype=int),
+        "name": lots["name"][picked],
+        "house": lots["house"][picked],
+        "auction_price": bids[picked],
+        "total_price": np.round(totals[rows, picked], 2),
+        "market_price": markets[picked],
+        "ratio": np.round(ratios[rows, picked], 4),
+        "margin": np.round(margins[rows, picked], 2),
+        "url": lots["url"][picked],
+    }
+
+def result_rows(results):
+    # score_lots' columns as plain-Python row tuples in RESULT_FIELDS order.
+    return zip(*(results[field].tolist() for field in RESULT_FIELDS))
+
+def write_results(results, output, fmt):
+    if fmt == "json":
+        json.dump([dict(zip(RESULT_FIELDS, row)) for row in result_rows(results)], output, indent=2,
+                  ensure_ascii=False)
+        output.write("\n")
+        return
+    writer = csv.writer(output)
+    writer.writerow(RESULT_FIELDS)
+    writer.writerows(result_rows(results))
+
+def print_results(results):
+    for profile, rank, name, _, _, total_price, market_price, _, _, url in result_rows(results):
+        print(f"Bargain Found: {name} [{profile} #{rank}]")
+        print(f"Auction Price (with premium): €{total_price:.2f}")
+        print(f"Estimated Market Price: €{market_price:.2f}")
+        print(f"Link: {url}\n")
+
+def compare_prices(profiles=PROFILES, output=None, fmt=None):
+    conn = connect()
+    results = score_lots(load_lots(conn), profiles)
     conn.close()
 
+    if fmt:
+        write_results(results, output or sys.stdout, fmt)
+    else:
+        print_results(results)
+    return results
+
 if __name__ == '__main__':
-    compare_prices()
+    parser = argparse.ArgumentParser(description="Rank lots by premium-adjusted bargain margin.")
+    parser.add_argument("--format", choices=["csv", "json"], help="write results as CSV or JSON instead of text")
+    parser.add_argument("--output", help="file to write to (default: stdout)")
+    parser.add_argument("--profiles", help="JSON file with a list of {name, buyer_premium, threshold, houses} profiles")
+    args = parser.parse_args()
+    profiles = PROFILES
+    if args.profiles:
+        with open(args.profiles) as f:
+            profiles = json.load(f)
+    if args.output:
+        with open(args.output, "w", newline="") as f:
+            compare_prices(profiles, f, args.format or "csv")
+    else:
+        compare_prices(profiles, fmt=args.format)
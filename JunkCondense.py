@@ -0,0 +1,51 @@
+# JunkCondense.py
+# Turns raw comparable pages into a few lines each (title, prices, the text around them) and packs them
+# into a token budget, so valuation prompts carry listings rather than <head>, scripts and CSS.
+from JunkComparables import page_title
+from JunkPrice import extract_prices, page_text
+
+VALUATION_TOKEN_BUDGET = 280    # whole prompt body; ~1,100 characters, three condensed pages
+PAGE_TOKEN_BUDGET = 90          # source, title, prices and one context line
+CHARS_PER_TOKEN = 4
+PRICES_PER_PAGE = 3
+SNIPPET_CHARS = 120
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def condense_page(url, page_html, budget=PAGE_TOKEN_BUDGET):
+    lines = [f"Source: {url}"]
+    title = page_title(page_html)
+    if title:
+        lines.append(f"Title: {title}")
+
+    text = page_text(page_html)
+    prices = extract_prices(page_html)[:PRICES_PER_PAGE]
+    if prices:
+        lines.append("Prices: " + "; ".join(
+            f"€{p.eur:.2f}" + (f" ({p.amount:g} {p.currency})" if p.currency != "EUR" else "") + f" [{p.source}]"
+            for p in prices
+        ))
+    snippets = []
+    for price in prices:
+        if price.context and price.context not in snippets:
+            snippets.append(price.context[:SNIPPET_CHARS])
+    if not snippets and text:
+        snippets.append(text[:SNIPPET_CHARS])
+    lines.extend(f"Context: {snippet}" for snippet in snippets)
+
+    condensed = "\n".join(lines)
+    return condensed[:budget * CHARS_PER_TOKEN]
+
+def pack_pages(condensed_pages, budget=VALUATION_TOKEN_BUDGET):
+    # Keep whole page summaries, in search-rank order, until the budget is used up.
+    packed = []
+    used = 0
+    for condensed in condensed_pages:
+        cost = estimate_tokens(condensed)
+        if used + cost > budget:
+            break
+        packed.append(condensed)
+        used += cost
+    return "\n\n".join(packed)
@@ -0,0 +1,86 @@
+# JunkFetch.py
+# Shared fetcher for comparable pages: one pooled session, a cap on connections per domain,
+# streamed downloads cut off once we have enough of the page, and one request per URL in flight.
+import threading
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+from JunkClients import request_error
+from JunkMetrics import event, timed
+
+FETCH_WORKERS = 8
+PER_DOMAIN_CONNECTIONS = 2
+MAX_PAGE_BYTES = 100_000  # titles, prices and structured data sit near the top of the page
+FETCH_TIMEOUT = 10
+CHUNK_SIZE = 16_384
+FETCH_HEADERS = {"User-Agent": "Mozilla/5.0 (X11; Linux x86_64) JunkProspector"}
+
+Page = namedtuple("Page", ["url", "status", "text"])
+
+
+class PageFetcher:
+    def __init__(self, workers=FETCH_WORKERS, per_domain=PER_DOMAIN_CONNECTIONS, max_bytes=MAX_PAGE_BYTES):
+        # requests is imported with the first fetcher, not when this module is.
+        import requests
+        from requests.adapters import HTTPAdapter
+        self.max_bytes = max_bytes
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=64, pool_maxsize=max(per_domain, 1))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update(FETCH_HEADERS)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="JunkFetch")
+        self.domain_slots = defaultdict(lambda: threading.BoundedSemaphore(per_domain))
+        self.in_flight = {}
+        self.lock = threading.Lock()
+
+    def fetch(self, url, max_bytes=None):
+        # Returns a Page, or None if the request failed.
+        return self.submit(url, max_bytes).result()
+
+    def submit(self, url, max_bytes=None):
+        with self.lock:
+            future = self.in_flight.get(url)
+            if future is None:
+                future = self.executor.submit(self.download, url, max_bytes or self.max_bytes)
+                self.in_flight[url] = future
+                future.add_done_callback(lambda _: self.forget(url))
+            return future
+
+    def fetch_many(self, urls, max_bytes=None):
+        # Fetches concurrently; results come back in the order of urls.
+        futures = [self.submit(url, max_bytes) for url in urls]
+        return [future.result() for future in futures]
+
+    def forget(self, url):
+        with self.lock:
+            self.in_flight.pop(url, None)
+
+    def download(self, url, max_bytes):
+        with self.lock:
+            slot = self.domain_slots[urlparse(url).netloc]
+        with slot, timed("page_fetch"):
+            try:
+                with self.session.get(url, timeout=FETCH_TIMEOUT, stream=True) as response:
+                    body = bytearray()
+                    for chunk in response.iter_content(CHUNK_SIZE):
+                        body.extend(chunk)
+                        if len(body) >= max_bytes:
+                            break
+                    text = bytes(body[:max_bytes]).decode(response.encoding or "utf-8", errors="replace")
+                    return Page(url, response.status_code, text)
+            except (request_error(), LookupError) as e:
+                print(f"[Fetch Error] {url}: {e}")
+                event("error", stage="page_fetch")
+                return None
+
+
+_fetcher = None
+_fetcher_lock = threading.Lock()
+
+def get_fetcher():
+    global _fetcher
+    with _fetcher_lock:
+        if _fetcher is None:
+            _fetcher = PageFetcher()
+        return _fetcher
@@ -0,0 +1,113 @@
+# JunkFilter.py
+# Cheap rule-based prefilter run before any network or LLM work. Box-lot junk, reproductions and lots whose
+# bid already rules out a bargain are dropped here, with a count kept per rule.
+import re
+import threading
+from collections import Counter, namedtuple
+from JunkCompare import BARGAIN_THRESHOLD, BUYER_PREMIUM
+from JunkMetrics import event
+
+MAX_BID = 2000             # euro; above this we are not the audience
+MIN_SCORE = 0
+DEFAULT_VALUE_CEILING = 5000  # most a lot is plausibly worth when no category rule matches
+
+REPRODUCTION_KEYWORDS = ["after", "in the manner of", "style of", "reproduction", "replica", "copy of", "facsimile"]
+JUNK_KEYWORDS = [
+    "box lot", "box of", "quantity of", "job lot", "assorted", "various", "miscellaneous", "sundry",
+    # Only costume jewellery: a "diamond pendant" or "gold brooch" is exactly what is worth valuing.
+    "costume jewellery", "costume", "paperbacks", "dvds", "cds", "flat pack", "plastic", "mixed lot",
+]
+SPECIAL_KEYWORDS = [
+    "antique", "artist", "signed", "vintage", "handcrafted", "silver", "gold", "hallmarked", "georgian",
+    "victorian", "edwardian", "art deco", "first edition", "limited edition", "original", "18th century",
+    "19th century", "oil on canvas", "bronze", "ivory", "jade",
+]
+
+# Category rules: lots matching `pattern` get `score` added and may not be worth more than `ceiling`.
+# Set "drop": True to reject the category outright.
+CATEGORY_RULES = [
+    {"name": "furniture_flatpack", "pattern": r"\b(ikea|flat ?pack|mdf)\b", "drop": True},
+    {"name": "prints_posters", "pattern": r"\b(poster|framed print|reproduction print)\b", "score": -1, "ceiling": 300},
+    {"name": "glass_ceramics", "pattern": r"\b(waterford|belleek|royal doulton|wedgwood|crystal|porcelain)\b",
+     "score": 1, "ceiling": 1500},
+    {"name": "art", "pattern": r"\b(painting|oil|canvas|watercolour|lithograph|etching|drawing)\b", "score": 1},
+    {"name": "silver_gold", "pattern": r"\b(sterling|silver|gold|\d+ ?ct)\b", "score": 2},
+]
+
+ART_PATTERN = re.compile(r"\b(artist|painting|oil|canvas|watercolour|print|drawing|lithograph|signed)\b", re.IGNORECASE)
+
+Decision = namedtuple("Decision", ["keep", "rule", "score", "reason"])
+
+
+def keyword_pattern(keywords):
+    return re.compile(r"\b(?:" + "|".join(re.escape(k) for k in keywords) + r")\b", re.IGNORECASE)
+
+def is_art_item(name, description):
+    return bool(ART_PATTERN.search(f"{name} {description}"))
+
+
+class Prefilter:
+    def __init__(self, category_rules=CATEGORY_RULES, max_bid=MAX_BID, min_score=MIN_SCORE,
+                 buyer_premium=BUYER_PREMIUM, bargain_threshold=BARGAIN_THRESHOLD):
+        self.reproduction = keyword_pattern(REPRODUCTION_KEYWORDS)
+        self.junk = keyword_pattern(JUNK_KEYWORDS)
+        self.special = keyword_pattern(SPECIAL_KEYWORDS)
+        self.categories = [dict(rule, regex=re.compile(rule["pattern"], re.IGNORECASE)) for rule in category_rules]
+        self.max_bid = max_bid
+        self.min_score = min_score
+        # A bargain needs market value > bid * (1 + premium) / threshold.
+        self.upside_factor = (1 + buyer_premium) / bargain_threshold
+        self.counts = Counter()
+        self.lock = threading.Lock()
+
+    def check(self, name, description="", bid_value=None):
+        decision = self.evaluate(name or "", description or "", bid_value)
+        with self.lock:
+            self.counts["kept" if decision.keep else decision.rule] += 1
+        if not decision.keep:
+            event("prefilter_drop", rule=decision.rule)
+        return decision
+
+    def evaluate(self, name, description, bid_value):
+        text = f"{name} {description}"
+        if self.reproduction.search(name):
+            return Decision(False, "reproduction", 0, "Reproduction")
+        if bid_value is not None and bid_value > self.max_bid:
+            return Decision(False, "max_bid", 0, f"Bid over €{self.max_bid}")
+
+        junk = len(self.junk.findall(name))
+        special = len(self.special.findall(text))
+        score = special - junk
+        ceiling = DEFAULT_VALUE_CEILING
+        for rule in self.categories:
+            if not rule["regex"].search(text):
+                continue
+            if rule.get("drop"):
+                return Decision(False, rule["name"], score, f"Category {rule['name']}")
+            score += rule.get("score", 0)
+            ceiling = min(ceiling, rule.get("ceiling", ceiling))
+
+        if score < self.min_score:
+            return Decision(False, "junk", score, "Generic junk lot")
+        if bid_value and bid_value * self.upside_factor > ceiling:
+            return Decision(False, "upside", score, "Bid leaves no room for a bargain")
+        return Decision(True, None, score, "")
+
+    def matching_categories(self, name, description=""):
+        text = f"{name or ''} {description or ''}"
+        return [rule["name"] for rule in self.categories if rule["regex"].search(text)]
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counts)
+
+
+_prefilter = None
+_prefilter_lock = threading.Lock()
+
+def get_prefilter():
+    global _prefilter
+    with _prefilter_lock:
+        if _prefilter is None:
+            _prefilter = Prefilter()
+        return _prefilter
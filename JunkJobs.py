@@ -0,0 +1,428 @@
+# JunkJobs.py
+# SQLite-backed job queue plus a supervisor that runs scrape and research workers as separate processes.
+# Each sale is one scrape job (and one run, so a restarted job resumes from its checkpoint). A scrape worker
+# crawls up to MAX_ACTIVE_SALES jobs at once on one JunkReader.CrawlScheduler, so sales from different houses
+# share its crawl threads under per-host rate limits. Research workers lease pending lots in small batches, so
+# several processes can share the backlog without analysing the same lot twice. Crashed workers are restarted
+# and their jobs put back on the queue.
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from JunkMetrics import registry, run_summary, start_exporter
+from JunkStore import COMPLETED, CRASHED, FINISH_RUN, PENDING, connect, create_run, get_writer, init_db
+
+SCRAPE = "scrape"
+RESEARCH = "research"
+
+# Job status, stored in jobs.status.
+QUEUED = "queued"
+RUNNING = "running"
+CANCELLING = "cancelling"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+ACTIVE = (QUEUED, RUNNING, CANCELLING)
+
+SCRAPE_WORKERS = 1       # one process holds every sale, so per-host rate limits apply across all of them
+MAX_ACTIVE_SALES = 20    # sales one scrape worker crawls at the same time
+SCRAPE_THREADS = 8       # crawl threads shared by all sales of one scrape worker
+RESEARCH_WORKERS = 2
+RESEARCH_THREADS = 5     # lots researched concurrently inside one research worker
+LEASE_SIZE = 5           # lots a research worker takes at a time
+LEASE_SECONDS = 600      # a crashed worker's lots become available again after this
+MAX_JOB_ATTEMPTS = 3
+IDLE_INTERVAL = 2.0      # seconds a worker waits when there is nothing to do
+MONITOR_INTERVAL = 1.0
+CANCEL_GRACE = 30.0      # seconds a scrape worker has to stop a cancelled sale before its process is killed
+RESTART_DELAY_CAP = 60.0
+ARCHIVE_INTERVAL = 600.0  # seconds between checks for finished sales to add to the JunkArchive
+
+DEFAULT_OPTIONS = {"max_items": 1000, "workers": 4, "catalogue_url": None, "enumerate_lots": False}
+
+
+def submit_job(start_url, options=None, conn=None):
+    # Returns the id of the scrape job for start_url; a sale that is already queued or running is not
+    # started a second time.
+    own = conn is None
+    conn = conn or init_db()
+    options = dict(DEFAULT_OPTIONS, **(options or {}))
+    try:
+        row = conn.execute(
+            f"SELECT id FROM jobs WHERE kind = ? AND status IN ({', '.join('?' * len(ACTIVE))}) "
+            "AND json_extract(payload, '$.start_url') = ?",
+            (SCRAPE,) + ACTIVE + (start_url,),
+        ).fetchone()
+        if row:
+            print(f"[Jobs] {start_url} is already job {row[0]}.")
+            return row[0]
+        run_id = create_run(start_url, options)
+        with conn:
+            job_id = conn.execute(
+                "INSERT INTO jobs (kind, run_id, payload, status, created_at) VALUES (?, ?, ?, ?, ?)",
+                (SCRAPE, run_id, json.dumps(dict(options, start_url=start_url)), QUEUED, time.time()),
+            ).lastrowid
+        print(f"[Jobs] Queued job {job_id} (run {run_id}) for {start_url}.")
+        return job_id
+    finally:
+        if own:
+            conn.close()
+
+def claim_job(conn, kind, pid):
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute(
+            "SELECT id, run_id, payload FROM jobs WHERE kind = ? AND status = ? ORDER BY id LIMIT 1", (kind, QUEUED)
+        ).fetchone()
+        if row:
+            conn.execute(
+                "UPDATE jobs SET status = ?, worker_pid = ?, attempts = attempts + 1, started_at = ? WHERE id = ?",
+                (RUNNING, pid, time.time(), row[0]),
+            )
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    if row is None:
+        return None
+    return {"id": row[0], "run_id": row[1], "payload": json.loads(row[2] or "{}")}
+
+def finish_job(conn, job_id, status, error=None):
+    with conn:
+        # A job cancelled while it was finishing stays cancelled.
+        conn.execute(
+            "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ? AND status = ?",
+            (status, error, time.time(), job_id, RUNNING),
+        )
+
+def finish_cancelled(conn, job_id, run_id):
+    with conn:
+        conn.execute("UPDATE jobs SET status = ?, finished_at = ? WHERE id = ? AND status IN (?, ?)",
+                     (CANCELLED, time.time(), job_id, CANCELLING, CANCELLED))
+        # The run keeps its checkpoint and can still be resumed.
+        conn.execute(FINISH_RUN, (CRASHED, time.time(), run_id))
+
+def cancel_job(job_id, conn=None):
+    own = conn is None
+    conn = conn or connect()
+    try:
+        with conn:
+            conn.execute("UPDATE jobs SET status = ?, finished_at = ? WHERE id = ? AND status = ?",
+                         (CANCELLED, time.time(), job_id, QUEUED))
+            # Running jobs are stopped by their scrape worker, or by the supervisor if the worker does not react.
+            conn.execute("UPDATE jobs SET status = ? WHERE id = ? AND status = ?", (CANCELLING, job_id, RUNNING))
+        row = conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row[0] if row else None
+    finally:
+        if own:
+            conn.close()
+
+def requeue_jobs(conn, pids=None):
+    # Running jobs whose worker died go back on the queue (or fail after MAX_JOB_ATTEMPTS).
+    # With no pids, every running job is requeued: used when a supervisor starts up.
+    sql = "SELECT id, attempts, status FROM jobs WHERE status IN (?, ?)"
+    params = [RUNNING, CANCELLING]
+    if pids is not None:
+        if not pids:
+            return 0
+        sql += f" AND worker_pid IN ({', '.join('?' * len(pids))})"
+        params.extend(pids)
+    rows = conn.execute(sql, params).fetchall()
+    with conn:
+        for job_id, attempts, status in rows:
+            if status == CANCELLING:
+                new_status = CANCELLED
+            else:
+                new_status = QUEUED if attempts < MAX_JOB_ATTEMPTS else FAILED
+            conn.execute("UPDATE jobs SET status = ?, worker_pid = NULL WHERE id = ?", (new_status, job_id))
+            print(f"[Jobs] Job {job_id}: worker gone, now {new_status}.")
+    return len(rows)
+
+def list_jobs(conn, limit=50):
+    rows = conn.execute(
+        "SELECT id, kind, run_id, payload, status, worker_pid, attempts, error, created_at, started_at, finished_at "
+        "FROM jobs ORDER BY id DESC LIMIT ?", (limit,)
+    ).fetchall()
+    return [
+        {
+            "id": job_id, "kind": kind, "run_id": run_id, "start_url": json.loads(payload or "{}").get("start_url"),
+            "status": status, "worker_pid": worker_pid, "attempts": attempts, "error": error,
+            "created_at": created_at, "started_at": started_at, "finished_at": finished_at,
+        }
+        for job_id, kind, run_id, payload, status, worker_pid, attempts, error, created_at, started_at, finished_at
+        in rows
+    ]
+
+def lease_lots(conn, pid, limit=LEASE_SIZE, lease_seconds=LEASE_SECONDS):
+    # Pending lots nobody else is working on, leased to this worker until they are analysed or the lease expires.
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        rows = conn.execute(
+            "SELECT id, name, description, bid_value FROM lot_items "
+            "WHERE status = ? AND (retry_at IS NULL OR retry_at <= ?) AND (leased_until IS NULL OR leased_until < ?) "
+            "ORDER BY id LIMIT ?",
+            (PENDING, now, now, limit),
+        ).fetchall()
+        conn.executemany("UPDATE lot_items SET leased_until = ?, leased_by = ? WHERE id = ?",
+                         [(now + lease_seconds, pid, row[0]) for row in rows])
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return rows
+
+def release_leases(conn, pid):
+    with conn:
+        conn.execute("UPDATE lot_items SET leased_until = NULL, leased_by = NULL WHERE leased_by = ? AND status = ?",
+                     (pid, PENDING))
+
+
+def scrape_worker():
+    from JunkReader import CrawlScheduler, open_sale
+    pid = os.getpid()
+    writer = get_writer()
+    conn = connect()
+    start_exporter()
+    active = {}               # run id -> (job id, metrics snapshot)
+    finished = queue.Queue()  # (job, run id, error or None, cancelled) from crawl and seeding threads
+    scheduler = CrawlScheduler(SCRAPE_THREADS, on_sale_done=lambda sale: finished.put(
+        (active[sale.run_id][0], sale.run_id, None, sale.cancelled)))
+    scheduler.start()
+
+    def seed(job_id, run_id, options):
+        # Catalogue pages can take a while, so each sale is seeded on its own thread.
+        try:
+            scheduler.add(open_sale(options["start_url"], options["max_items"], options["workers"],
+                                    options["catalogue_url"], options["enumerate_lots"], None, run_id,
+                                    scheduler.throttle))
+        except Exception as e:
+            finished.put((job_id, run_id, str(e), False))
+
+    while True:
+        while True:
+            try:
+                job_id, run_id, error, cancelled = finished.get_nowait()
+            except queue.Empty:
+                break
+            _, before = active.pop(run_id)
+            # Metrics are per process, so a run's summary includes the sales crawled alongside it.
+            writer.save_run_metrics(run_id, run_summary(before))
+            if cancelled:
+                writer.flush()
+                finish_cancelled(conn, job_id, run_id)
+                print(f"[Scrape {pid}] Job {job_id} cancelled.")
+                continue
+            writer.finish_run(run_id, CRASHED if error else COMPLETED)
+            writer.flush()
+            finish_job(conn, job_id, FAILED if error else DONE, error)
+            if error:
+                print(f"[Scrape {pid}] Job {job_id} failed: {error}")
+
+        for job_id, run_id in conn.execute("SELECT id, run_id FROM jobs WHERE status = ? AND worker_pid = ?",
+                                           (CANCELLING, pid)).fetchall():
+            if run_id in active:
+                scheduler.cancel(run_id)
+
+        job = claim_job(conn, SCRAPE, pid) if len(active) < MAX_ACTIVE_SALES else None
+        if job is None:
+            time.sleep(IDLE_INTERVAL)
+            continue
+        options = job["payload"]
+        print(f"[Scrape {pid}] Job {job['id']} (run {job['run_id']}): {options['start_url']}")
+        active[job["run_id"]] = (job["id"], registry.snapshot())
+        threading.Thread(target=seed, args=(job["id"], job["run_id"], options), daemon=True).start()
+
+def research_worker():
+    from JunkResearcher import analyze_single_item
+    pid = os.getpid()
+    writer = get_writer()
+    conn = connect()
+    start_exporter()
+    with ThreadPoolExecutor(max_workers=RESEARCH_THREADS) as executor:
+        while True:
+            items = lease_lots(conn, pid)
+            if not items:
+                time.sleep(IDLE_INTERVAL)
+                continue
+            list(executor.map(analyze_single_item, items))
+            writer.flush()
+
+WORKER_TARGETS = {SCRAPE: scrape_worker, RESEARCH: research_worker}
+
+
+class Supervisor:
+    def __init__(self, scrape_workers=SCRAPE_WORKERS, research_workers=RESEARCH_WORKERS,
+                 monitor_interval=MONITOR_INTERVAL):
+        self.counts = {SCRAPE: scrape_workers, RESEARCH: research_workers}
+        self.monitor_interval = monitor_interval
+        # spawn, not fork: children must not inherit the parent's writer thread or open connections.
+        self.context = multiprocessing.get_context("spawn")
+        self.slots = {}
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.thread = None
+        self.next_archive = 0.0
+        self.cancelling = {}  # job id -> when the monitor first saw it cancelling
+
+    def start(self):
+        conn = init_db()
+        requeue_jobs(conn)  # left running by a supervisor that did not shut down cleanly
+        conn.close()
+        with self.lock:
+            for kind, count in self.counts.items():
+                for slot in range(count):
+                    self.slots[(kind, slot)] = {"process": None, "restarts": 0, "crashes": 0, "restart_at": 0.0}
+                    self.spawn(kind, slot)
+        self.thread = threading.Thread(target=self.monitor, name="Supervisor", daemon=True)
+        self.thread.start()
+        print(f"[Supervisor] Started {self.counts[SCRAPE]} scrape and {self.counts[RESEARCH]} research workers.")
+
+    def spawn(self, kind, slot):
+        process = self.context.Process(target=WORKER_TARGETS[kind], name=f"{kind}-{slot}", daemon=True)
+        process.start()
+        state = self.slots[(kind, slot)]
+        state["process"] = process
+        state["started_at"] = time.monotonic()
+
+    def monitor(self):
+        conn = connect()
+        while not self.stopping.wait(self.monitor_interval):
+            try:
+                self.check_workers(conn)
+                self.check_cancellations(conn)
+                self.check_archive(conn)
+            except Exception as e:
+                print(f"[Supervisor] Monitor error: {e}")
+        conn.close()
+
+    def check_workers(self, conn):
+        with self.lock:
+            for (kind, slot), state in self.slots.items():
+                process = state["process"]
+                if process is not None and process.is_alive():
+                    if time.monotonic() - state["started_at"] > RESTART_DELAY_CAP:
+                        state["crashes"] = 0
+                    continue
+                if process is not None:
+                    print(f"[Supervisor] {process.name} (pid {process.pid}) exited with {process.exitcode}.")
+                    requeue_jobs(conn, [process.pid])
+                    release_leases(conn, process.pid)
+                    state["process"] = None
+                    state["crashes"] += 1
+                    # Back off when a worker keeps crashing straight away.
+                    state["restart_at"] = time.monotonic() + min(RESTART_DELAY_CAP, 2 ** (state["crashes"] - 1))
+                if time.monotonic() >= state["restart_at"]:
+                    state["restarts"] += 1
+                    self.spawn(kind, slot)
+
+    def check_cancellations(self, conn):
+        # Scrape workers stop cancelled sales themselves; a worker that has not done so within CANCEL_GRACE
+        # is killed, and its other sales go back on the queue to resume from their checkpoints.
+        rows = conn.execute("SELECT id, run_id, worker_pid FROM jobs WHERE status = ?", (CANCELLING,)).fetchall()
+        now = time.monotonic()
+        self.cancelling = {job_id: self.cancelling.get(job_id, now) for job_id, _, _ in rows}
+        for job_id, run_id, pid in rows:
+            if now - self.cancelling[job_id] < CANCEL_GRACE:
+                continue
+            with self.lock:
+                for (kind, slot), state in self.slots.items():
+                    process = state["process"]
+                    if process is not None and process.pid == pid:
+                        process.terminate()
+                        process.join(5)
+                        self.spawn(kind, slot)
+            requeue_jobs(conn, [pid])
+            release_leases(conn, pid)
+            finish_cancelled(conn, job_id, run_id)
+            del self.cancelling[job_id]
+            print(f"[Supervisor] Cancelled job {job_id}.")
+
+    def check_archive(self, conn):
+        if time.monotonic() < self.next_archive:
+            return
+        self.next_archive = time.monotonic() + ARCHIVE_INTERVAL
+        from JunkArchive import archive_finished_runs
+        archive_finished_runs(conn)
+
+    def status(self):
+        with self.lock:
+            workers = [
+                {
+                    "kind": kind, "slot": slot,
+                    "pid": state["process"].pid if state["process"] else None,
+                    "alive": bool(state["process"] and state["process"].is_alive()),
+                    "restarts": state["restarts"],
+                }
+                for (kind, slot), state in sorted(self.slots.items())
+            ]
+        conn = connect()
+        jobs = dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        conn.close()
+        return {"workers": workers, "jobs": jobs}
+
+    def stop(self):
+        self.stopping.set()
+        if self.thread:
+            self.thread.join()
+        with self.lock:
+            processes = [state["process"] for state in self.slots.values() if state["process"]]
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.join(5)
+        conn = connect()
+        requeue_jobs(conn, [process.pid for process in processes])
+        for process in processes:
+            release_leases(conn, process.pid)
+        conn.close()
+        print("[Supervisor] Stopped.")
+
+    def run_forever(self):
+        self.start()
+        try:
+            while True:
+                time.sleep(60)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Queue auction sales and run scrape/research worker processes.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    supervise = commands.add_parser("supervise", help="run the worker processes until interrupted")
+    supervise.add_argument("--scrape-workers", type=int, default=SCRAPE_WORKERS)
+    supervise.add_argument("--research-workers", type=int, default=RESEARCH_WORKERS)
+    submit = commands.add_parser("submit", help="queue sales for scraping")
+    submit.add_argument("start_urls", nargs="+", metavar="start_url", help="URL of the first lot of each sale")
+    submit.add_argument("--catalogue", dest="catalogue_url")
+    submit.add_argument("--enumerate", dest="enumerate_lots", action="store_true")
+    submit.add_argument("--max-items", type=int, default=DEFAULT_OPTIONS["max_items"])
+    submit.add_argument("--workers", type=int, default=DEFAULT_OPTIONS["workers"], help="most crawl threads this sale may use at once")
+    commands.add_parser("status", help="list recent jobs")
+    cancel = commands.add_parser("cancel", help="cancel a queued or running job")
+    cancel.add_argument("job_id", type=int)
+    args = parser.parse_args()
+
+    if args.command == "supervise":
+        Supervisor(args.scrape_workers, args.research_workers).run_forever()
+    elif args.command == "submit":
+        if args.catalogue_url and len(args.start_urls) > 1:
+            parser.error("--catalogue belongs to a single sale")
+        for start_url in args.start_urls:
+            submit_job(start_url, {"catalogue_url": args.catalogue_url, "enumerate_lots": args.enumerate_lots,
+                                   "max_items": args.max_items, "workers": args.workers})
+    elif args.command == "status":
+        conn = init_db()
+        for job in list_jobs(conn):
+            print(f"#{job['id']} {job['kind']} run {job['run_id']} {job['status']} "
+                  f"(attempts {job['attempts']}) {job['start_url']}" + (f" - {job['error']}" if job['error'] else ""))
+        conn.close()
+    elif args.command == "cancel":
+        print(f"Job {args.job_id}: {cancel_job(args.job_id)}")
@@ -0,0 +1,152 @@
+# JunkLimits.py
+# One token-bucket limiter per external service (Google, OpenAI, auction sites) shared by every thread,
+# plus a retry helper with jittered exponential backoff that honours Retry-After. When a service keeps
+# failing, RetryLater is raised so the lot goes back on the retry queue instead of failing for good.
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from JunkMetrics import event
+
+SERVICE_LIMITS = {
+    "google": {"requests_per_minute": 8},
+    "openai": {"requests_per_minute": 500, "tokens_per_minute": 30000},
+    "auction": {"requests_per_minute": 120},   # per host: JunkReader uses "auction:<host>"
+    "default": {"requests_per_minute": 120},
+}
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = 2.0    # seconds
+BACKOFF_CAP = 120.0   # seconds
+
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+
+class RetryLater(Exception):
+    def __init__(self, service, message, retry_after=None):
+        super().__init__(f"{service}: {message}")
+        self.service = service
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self, amount=1):
+        amount = min(float(amount), self.capacity)
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if now >= self.paused_until and self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = max(self.paused_until - now, (amount - self.tokens) / self.rate)
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        # Everyone using this service waits, so a 429 does not turn into a retry storm.
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class RateLimiter:
+    def __init__(self, limits=SERVICE_LIMITS):
+        self.limits = limits
+        self.requests = {}
+        self.tokens = {}
+        self.lock = threading.Lock()
+
+    def buckets(self, service):
+        with self.lock:
+            if service not in self.requests:
+                # "auction:<host>" gets its own buckets with the "auction" limits.
+                limits = self.limits.get(service) or self.limits.get(service.split(":")[0], self.limits["default"])
+                self.requests[service] = TokenBucket(limits["requests_per_minute"])
+                if limits.get("tokens_per_minute"):
+                    self.tokens[service] = TokenBucket(limits["tokens_per_minute"])
+            return self.requests[service], self.tokens.get(service)
+
+    def acquire(self, service, tokens=0):
+        requests_bucket, tokens_bucket = self.buckets(service)
+        requests_bucket.acquire()
+        if tokens and tokens_bucket:
+            tokens_bucket.acquire(tokens)
+
+    def pause(self, service, seconds):
+        requests_bucket, _ = self.buckets(service)
+        requests_bucket.pause(seconds)
+
+
+def status_of(error):
+    for source in (error, getattr(error, "response", None)):
+        status = getattr(source, "status_code", None) or getattr(source, "status", None)
+        if isinstance(status, int):
+            return status
+    text = str(error)
+    return 429 if "429" in text or "rate limit" in text.lower() else None
+
+def retry_after_of(error):
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    value = headers.get("Retry-After") or headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+def is_retryable(error):
+    status = status_of(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    # No status: connection resets, timeouts and the like.
+    name = type(error).__name__
+    return any(word in name for word in ("Timeout", "Connection", "Temporary"))
+
+def backoff_delay(attempt):
+    # Full jitter: uniform in [0, min(cap, base * 2^attempt)].
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+def call_with_retry(service, func, *args, tokens=0, max_attempts=MAX_ATTEMPTS, **kwargs):
+    limiter = get_limiter()
+    for attempt in range(max_attempts):
+        limiter.acquire(service, tokens)
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            if not is_retryable(e):
+                raise
+            retry_after = retry_after_of(e)
+            delay = retry_after if retry_after is not None else backoff_delay(attempt)
+            if status_of(e) == 429:
+                limiter.pause(service, delay)
+            event("rate_limited" if status_of(e) == 429 else "retry", service=service)
+            if attempt + 1 == max_attempts:
+                event("retry_later", service=service)
+                raise RetryLater(service, str(e), retry_after) from e
+            print(f"[{service}] {type(e).__name__} (attempt {attempt + 1}/{max_attempts}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+def estimate_tokens(prompt, completion=200):
+    return len(prompt) // 4 + completion
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+def get_limiter():
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RateLimiter()
+        return _limiter
@@ -0,0 +1,257 @@
+# JunkMetrics.py
+# In-process metrics: latency histograms per stage, event counters and LLM token usage. Each process
+# periodically saves a snapshot to the database so the Flask app can serve /metrics for all workers,
+# and a run's metrics (the difference between two snapshots) are stored with the run.
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds in seconds; chosen to separate cache hits, HTTP fetches, browser loads and LLM calls.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+EXPORT_INTERVAL = 5.0
+SNAPSHOT_MAX_AGE = 7 * 24 * 3600   # snapshots of processes gone this long are dropped
+
+STAGE_SECONDS = "junk_stage_seconds"
+EVENTS = "junk_events_total"
+LLM_TOKENS = "junk_llm_tokens_total"
+LLM_CALLS = "junk_llm_calls_total"
+
+HELP = {
+    STAGE_SECONDS: "Time spent in each stage (page_load, parse, db_write, query_generation, search, page_fetch, valuation).",
+    EVENTS: "Cache hits and misses, prefilter drops, retries and errors.",
+    LLM_TOKENS: "Tokens used by LLM calls, by model and kind (prompt/completion).",
+    LLM_CALLS: "LLM calls, by model and purpose.",
+    "junk_pipeline_seconds": "Time each lot spends in each JunkPipeline stage, including cache and local shortcuts.",
+    "junk_db_rows_total": "Rows written by the store writer.",
+}
+
+METRICS_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS metrics (
+        pid INTEGER PRIMARY KEY,
+        updated_at REAL,
+        data TEXT
+    )
+'''
+
+
+def label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class Registry:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counters = {}
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, label_key(labels))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, seconds, **labels):
+        key = (name, label_key(labels))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = {"buckets": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+            histogram["buckets"][bisect.bisect_left(self.buckets, seconds)] += 1
+            histogram["sum"] += seconds
+            histogram["count"] += 1
+
+    def snapshot(self):
+        # Plain JSON-serialisable copy: {"counters": [[name, labels, value]], "histograms": [[name, labels, data]]}.
+        with self.lock:
+            return {
+                "counters": [[name, list(map(list, labels)), value] for (name, labels), value in self.counters.items()],
+                "histograms": [
+                    [name, list(map(list, labels)), {"buckets": list(h["buckets"]), "sum": h["sum"], "count": h["count"]}]
+                    for (name, labels), h in self.histograms.items()
+                ],
+            }
+
+
+def merge(snapshots):
+    # Sum several snapshots (one per process) into one.
+    counters = {}
+    histograms = {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot.get("counters", []):
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, data in snapshot.get("histograms", []):
+            key = (name, tuple(map(tuple, labels)))
+            total = histograms.setdefault(key, {"buckets": [0] * len(data["buckets"]), "sum": 0.0, "count": 0})
+            total["buckets"] = [a + b for a, b in zip(total["buckets"], data["buckets"])]
+            total["sum"] += data["sum"]
+            total["count"] += data["count"]
+    return {
+        "counters": [[name, list(map(list, labels)), value] for (name, labels), value in counters.items()],
+        "histograms": [[name, list(map(list, labels)), data] for (name, labels), data in histograms.items()],
+    }
+
+def diff(after, before):
+    # What happened between two snapshots of the same process, e.g. during one run.
+    negated = {
+        "counters": [[name, labels, -value] for name, labels, value in before.get("counters", [])],
+        "histograms": [
+            [name, labels, {"buckets": [-b for b in data["buckets"]], "sum": -data["sum"], "count": -data["count"]}]
+            for name, labels, data in before.get("histograms", [])
+        ],
+    }
+    merged = merge([after, negated])
+    return {
+        "counters": [c for c in merged["counters"] if c[2]],
+        "histograms": [h for h in merged["histograms"] if h[2]["count"]],
+    }
+
+def quantile(data, q, buckets=BUCKETS):
+    # Upper bound of the bucket holding the q-th observation; good enough to compare runs.
+    if not data["count"]:
+        return None
+    target = q * data["count"]
+    seen = 0
+    for bound, count in zip(list(buckets) + [float("inf")], data["buckets"]):
+        seen += count
+        if seen >= target:
+            return bound
+    return float("inf")
+
+def bound_text(bound):
+    # JSON has no infinity; observations past the last bucket are reported like Prometheus does.
+    return "+Inf" if bound == float("inf") else bound
+
+def summarize(snapshot):
+    # Compact per-run summary: count/mean/p50/p95 per histogram, totals per counter.
+    histograms = {}
+    for name, labels, data in snapshot.get("histograms", []):
+        label_text = ",".join(f"{k}={v}" for k, v in labels)
+        histograms[f"{name}{{{label_text}}}"] = {
+            "count": data["count"],
+            "mean": round(data["sum"] / data["count"], 4) if data["count"] else None,
+            "p50": bound_text(quantile(data, 0.5)),
+            "p95": bound_text(quantile(data, 0.95)),
+            "total_seconds": round(data["sum"], 3),
+        }
+    counters = {
+        f"{name}{{{','.join(f'{k}={v}' for k, v in labels)}}}": value
+        for name, labels, value in snapshot.get("counters", [])
+    }
+    return {"histograms": histograms, "counters": counters}
+
+def format_labels(labels, extra=()):
+    pairs = [(k, v) for k, v in labels] + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"') for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+def prometheus_text(snapshot, buckets=BUCKETS):
+    lines = []
+    typed = set()
+
+    def header(name, kind):
+        if name not in typed:
+            typed.add(name)
+            if name in HELP:
+                lines.append(f"# HELP {name} {HELP[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+
+    for name, labels, value in sorted(snapshot.get("counters", [])):
+        header(name, "counter")
+        lines.append(f"{name}{format_labels(labels)} {value}")
+    for name, labels, data in sorted(snapshot.get("histograms", []), key=lambda h: (h[0], h[1])):
+        header(name, "histogram")
+        cumulative = 0
+        for bound, count in zip(list(buckets) + ["+Inf"], data["buckets"]):
+            cumulative += count
+            lines.append(f"{name}_bucket{format_labels(labels, [('le', bound)])} {cumulative}")
+        lines.append(f"{name}_sum{format_labels(labels)} {data['sum']}")
+        lines.append(f"{name}_count{format_labels(labels)} {data['count']}")
+    return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+def inc(name, amount=1, **labels):
+    registry.inc(name, amount, **labels)
+
+def event(name, **labels):
+    registry.inc(EVENTS, event=name, **labels)
+
+def observe(stage, seconds, **labels):
+    registry.observe(STAGE_SECONDS, seconds, stage=stage, **labels)
+
+@contextmanager
+def timed(stage, metric=STAGE_SECONDS, **labels):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.observe(metric, time.perf_counter() - started, stage=stage, **labels)
+
+def run_summary(before):
+    # Summary of everything this process recorded since `before` (a registry snapshot).
+    return summarize(diff(registry.snapshot(), before))
+
+def usage_value(usage, *names):
+    for name in names:
+        value = usage.get(name) if isinstance(usage, dict) else getattr(usage, name, None)
+        if value:
+            return value
+    return 0
+
+def record_llm_call(model, purpose, usage=None):
+    # usage: the response's usage object or dict (chat: prompt/completion_tokens, responses: input/output_tokens).
+    registry.inc(LLM_CALLS, model=model, purpose=purpose)
+    if usage is None:
+        return
+    registry.inc(LLM_TOKENS, usage_value(usage, "prompt_tokens", "input_tokens"), model=model, kind="prompt")
+    registry.inc(LLM_TOKENS, usage_value(usage, "completion_tokens", "output_tokens"), model=model, kind="completion")
+
+
+def save_snapshot(conn, pid=None):
+    with conn:
+        conn.execute(METRICS_SCHEMA)
+        conn.execute(
+            "INSERT OR REPLACE INTO metrics (pid, updated_at, data) VALUES (?, ?, ?)",
+            (pid or os.getpid(), time.time(), json.dumps(registry.snapshot())),
+        )
+
+def load_snapshots(conn, exclude_pid=None):
+    with conn:
+        conn.execute(METRICS_SCHEMA)
+        conn.execute("DELETE FROM metrics WHERE updated_at < ?", (time.time() - SNAPSHOT_MAX_AGE,))
+    rows = conn.execute("SELECT pid, data FROM metrics").fetchall()
+    return [json.loads(data) for pid, data in rows if pid != exclude_pid]
+
+def all_metrics(conn):
+    # This process's live registry plus the latest snapshot of every other process.
+    return merge(load_snapshots(conn, exclude_pid=os.getpid()) + [registry.snapshot()])
+
+
+_exporter = None
+_exporter_lock = threading.Lock()
+
+def start_exporter(interval=EXPORT_INTERVAL):
+    # Saves this process's metrics every `interval` seconds; call once from long-running workers.
+    global _exporter
+    from JunkStore import connect
+
+    def export():
+        conn = connect()
+        while True:
+            time.sleep(interval)
+            try:
+                save_snapshot(conn)
+            except Exception as e:
+                print(f"[Metrics] Could not save snapshot: {e}")
+
+    with _exporter_lock:
+        if _exporter is None:
+            _exporter = threading.Thread(target=export, name="MetricsExporter", daemon=True)
+            _exporter.start()
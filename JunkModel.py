@@ -0,0 +1,233 @@
+# JunkModel.py
+# Local valuation model trained on lots that have already been researched. Each lot is a set of text features
+# (the keyword shingles JunkCluster fingerprints, plus prefilter category flags) weighted by IDF, and a new lot
+# is valued from its nearest analysed neighbours by cosine similarity. When the neighbours agree and the whole
+# estimate range is far from the bargain line, the lot skips query generation, search and the gpt-4o valuation.
+import argparse
+import heapq
+import math
+import re
+import statistics
+import threading
+import time
+from collections import defaultdict, namedtuple
+from JunkCluster import shingles, stated_quantity
+from JunkCompare import BARGAIN_THRESHOLD, BUYER_PREMIUM, is_bargain
+from JunkFilter import get_prefilter, is_art_item
+from JunkMetrics import event, timed
+from JunkStore import BARGAIN, DB_NAME, DROPPED, connect, get_writer
+
+MODEL = "model"              # lot_items.valued_by of lots valued here; they are never trained on
+NEIGHBOURS = 10
+MIN_NEIGHBOURS = 3
+MIN_SIMILARITY = 0.35        # cosine similarity a neighbour needs to count
+MAX_SPREAD = math.log(2)     # neighbours' values may disagree by about a factor of two
+DECISION_MARGIN = 2.0        # the estimate range must clear the bargain line by this factor either way
+MIN_TRAINING_LOTS = 200      # below this the model is never trusted
+MAX_POSTINGS = 5000          # features shared by more lots than this are too common to find neighbours by
+REFRESH_INTERVAL = 60        # seconds between picking up newly analysed lots
+
+TRAINING_SQL = (
+    "SELECT id, name, description, url, market_value, analysed_at FROM lot_items "
+    "WHERE analysed_at > ? AND status IN (?, ?) AND market_value > 0 AND valued_by IS NULL ORDER BY analysed_at"
+)
+
+PLURAL_ES = re.compile(r"(ss|x|ch|sh)es$")
+
+Lot = namedtuple("Lot", ["features", "log_value", "name", "url", "market_value"])
+Neighbour = namedtuple("Neighbour", ["similarity", "log_value", "name", "url", "market_value"])
+Estimate = namedtuple("Estimate", ["value", "low", "high", "spread", "neighbours"])
+
+
+def singular(word):
+    # Just enough stemming for lot titles: "decanters", "glasses" and "watches" match their singular.
+    if PLURAL_ES.search(word):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+def lot_features(name, description=""):
+    features = {" ".join(singular(word) for word in shingle.split(" ")) for shingle in shingles(name, description)}
+    features.update(f"c:{category}" for category in get_prefilter().matching_categories(name, description))
+    if is_art_item(name, description):
+        features.add("c:art")
+    return features
+
+def bargain_line(bid_value, buyer_premium=BUYER_PREMIUM, threshold=BARGAIN_THRESHOLD):
+    # Market value above which a lot at this bid is a bargain (see JunkCompare.is_bargain).
+    return bid_value * (1 + buyer_premium) / threshold
+
+def decide(estimate, bid_value):
+    # "below" or "above" when the estimate is confidently on one side of the bargain line, else None.
+    if estimate is None or estimate.spread > MAX_SPREAD or not bid_value:
+        # Without a bid there is no bargain line, so those lots always get full research and sources.
+        return None
+    line = bargain_line(bid_value)
+    if estimate.high * DECISION_MARGIN < line:
+        return "below"
+    if estimate.low > line * DECISION_MARGIN:
+        return "above"
+    return None
+
+
+class ValuationModel:
+    def __init__(self, db_name=DB_NAME, min_training_lots=MIN_TRAINING_LOTS, refresh_interval=REFRESH_INTERVAL):
+        self.conn = connect(db_name)
+        self.lock = threading.Lock()
+        self.min_training_lots = min_training_lots
+        self.refresh_interval = refresh_interval
+        self.lots = {}                      # lot id -> Lot
+        self.postings = defaultdict(set)    # feature -> ids of the lots that have it
+        self.norms = {}                     # lot id -> length of its TF-IDF vector
+        self.watermark = 0.0                # analysed_at of the newest lot trained on
+        self.refreshed_at = 0.0
+
+    def idf(self, feature):
+        return math.log((len(self.lots) + 1) / (len(self.postings.get(feature, ())) + 1)) + 1
+
+    def norm(self, features):
+        return math.sqrt(sum(self.idf(feature) ** 2 for feature in features))
+
+    def add(self, item_id, name, description, url, market_value):
+        # A re-analysed lot replaces its old entry.
+        self.remove(item_id)
+        features = frozenset(lot_features(name, description))
+        if not features:
+            return
+        log_value = math.log(market_value / stated_quantity(name))
+        self.lots[item_id] = Lot(features, log_value, name, url, market_value)
+        for feature in features:
+            self.postings[feature].add(item_id)
+
+    def remove(self, item_id):
+        lot = self.lots.pop(item_id, None)
+        if lot is None:
+            return
+        for feature in lot.features:
+            self.postings[feature].discard(item_id)
+            if not self.postings[feature]:
+                del self.postings[feature]
+        self.norms.pop(item_id, None)
+
+    def train(self, rows):
+        # rows: (id, name, description, url, market value). IDF shifts as lots are added, so every norm is redone.
+        for item_id, name, description, url, market_value in rows:
+            self.add(item_id, name, description, url, market_value)
+        self.norms = {item_id: self.norm(lot.features) for item_id, lot in self.lots.items()}
+
+    def refresh(self, force=False):
+        # Incremental retraining: picks up lots analysed since the last refresh. Call with the lock held.
+        now = time.time()
+        if not force and now - self.refreshed_at < self.refresh_interval:
+            return 0
+        self.refreshed_at = now
+        rows = self.conn.execute(TRAINING_SQL, (self.watermark, BARGAIN, DROPPED)).fetchall()
+        if rows:
+            self.train([row[:5] for row in rows])
+            self.watermark = rows[-1][5]
+        return len(rows)
+
+    def neighbours(self, features, k=NEIGHBOURS):
+        weights = {feature: self.idf(feature) for feature in features}
+        query_norm = math.sqrt(sum(weight * weight for weight in weights.values()))
+        dots = defaultdict(float)
+        for feature, weight in weights.items():
+            ids = self.postings.get(feature)
+            if not ids or len(ids) > MAX_POSTINGS:
+                continue
+            for item_id in ids:
+                dots[item_id] += weight * weight
+        scored = [(dot / (query_norm * self.norms[item_id]), item_id) for item_id, dot in dots.items()
+                  if self.norms.get(item_id)]
+        return [Neighbour(similarity, *self.lots[item_id][1:]) for similarity, item_id in heapq.nlargest(k, scored)]
+
+    def estimate(self, name, description=""):
+        # Similarity-weighted mean of the neighbours' log value per item, scaled by this lot's quantity;
+        # low/high are one weighted standard deviation either side. None when too few lots are similar.
+        features = lot_features(name, description)
+        with self.lock:
+            self.refresh()
+            if len(self.lots) < self.min_training_lots or not features:
+                return None
+            neighbours = [n for n in self.neighbours(features) if n.similarity >= MIN_SIMILARITY]
+        if len(neighbours) < MIN_NEIGHBOURS:
+            return None
+        total = sum(n.similarity for n in neighbours)
+        mean = sum(n.similarity * n.log_value for n in neighbours) / total
+        spread = math.sqrt(sum(n.similarity * (n.log_value - mean) ** 2 for n in neighbours) / total)
+        quantity = stated_quantity(name)
+        return Estimate(
+            round(math.exp(mean) * quantity, 2), math.exp(mean - spread) * quantity,
+            math.exp(mean + spread) * quantity, spread, neighbours,
+        )
+
+    def valuation(self, name, description, bid_value, item_id=None, url=None):
+        # Returns (value, urls, reasoning) like local_valuation when the lot can skip research, else None.
+        with timed("model"):
+            estimate = self.estimate(name, description)
+        side = decide(estimate, bid_value)
+        if side is None:
+            event("model_unsure")
+            return None
+        event("model_skip", side=side)
+        if item_id is not None or url is not None:
+            get_writer().set_valued_by(MODEL, item_id=item_id, url=url)
+        reasoning = (
+            f"Estimated by the local model from {len(estimate.neighbours)} similar analysed lots "
+            f"(€{estimate.low:.2f}–€{estimate.high:.2f}), well {side} the bargain line of "
+            f"€{bargain_line(bid_value):.2f}."
+        )
+        print(f"[Model] Valued '{name}' at €{estimate.value} ({side} the bargain line); research skipped.")
+        return estimate.value, [(n.url, f"€{n.market_value:.2f}") for n in estimate.neighbours[:3]], reasoning
+
+
+def evaluate(db_name=DB_NAME, holdout=0.2):
+    # Trains on the oldest analysed lots and replays the newest: how many would have skipped research,
+    # how often the skip agrees with the researched bargain decision, and the median error of the estimates.
+    conn = connect(db_name)
+    rows = conn.execute(
+        "SELECT id, bid_value, name, description, url, market_value FROM lot_items "
+        "WHERE status IN (?, ?) AND market_value > 0 AND valued_by IS NULL ORDER BY analysed_at",
+        (BARGAIN, DROPPED),
+    ).fetchall()
+    conn.close()
+    split = int(len(rows) * (1 - holdout))
+    model = ValuationModel(db_name, min_training_lots=0, refresh_interval=float("inf"))
+    model.train([(row[0],) + row[2:] for row in rows[:split]])
+    skipped = agreed = 0
+    errors = []
+    for _, bid_value, name, description, _, market_value in rows[split:]:
+        estimate = model.estimate(name, description)
+        if estimate is None:
+            continue
+        errors.append(abs(estimate.value - market_value) / market_value)
+        side = decide(estimate, bid_value)
+        if side:
+            skipped += 1
+            agreed += (side == "above") == is_bargain(bid_value, market_value)
+    tested = len(rows) - split
+    print(f"Trained on {split} lots, tested on {tested}.")
+    if errors:
+        print(f"Estimated {len(errors)} lots; median error {statistics.median(errors):.0%}.")
+    if tested:
+        print(f"Would skip research for {skipped} ({skipped / tested:.0%}); "
+              f"{agreed} of those match the researched decision.")
+
+
+_model = None
+_model_lock = threading.Lock()
+
+def get_valuation_model():
+    global _model
+    with _model_lock:
+        if _model is None:
+            _model = ValuationModel()
+        return _model
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate the local valuation model on past analysed lots.")
+    parser.add_argument("--holdout", type=float, default=0.2, help="share of the newest lots to test on")
+    args = parser.parse_args()
+    evaluate(holdout=args.holdout)
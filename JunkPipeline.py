@@ -0,0 +1,248 @@
+# JunkPipeline.py
+# Streams lots through scrape -> prefilter -> cluster -> query-gen -> search -> page fetch -> valuation -> persist.
+# Each stage has its own worker count and a bounded queue in front of it, so one slow Google fetch
+# only holds up its own worker instead of the whole batch.
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from JunkReader import CRAWL_WORKERS, crawl_auction_items
+from JunkResearcher import (
+    analyze_market_value, assess_bargain, fetch_comparable_pages,
+    fetch_pending_items, generate_search_query, is_art_item, search_comparable_urls, valuation_cache_key,
+)
+from JunkCache import get_cache
+from JunkCluster import get_clusterer, share
+from JunkComparables import local_valuation
+from JunkFilter import get_prefilter
+from JunkLimits import RetryLater, backoff_delay
+from JunkMetrics import timed
+from JunkModel import get_valuation_model
+from JunkSites import adapter_for
+from JunkStore import DROPPED, FAILED, connect, get_writer, next_retry_at
+
+QUEUE_SIZE = 100
+STAGE_CONCURRENCY = {
+    "prefilter": 1,
+    "cluster": 4,    # members wait here while their representative is researched
+    "query": 4,
+    "search": 2,     # Google throttles hard; keep this low
+    "fetch": 8,
+    "valuation": 4,
+    "persist": 1,
+}
+
+
+def prefilter_stage(item):
+    decision = get_prefilter().check(item['name'], item['description'], item['bid_value'])
+    if not decision.keep:
+        print(f"[Analysis Skipped] {item['name']}: dropped by prefilter ({decision.rule}).")
+        item['outcome'] = (f"Dropped: {decision.reason}", DROPPED, None)
+    return item
+
+def cluster_stage(item):
+    # Near-duplicates of a lot that was already valued (or is being valued) take its value, scaled by quantity.
+    clusterer = get_clusterer()
+    assignment = clusterer.assign(item['name'], item['description'], item_id=item.get('id'), url=item.get('url'))
+    if assignment is None:
+        return item
+    valuation = assignment.valuation
+    if not valuation and not assignment.researcher:
+        valuation = clusterer.wait(assignment.cluster_id)
+    if valuation:
+        comp_price, urls, reasoning = share(valuation, assignment.quantity)
+        item['outcome'] = assess_bargain(item['bid_value'], comp_price, urls, reasoning) + (comp_price,)
+    elif assignment.researcher:
+        item['cluster'] = assignment
+    return item
+
+def query_stage(item):
+    item['is_art'] = is_art_item(item['name'], item['description'])
+    cached_result = get_cache().get(valuation_cache_key(item))
+    if cached_result:
+        comp_price, urls, reasoning = item['valuation'] = cached_result
+        item['outcome'] = assess_bargain(item['bid_value'], comp_price, urls, reasoning) + (comp_price,)
+        return item
+    local = local_valuation(item['name'])
+    if local:
+        comp_price, urls, reasoning = item['valuation'] = local
+        item['outcome'] = assess_bargain(item['bid_value'], comp_price, urls, reasoning) + (comp_price,)
+        return item
+    estimate = get_valuation_model().valuation(
+        item['name'], item['description'], item['bid_value'], item_id=item.get('id'), url=item.get('url'),
+    )
+    if estimate:
+        # Not set as item['valuation']: a model estimate is never shared with the lot's cluster.
+        comp_price, urls, reasoning = estimate
+        item['outcome'] = assess_bargain(item['bid_value'], comp_price, urls, reasoning) + (comp_price,)
+        return item
+    item['query'] = generate_search_query(item, item['is_art'])
+    if not item['query']:
+        item['outcome'] = ("Failed to generate search query.", FAILED, None)
+    return item
+
+def search_stage(item):
+    item['candidate_urls'] = search_comparable_urls(item['query'], item['is_art'])
+    return item
+
+def fetch_stage(item):
+    item['scraped_text'], item['urls'] = fetch_comparable_pages(item['candidate_urls'])
+    return item
+
+def valuation_stage(item):
+    comp_price, reasoning = analyze_market_value(item['scraped_text'])
+    if comp_price is not None:
+        get_cache().set(valuation_cache_key(item), (comp_price, item['urls'], reasoning))
+    item['valuation'] = (comp_price, item['urls'], reasoning)
+    item['outcome'] = assess_bargain(item['bid_value'], comp_price, item['urls'], reasoning) + (comp_price,)
+    return item
+
+def persist_stage(item):
+    writer = get_writer()
+    assignment = item.pop('cluster', None)
+    if assignment:
+        # The representative's value goes to its cluster; waiting members are released either way.
+        if item.get('valuation'):
+            comp_price, urls, reasoning = item['valuation']
+            get_clusterer().record(assignment.cluster_id, comp_price, assignment.quantity, urls, reasoning)
+        get_clusterer().release(assignment.cluster_id)
+    if item.get('retry'):
+        error = item.pop('retry')
+        delay = error.retry_after if error.retry_after is not None else backoff_delay(3)
+        writer.schedule_retry(time.time() + delay, str(error), item_id=item.get('id'), url=item.get('url'))
+        print(f"[Retry] {item['name']}: back on the queue in {delay:.0f}s ({error})")
+        return item
+    analysis, status, market_value = item['outcome']
+    if item.get('id') is not None:
+        writer.update_analysis(item['id'], analysis, status, market_value)
+    else:
+        writer.update_analysis_by_url(item['url'], analysis, status, market_value)
+    print(f"[Analysis Completed] {item['name']}: {analysis}")
+    return item
+
+STAGES = [
+    ("prefilter", prefilter_stage),
+    ("cluster", cluster_stage),
+    ("query", query_stage),
+    ("search", search_stage),
+    ("fetch", fetch_stage),
+    ("valuation", valuation_stage),
+    ("persist", persist_stage),
+]
+
+
+class Pipeline:
+    def __init__(self, stages=STAGES, concurrency=None, queue_size=QUEUE_SIZE, run_id=None):
+        # With a run_id, only that run's lots are taken back from the retry queue.
+        self.stages = stages
+        self.run_id = run_id
+        self.concurrency = dict(STAGE_CONCURRENCY, **(concurrency or {}))
+        self.queue_size = queue_size
+        self.queues = {}
+        self.loop = None
+        self.workers = []
+        self.processed = {name: 0 for name, _ in stages}
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        # Enough threads for every stage worker plus the scraper.
+        self.loop.set_default_executor(ThreadPoolExecutor(max_workers=sum(self.concurrency.values()) + 4))
+        self.queues = {name: asyncio.Queue(self.queue_size) for name, _ in self.stages}
+        for index, (name, func) in enumerate(self.stages):
+            next_name = self.stages[index + 1][0] if index + 1 < len(self.stages) else None
+            for _ in range(self.concurrency.get(name, 1)):
+                self.workers.append(asyncio.create_task(self.stage_worker(name, func, next_name)))
+
+    async def stage_worker(self, name, func, next_name):
+        persist_name = self.stages[-1][0]
+        queue = self.queues[name]
+        while True:
+            item = await queue.get()
+            try:
+                # Stage functions are blocking (requests, OpenAI, sqlite); run them off the event loop.
+                with timed(name, metric="junk_pipeline_seconds"):
+                    item = await asyncio.to_thread(func, item)
+                self.processed[name] += 1
+                if next_name is not None and item.get('url'):
+                    # Last completed stage per lot, so a resumed run can see how far each lot got.
+                    get_writer().set_stage(item['url'], name)
+            except RetryLater as e:
+                # Rate limited past the retry budget: persist puts the lot back on the retry queue.
+                print(f"[Pipeline] {name} rate limited for {item.get('name')}: {e}")
+                item['retry'] = e
+                item['outcome'] = None
+            except Exception as e:
+                print(f"[Pipeline] {name} failed for {item.get('name')}: {e}")
+                item['outcome'] = (f"Failed: {name} error.", FAILED, None)
+            try:
+                if next_name is not None:
+                    # Finished lots (dropped, failed, cached) skip straight to persist.
+                    await self.queues[persist_name if 'outcome' in item else next_name].put(item)
+            finally:
+                # Only mark done once the item is in the next queue, so drain() cannot miss it.
+                queue.task_done()
+
+    async def put(self, item):
+        await self.queues[self.stages[0][0]].put(item)
+
+    def submit(self, url, name, current_bid, description):
+        # Called from scraper threads; blocks while the first queue is full, which throttles the crawl.
+        item = {
+            'url': url, 'name': name, 'description': description,
+            'bid_value': adapter_for(url).parse_bid(current_bid),
+        }
+        asyncio.run_coroutine_threadsafe(self.put(item), self.loop).result()
+
+    async def join(self):
+        # Queues are joined in stage order; an item only ever moves forward, so this empties the pipeline.
+        for name, _ in self.stages:
+            await self.queues[name].join()
+
+    async def retry_pending(self):
+        # Lots that hit a rate limit wait on the retry queue; feed them back in as they come due.
+        while True:
+            get_writer().flush()
+            conn = connect()
+            retry_at = next_retry_at(conn, self.run_id)
+            conn.close()
+            if retry_at is None:
+                return
+            await asyncio.sleep(max(0.0, retry_at - time.time()))
+            conn = connect()
+            items = fetch_pending_items(conn, run_id=self.run_id)
+            conn.close()
+            for item in items:
+                await self.put(item)
+            await self.join()
+
+    async def drain(self):
+        await self.join()
+        await self.retry_pending()
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+
+
+async def run_pipeline(start_url, max_items=1000, workers=CRAWL_WORKERS, catalogue_url=None, enumerate_lots=False,
+                       concurrency=None, run_id=None):
+    pipeline = Pipeline(concurrency=concurrency, run_id=run_id)
+    await pipeline.start()
+
+    # Lots left pending by an earlier (or interrupted) attempt at this run go in first; new lots are pushed by
+    # the scraper as they are saved. Lots that were already analysed are never queued again.
+    conn = connect()
+    for item in fetch_pending_items(conn, run_id=run_id):
+        await pipeline.put(item)
+    conn.close()
+
+    if start_url:
+        await asyncio.to_thread(
+            crawl_auction_items, start_url, max_items, workers, catalogue_url, enumerate_lots, pipeline.submit, run_id
+        )
+    await pipeline.drain()
+    get_writer().flush()
+    print(f"✅ Pipeline completed: {pipeline.processed}")
+    print(f"[Prefilter] {get_prefilter().stats()}")
+    return pipeline.processed
+
+def main(start_url, max_items=1000, workers=CRAWL_WORKERS, catalogue_url=None, enumerate_lots=False, run_id=None):
+    return asyncio.run(run_pipeline(start_url, max_items, workers, catalogue_url, enumerate_lots, run_id=run_id))
@@ -0,0 +1,218 @@
+# JunkPrice.py
+# Shared price extraction: structured data (JSON-LD offers, og/product meta, itemprop) first, then a single
+# regex pass over the visible text. Every candidate carries a confidence score and its value in EUR.
+import html
+import json
+import os
+import re
+import threading
+import time
+from collections import namedtuple
+
+RATES_FILE = "exchange_rates.json"
+RATES_URL = "https://www.ecb.europa.eu/stats/eurofxref/eurofxref-daily.xml"
+RATES_TTL = 24 * 3600
+# Units of each currency per euro, used when the ECB table cannot be fetched.
+DEFAULT_RATES = {"EUR": 1.0, "GBP": 0.85, "USD": 1.08}
+
+MIN_PRICE = 1
+MAX_PRICE = 1_000_000
+CONTEXT_CHARS = 60
+NEAR_CHARS = 30  # how far before a price a keyword may be to change its confidence
+
+PriceCandidate = namedtuple("PriceCandidate", ["amount", "currency", "eur", "confidence", "source", "context"])
+
+CURRENCY_CODES = {"€": "EUR", "£": "GBP", "$": "USD", "EUR": "EUR", "GBP": "GBP", "USD": "USD", "EURO": "EUR",
+                  "EUROS": "EUR"}
+_SYMBOL = r"€|£|\$|\bEUR\b|\bGBP\b|\bUSD\b"
+_NUMBER = r"\d{1,3}(?:[.,\s]\d{3})+(?:[.,]\d{1,2})?|\d+(?:[.,]\d{1,2})?"
+PRICE_PATTERN = re.compile(
+    rf"(?P<before>{_SYMBOL})\s?(?P<amount>{_NUMBER})(?!\d)|(?<![\d.,])(?P<amount2>{_NUMBER})\s?(?P<after>€|\bEUR\b|\bGBP\b|\bUSD\b|(?i:\beuros?\b))"
+)
+TAG_PATTERN = re.compile(r"(?is)<(script|style|noscript)\b.*?</\1>|<!--.*?-->|<[^>]+>")
+JSON_LD_PATTERN = re.compile(r'(?is)<script[^>]+type=["\']application/ld\+json["\'][^>]*>(.*?)</script>')
+META_PATTERN = re.compile(r"(?is)<meta\b[^>]*>")
+ITEMPROP_PATTERN = re.compile(r'(?is)<[^>]+itemprop=["\'](price|priceCurrency)["\'][^>]*>')
+ATTR_PATTERN = re.compile(r'([\w:-]+)\s*=\s*["\']([^"\']*)["\']')
+
+POSITIVE_CONTEXT = re.compile(r"(?i)\b(price|sold|hammer|realised|realized|buy it now|current bid|estimate|now|only)\b")
+NEGATIVE_CONTEXT = re.compile(r"(?i)\b(shipping|delivery|postage|p&p|fee|fees|cookie|voucher|save|off|from|free over|min(imum)? order)\b")
+
+
+def parse_amount(text, currency="EUR"):
+    # Handles 1,234.56 (UK/US), 1.234,56 and 1 234,56 (European), 12,50 and 1.500.
+    text = re.sub(r"\s", "", text)
+    if "," in text and "." in text:
+        decimal = "," if text.rfind(",") > text.rfind(".") else "."
+    elif "," in text:
+        decimal = None if re.fullmatch(r"\d{1,3}(,\d{3})+", text) else ","
+    elif "." in text:
+        thousands = re.fullmatch(r"\d{1,3}(\.\d{3})+", text)
+        decimal = None if thousands and (currency == "EUR" or text.count(".") > 1) else "."
+    else:
+        decimal = None
+    if decimal is None:
+        digits = re.sub(r"[.,]", "", text)
+    else:
+        thousands_sep = "." if decimal == "," else ","
+        digits = text.replace(thousands_sep, "").replace(decimal, ".")
+    try:
+        return float(digits)
+    except ValueError:
+        return None
+
+
+class RateTable:
+    def __init__(self, path=RATES_FILE, ttl=RATES_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.rates = None
+        self.lock = threading.Lock()
+
+    def get(self):
+        with self.lock:
+            if self.rates is None:
+                self.rates = self.load()
+            return self.rates
+
+    def load(self):
+        cached = None
+        if os.path.exists(self.path):
+            try:
+                with open(self.path) as f:
+                    cached = json.load(f)
+            except (OSError, ValueError):
+                cached = None
+        if cached and time.time() - cached.get("fetched_at", 0) < self.ttl:
+            return cached["rates"]
+        fetched = self.fetch()
+        if fetched:
+            try:
+                with open(self.path, "w") as f:
+                    json.dump({"fetched_at": time.time(), "rates": fetched}, f)
+            except OSError as e:
+                print(f"[Rates] Could not cache rates: {e}")
+            return fetched
+        return cached["rates"] if cached else dict(DEFAULT_RATES)
+
+    def fetch(self):
+        import requests
+        try:
+            response = requests.get(RATES_URL, timeout=10)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            print(f"[Rates] Using cached/default exchange rates: {e}")
+            return None
+        rates = {code: float(rate) for code, rate in re.findall(r"currency='(\w{3})' rate='([\d.]+)'", response.text)}
+        rates["EUR"] = 1.0
+        return rates if len(rates) > 1 else None
+
+
+_rates = RateTable()
+
+def to_eur(amount, currency):
+    if amount is None:
+        return None
+    rate = _rates.get().get(currency) or DEFAULT_RATES.get(currency)
+    return round(amount / rate, 2) if rate else None
+
+def make_candidate(amount, currency, confidence, source, context=""):
+    if amount is None or not MIN_PRICE <= amount <= MAX_PRICE:
+        return None
+    eur = to_eur(amount, currency)
+    if eur is None:
+        return None
+    return PriceCandidate(amount, currency, eur, round(min(max(confidence, 0.0), 1.0), 2), source, context)
+
+def json_ld_offers(node):
+    if isinstance(node, list):
+        for child in node:
+            yield from json_ld_offers(child)
+    elif isinstance(node, dict):
+        if "price" in node or "lowPrice" in node:
+            yield node
+        for key in ("offers", "@graph", "mainEntity", "itemOffered"):
+            if key in node:
+                yield from json_ld_offers(node[key])
+
+def structured_candidates(page_html):
+    candidates = []
+    for block in JSON_LD_PATTERN.findall(page_html):
+        try:
+            data = json.loads(html.unescape(block.strip()))
+        except ValueError:
+            continue
+        for offer in json_ld_offers(data):
+            currency = str(offer.get("priceCurrency") or "EUR").upper()
+            price = offer.get("price", offer.get("lowPrice"))
+            try:
+                amount = float(price)  # schema.org prices always use '.' as the decimal point
+            except (TypeError, ValueError):
+                amount = parse_amount(str(price), currency)
+            candidates.append(make_candidate(amount, currency, 0.95, "json-ld"))
+
+    meta = {}
+    for tag in META_PATTERN.findall(page_html):
+        attrs = dict((k.lower(), v) for k, v in ATTR_PATTERN.findall(tag))
+        key = (attrs.get("property") or attrs.get("name") or attrs.get("itemprop") or "").lower()
+        if key:
+            meta[key] = attrs.get("content", "")
+    for prefix in ("og:price", "product:price"):
+        if meta.get(f"{prefix}:amount"):
+            currency = (meta.get(f"{prefix}:currency") or "EUR").upper()
+            amount = parse_amount(meta[f"{prefix}:amount"], currency)
+            candidates.append(make_candidate(amount, currency, 0.9, prefix))
+
+    itemprops = {}
+    for match in ITEMPROP_PATTERN.finditer(page_html):
+        attrs = dict((k.lower(), v) for k, v in ATTR_PATTERN.findall(match.group(0)))
+        if attrs.get("content"):
+            itemprops.setdefault(match.group(1), attrs["content"])
+    if itemprops.get("price"):
+        currency = (itemprops.get("priceCurrency") or "EUR").upper()
+        candidates.append(make_candidate(parse_amount(itemprops["price"], currency), currency, 0.85, "itemprop"))
+    return [c for c in candidates if c]
+
+def text_candidates(text):
+    # One linear regex pass; confidence depends on the words just before the price.
+    candidates = []
+    for match in PRICE_PATTERN.finditer(text):
+        symbol = match.group("before") or match.group("after")
+        currency = CURRENCY_CODES[symbol.strip().upper()]
+        amount = parse_amount(match.group("amount") or match.group("amount2"), currency)
+        context = text[max(0, match.start() - CONTEXT_CHARS):match.end() + 20]
+        before = text[max(0, match.start() - NEAR_CHARS):match.start()]
+        confidence = 0.5
+        if POSITIVE_CONTEXT.search(before):
+            confidence += 0.2
+        if NEGATIVE_CONTEXT.search(before):
+            confidence -= 0.3
+        candidates.append(make_candidate(amount, currency, confidence, "text", " ".join(context.split())))
+    return [c for c in candidates if c]
+
+def page_text(page_html):
+    return " ".join(html.unescape(TAG_PATTERN.sub(" ", page_html)).split())
+
+def extract_prices(page_html):
+    # All price candidates on the page, most confident first.
+    candidates = structured_candidates(page_html) + text_candidates(page_text(page_html))
+    return sorted(candidates, key=lambda c: c.confidence, reverse=True)
+
+def best_price(page_html, min_confidence=0.4):
+    candidates = extract_prices(page_html)
+    return candidates[0] if candidates and candidates[0].confidence >= min_confidence else None
+
+def format_eur(candidate):
+    return f"€{candidate.eur:.2f}" if candidate else None
+
+def extract_value_from_reply(reply):
+    # Market value from an LLM reply: the most confident amount that carries a currency, or the reply itself
+    # when it is nothing but a number. Other bare numbers (listing counts, years) are never taken as the value.
+    if not reply or reply.strip().lower().startswith("none"):
+        return None
+    candidates = text_candidates(reply)
+    if candidates:
+        return max(candidates, key=lambda c: c.confidence).eur
+    if re.fullmatch(_NUMBER, reply.strip()):
+        return parse_amount(reply.strip(), "EUR")
+    return None
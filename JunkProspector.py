@@ -1,15 +1,94 @@
+import argparse
+import json
 import sys
-from concurrent.futures import ThreadPoolExecutor
-from JunkReader import scrape_auction_items
-from JunkResearcher import analyze_items
+import threading
+import JunkPipeline
+from JunkReader import CRAWL_WORKERS, crawl_auction_items
+from JunkMetrics import registry, run_summary
+from JunkResearcher import analyze_items_batched
+from JunkStore import COMPLETED, CRASHED, connect, create_run, get_run, get_writer
 
-def main(start_url):
-    with ThreadPoolExecutor(max_workers=2) as executor:
-        executor.submit(scrape_auction_items, start_url)
-        executor.submit(analyze_items)
+def start_run(start_url, workers=CRAWL_WORKERS, catalogue_url=None, enumerate_lots=False, max_items=1000, batch=False):
+    options = {
+        "workers": workers, "catalogue_url": catalogue_url, "enumerate_lots": enumerate_lots,
+        "max_items": max_items, "batch": batch,
+    }
+    run_id = create_run(start_url, options)
+    print(f"[Run {run_id}] Started for {start_url} (resume with --resume {run_id}).")
+    return run_id
+
+def resume_run(run_id):
+    # The run's own options are reused so the frontier picks up exactly where it stopped.
+    conn = connect()
+    run = get_run(conn, run_id)
+    conn.close()
+    if run is None:
+        sys.exit(f"Unknown run: {run_id}")
+    print(f"[Run {run_id}] Resuming {run['start_url']} (was {run['status']}).")
+    return run
+
+def finish_run(writer, run_id, status, before):
+    # Stores what this run measured (stage latencies, cache hits, tokens) next to the run's status.
+    summary = run_summary(before)
+    writer.save_run_metrics(run_id, summary)
+    writer.finish_run(run_id, status)
+    writer.flush()
+    print(f"[Run {run_id}] Metrics: {json.dumps(summary, indent=2)}")
+
+def main(start_url, workers=CRAWL_WORKERS, catalogue_url=None, enumerate_lots=False, max_items=1000, batch=False,
+         run_id=None):
+    if run_id is None:
+        run_id = start_run(start_url, workers, catalogue_url, enumerate_lots, max_items, batch)
+    writer = get_writer()
+    before = registry.snapshot()
+    try:
+        if not batch:
+            # Scraped lots are pushed straight into the staged research pipeline.
+            JunkPipeline.main(start_url, max_items, workers, catalogue_url, enumerate_lots, run_id)
+        else:
+            # Research drains the pending lots once the crawl is over; a daemon thread, so a failed crawl
+            # is marked CRASHED straight away instead of waiting on it.
+            crawl_done = threading.Event()
+            errors = []
+
+            def research():
+                try:
+                    analyze_items_batched(crawl_done, run_id)
+                except BaseException as e:
+                    errors.append(e)
+
+            research_thread = threading.Thread(target=research, name="Research", daemon=True)
+            research_thread.start()
+            try:
+                crawl_auction_items(start_url, max_items, workers, catalogue_url, enumerate_lots, None, run_id)
+            finally:
+                crawl_done.set()
+            research_thread.join()
+            if errors:
+                raise errors[0]
+    except BaseException:
+        finish_run(writer, run_id, CRASHED, before)
+        raise
+    finish_run(writer, run_id, COMPLETED, before)
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Usage: python JunkProspector.py [START_URL]")
+    parser = argparse.ArgumentParser(description="Scrape an auction sale and analyse its lots.")
+    parser.add_argument("start_url", nargs="?", help="URL of the first lot")
+    parser.add_argument("--resume", type=int, metavar="RUN", help="continue an earlier run from its checkpoint")
+    parser.add_argument("--workers", type=int, default=CRAWL_WORKERS, help="number of parallel browser workers")
+    parser.add_argument("--catalogue", dest="catalogue_url", help="catalogue/listing page to collect lot URLs from")
+    parser.add_argument("--enumerate", dest="enumerate_lots", action="store_true",
+                        help="generate lot URLs by counting up from the lot number in START_URL")
+    parser.add_argument("--max-items", type=int, default=1000)
+    parser.add_argument("--batch", action="store_true", help="research lots in batched LLM calls")
+    args = parser.parse_args()
+    if args.resume is not None:
+        run = resume_run(args.resume)
+        options = run["options"]
+        main(run["start_url"], options.get("workers", CRAWL_WORKERS), options.get("catalogue_url"),
+             options.get("enumerate_lots", False), options.get("max_items", 1000), options.get("batch", False),
+             run["id"])
+    elif args.start_url:
+        main(args.start_url, args.workers, args.catalogue_url, args.enumerate_lots, args.max_items, args.batch)
     else:
-        main(sys.argv[1])
+        parser.error("START_URL is required unless --resume is given")
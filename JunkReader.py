@@ -1,87 +1,709 @@
-import sqlite3
+import threading
 import time
-from urllib.parse import urljoin
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-
-DB_NAME = "auction_items.db"
-BASE_URL = "https://www.peterfrancis.co.uk"
-
-def init_db():
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS lot_items (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT,
-            current_bid TEXT,
-            description TEXT,
-            url TEXT,
-            analysis TEXT
-        )
-    ''')
-    conn.commit()
-    return conn
-
-def save_item(conn, name, current_bid, description, url):
-    c = conn.cursor()
-    c.execute('''
-        INSERT INTO lot_items (name, current_bid, description, url)
-        VALUES (?, ?, ?, ?)
-    ''', (name, current_bid, description, url))
-    conn.commit()
+from collections import deque
+from datetime import datetime
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlparse
+from JunkClients import browser_tools, new_browser, request_error
+from JunkLimits import RETRYABLE_STATUS, RetryLater, call_with_retry
+from JunkMetrics import event, timed
+from JunkSites import DEFAULT_ADAPTER, adapter_for
+from JunkStore import connect, get_writer, load_frontier
+
+CRAWL_WORKERS = 4
+PAGE_WAIT_TIMEOUT = 10
+HTTP_TIMEOUT = 10
+IDLE_WAIT = 0.5  # seconds a crawl worker waits when every sale is busy, throttled or empty
+RETRY_LATER_DELAY = 30  # seconds a host is left alone after RetryLater without a Retry-After
+MAX_LOT_RETRIES = 3  # times a lot is put back after RetryLater before it is left for a resumed run
+HTTP_HEADERS = {"User-Agent": "Mozilla/5.0 (X11; Linux x86_64) JunkProspector"}
+
+# Which fetch path works per host: "http" (plain requests) or "selenium" (needs JavaScript).
+SITE_FETCH_MODE = {}
+_site_mode_lock = threading.Lock()
+_session = None
+_pool_size = 0
+_session_lock = threading.Lock()
 
 def setup_driver():
-    options = Options()
-    options.add_argument("--headless")
-    options.add_argument("--disable-gpu")
-    return webdriver.Chrome(options=options)
+    # Selenium is only imported once a page actually needs a browser.
+    return new_browser()
+
+def wait_for_lot(driver, site=DEFAULT_ADAPTER, timeout=PAGE_WAIT_TIMEOUT):
+    # Wait for the lot title instead of a fixed sleep; parse_lot_details waits for the bid itself.
+    By, WebDriverWait, EC = browser_tools()
+    try:
+        WebDriverWait(driver, timeout).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, site.name_selector))
+        )
+        return True
+    except:
+        return False
 
-def parse_lot_details(driver):
+def parse_lot_details(driver, site=DEFAULT_ADAPTER):
+    By, WebDriverWait, EC = browser_tools()
     try:
-        lot_name = driver.find_element(By.CSS_SELECTOR, "h1.lot-desc-h1").text.strip()
+        lot_name = driver.find_element(By.CSS_SELECTOR, site.name_selector).text.strip()
     except:
         lot_name = driver.title.strip() or "Unnamed Lot"
 
     try:
-        current_bid = WebDriverWait(driver, 10).until(
-            EC.visibility_of_element_located((By.ID, "timedBid"))
+        current_bid = WebDriverWait(driver, PAGE_WAIT_TIMEOUT).until(
+            EC.visibility_of_element_located((By.CSS_SELECTOR, site.bid_selector))
         ).text.strip()
     except:
         current_bid = "N/A"
 
-    description = " ".join([elem.text.strip() for elem in driver.find_elements(By.CSS_SELECTOR, "p.translate")])
+    description = " ".join([elem.text.strip() for elem in driver.find_elements(By.CSS_SELECTOR, site.description_selector)])
     return lot_name, current_bid, description
 
-def find_next_lot_url(driver):
+def find_next_lot_url(driver, site=DEFAULT_ADAPTER):
+    By, _, _ = browser_tools()
     try:
-        next_link = driver.find_element(By.XPATH, "//a[@rel='next']").get_attribute("href")
-        return urljoin(BASE_URL, next_link) if next_link else None
+        next_link = driver.find_element(By.CSS_SELECTOR, site.next_selector).get_attribute("href")
+        return urljoin(site.base_url, next_link) if next_link else None
     except:
         return None
 
-def scrape_auction_items(start_url, max_items=1000):
-    conn = init_db()
-    driver = setup_driver()
+class LotPageParser(HTMLParser):
+    # Pulls the same fields as parse_lot_details/find_next_lot_url out of server-rendered HTML.
+    def __init__(self, site=DEFAULT_ADAPTER):
+        super().__init__()
+        self.site = site
+        self.name = ""
+        self.bid = ""
+        self.description = []
+        self.title = ""
+        self.next_href = None
+        self.closes_at = None
+        self.field = None
+        self.tag = None
+        self.depth = 0
+        self.buffer = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        selectors = self.site.selectors
+        if selectors["next"].matches(tag, attrs) and not self.next_href:
+            self.next_href = attrs.get("href")
+        if self.closes_at is None:
+            for attribute in self.site.closing_time_attributes:
+                if attrs.get(attribute):
+                    self.closes_at = parse_closing_time(attrs[attribute])
+                    break
+        if self.field:
+            if tag == self.tag:
+                self.depth += 1
+            return
+        if selectors["name"].matches(tag, attrs) and not self.name:
+            self.start_capture("name", tag)
+        elif selectors["bid"].matches(tag, attrs):
+            self.start_capture("bid", tag)
+        elif selectors["description"].matches(tag, attrs):
+            self.start_capture("description", tag)
+        elif tag == "title" and not self.title:
+            self.start_capture("title", tag)
+
+    def handle_endtag(self, tag):
+        if not self.field or tag != self.tag:
+            return
+        if self.depth:
+            self.depth -= 1
+            return
+        text = " ".join("".join(self.buffer).split())
+        if self.field == "description":
+            self.description.append(text)
+        else:
+            setattr(self, self.field, text)
+        self.field = None
+
+    def handle_data(self, data):
+        if self.field:
+            self.buffer.append(data)
+
+    def start_capture(self, field, tag):
+        self.field = field
+        self.tag = tag
+        self.depth = 0
+        self.buffer = []
+
+
+def parse_closing_time(value):
+    # Returns epoch seconds, or None if the value is not a recognisable timestamp.
+    value = value.strip()
+    if value.isdigit():
+        timestamp = int(value)
+        return timestamp / 1000 if timestamp > 10 ** 11 else float(timestamp)
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+def get_session(workers=None):
+    # One pooled session for every crawl in the process; the pool grows to two connections per crawl worker.
+    # requests is imported with the first session, so importing this module stays cheap.
+    import requests
+    from requests.adapters import HTTPAdapter
+    global _session, _pool_size
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            _session.headers.update(HTTP_HEADERS)
+        pool_size = max(workers or CRAWL_WORKERS, CRAWL_WORKERS) * 2
+        if pool_size > _pool_size:
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+            _pool_size = pool_size
+        return _session
+
+def get_site_mode(url):
+    with _site_mode_lock:
+        return SITE_FETCH_MODE.get(urlparse(url).netloc)
+
+def set_site_mode(url, mode):
+    host = urlparse(url).netloc
+    with _site_mode_lock:
+        if SITE_FETCH_MODE.get(host) != mode:
+            print(f"[Fetch] {host}: using {mode} path")
+        SITE_FETCH_MODE[host] = mode
+
+def get_page(url):
+    response = get_session().get(url, timeout=HTTP_TIMEOUT)
+    if response.status_code in RETRYABLE_STATUS:
+        response.raise_for_status()
+    return response
+
+def get_lot_page(url):
+    # Each auction host has its own "auction" budget in JunkLimits, so a 429 from one house only pauses that
+    # house; 429s and 5xx are retried with backoff.
+    with timed("page_load", mode="http"):
+        return call_with_retry(f"auction:{urlparse(url).netloc}", get_page, url, max_attempts=3)
+
+def parse_lot_page(page_html, site=DEFAULT_ADAPTER):
+    with timed("parse", mode="http"):
+        parser = LotPageParser(site)
+        parser.feed(page_html)
+        parser.close()
+    return parser
+
+def fetch_lot_http(url, site=None):
+    # Returns (name, current_bid, description, next_url, closes_at); missing fields come back empty.
+    response = get_lot_page(url)
+    if response.status_code == 404:
+        return "", "", "", None, None
+    response.raise_for_status()
+    parser = parse_lot_page(response.text, site or adapter_for(url))
+    next_url = urljoin(url, parser.next_href) if parser.next_href else None
+    return parser.name, parser.bid, " ".join(d for d in parser.description if d), next_url, parser.closes_at
+
+def has_bid(bid):
+    return bool(bid) and bid != "N/A"
+
+def fetch_bid(url, driver=None):
+    # Just the bid (and closing time when the page has one), for refreshing lots already in the DB.
+    # Returns (current_bid, closes_at, driver).
+    site = adapter_for(url)
+    http_tried = False
+    if site.needs_javascript is not True and get_site_mode(url) != "selenium":
+        try:
+            response = get_lot_page(url)
+            response.raise_for_status()
+            parser = parse_lot_page(response.text, site)
+            if parser.bid or site.needs_javascript is False:
+                return parser.bid, parser.closes_at, driver
+            # Maybe closed or without bids yet: only this lot goes to the browser (see fetch_lot).
+            http_tried = True
+        except request_error() as e:
+            # RetryLater is not caught: the host is rate limiting, so the browser would only hit it again.
+            print(f"[Fetch] HTTP error, falling back to browser: {e}")
+
+    if driver is None:
+        driver = setup_driver()
+    By, WebDriverWait, EC = browser_tools()
+    with timed("page_load", mode="browser"):
+        driver.get(url)
+        try:
+            bid = WebDriverWait(driver, PAGE_WAIT_TIMEOUT).until(
+                EC.visibility_of_element_located((By.CSS_SELECTOR, site.bid_selector))
+            ).text.strip()
+        except:
+            bid = ""
+    if http_tried and has_bid(bid):
+        set_site_mode(url, "selenium")
+    return bid, None, driver
+
+def fetch_lot(url, driver=None):
+    # HTTP fast path first; Selenium only when the site's adapter says so or the page needs JavaScript for a field.
+    # Returns (name, current_bid, description, next_url, closes_at, driver) so callers can reuse a started browser.
+    # A lot missing a field over HTTP is loaded in the browser on its own; the whole host only moves to the
+    # browser once a rendered page shows a bid its HTML did not have, since a closed lot or one without bids
+    # yet looks the same over HTTP.
+    site = adapter_for(url)
+    http_lot = None
+    if site.needs_javascript is not True and get_site_mode(url) != "selenium":
+        try:
+            name, bid, desc, next_url, closes_at = fetch_lot_http(url, site)
+            if not (name or bid or desc):
+                return "", "", "", None, None, driver
+            if name and bid or site.needs_javascript is False:
+                set_site_mode(url, "http")
+                return name, bid, desc, next_url, closes_at, driver
+            print(f"[Fetch] Missing fields over HTTP, loading this lot in the browser: {url}")
+            http_lot = (name, bid, desc, next_url, closes_at)
+        except request_error() as e:
+            # RetryLater is not caught: the host is rate limiting, so the browser would only hit it again.
+            print(f"[Fetch] HTTP error, falling back to browser: {e}")
+
+    if driver is None:
+        driver = setup_driver()
+    with timed("page_load", mode="browser"):
+        driver.get(url)
+        found = wait_for_lot(driver, site)
+    if not found:
+        return http_lot + (driver,) if http_lot else ("", "", "", None, None, driver)
+    with timed("parse", mode="browser"):
+        name, bid, desc = parse_lot_details(driver, site)
+        next_url = find_next_lot_url(driver, site)
+    closes_at = None
+    if http_lot:
+        closes_at = http_lot[4]
+        if has_bid(bid) and not http_lot[1]:
+            set_site_mode(url, "selenium")
+    return name, bid, desc, next_url, closes_at, driver
+
+def scrape_auction_items(start_url, max_items=1000, on_lot=None):
+    writer = get_writer()
+    site = adapter_for(start_url)
+    driver = None
     current_url = start_url
     lot_count = 0
+    retries = 0
 
     while current_url and lot_count < max_items:
         print(f"\nLoading: {current_url}")
-        driver.get(current_url)
-        time.sleep(3)
+        try:
+            name, bid, desc, next_url, closes_at, driver = fetch_lot(current_url, driver)
+        except RetryLater as e:
+            retries += 1
+            if retries > MAX_LOT_RETRIES:
+                raise
+            delay = e.retry_after or RETRY_LATER_DELAY
+            print(f"[Fetch] {e}; retrying {current_url} in {delay:.0f}s")
+            time.sleep(delay)
+            continue
+        retries = 0
+        print(f"Found lot: {name} - Current Bid: {bid or 'N/A'}")
 
-        name, bid, desc = parse_lot_details(driver)
-        print(f"Found lot: {name} - Current Bid: {bid}")
-
-        save_item(conn, name, bid, desc, current_url)
+        writer.save_item(name or "Unnamed Lot", bid or "N/A", desc, current_url, bid_value=site.parse_bid(bid),
+                         closes_at=closes_at)
+        if on_lot:
+            on_lot(current_url, name or "Unnamed Lot", bid or "N/A", desc)
 
         lot_count += 1
-        current_url = find_next_lot_url(driver)
+        current_url = next_url
 
-    driver.quit()
-    conn.close()
+    if driver:
+        driver.quit()
+    writer.flush()
     print("✅ Scraping completed.")
+
+
+class HostThrottle:
+    # One page load per host every min_interval seconds; without a fixed interval the host's adapter decides.
+    def __init__(self, min_interval=None):
+        self.min_interval = min_interval
+        self.next_slot = {}
+        self.lock = threading.Lock()
+
+    def interval(self, url):
+        return self.min_interval if self.min_interval is not None else adapter_for(url).min_interval
+
+    def ready_in(self, url):
+        # Seconds until url's host may be loaded again, without taking the slot.
+        with self.lock:
+            return max(0.0, self.next_slot.get(urlparse(url).netloc, 0.0) - time.monotonic())
+
+    def reserve(self, url):
+        # Takes the host's next slot and returns how many seconds away it is.
+        host = urlparse(url).netloc
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, now))
+            self.next_slot[host] = slot + self.interval(url)
+        return slot - now
+
+    def wait(self, url):
+        delay = self.reserve(url)
+        if delay > 0:
+            time.sleep(delay)
+
+    def defer(self, url, delay):
+        # Keeps url's host free of page loads for at least delay seconds, e.g. after a RetryLater.
+        host = urlparse(url).netloc
+        with self.lock:
+            self.next_slot[host] = max(self.next_slot.get(host, 0.0), time.monotonic() + delay)
+
+
+class LotFrontier:
+    def __init__(self, max_items, run_id=None):
+        self.max_items = max_items
+        self.run_id = run_id
+        self.urls = deque()
+        self.seen = set()
+        self.retries = {}
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        with self.lock:
+            return len(self.urls)
+
+    def add(self, url):
+        if not url:
+            return False
+        with self.lock:
+            if url in self.seen or len(self.seen) >= self.max_items:
+                return False
+            self.seen.add(url)
+        if self.run_id is not None:
+            get_writer().queue_url(self.run_id, url)
+        with self.lock:
+            self.urls.append(url)
+        return True
+
+    def restore(self, crawled_urls):
+        # URLs a resumed run already scraped: they count towards max_items but are not crawled again.
+        with self.lock:
+            self.seen.update(crawled_urls)
+
+    def crawled(self, url):
+        if self.run_id is not None:
+            get_writer().mark_crawled(self.run_id, url)
+
+    def peek(self):
+        with self.lock:
+            return self.urls[0] if self.urls else None
+
+    def pop(self):
+        with self.lock:
+            return self.urls.popleft() if self.urls else None
+
+    def retry(self, url):
+        # Puts a lot that hit RetryLater back at the end of the queue; False once it was retried MAX_LOT_RETRIES
+        # times. It is not marked crawled either way, so it stays queued in run_frontier.
+        with self.lock:
+            attempts = self.retries.get(url, 0) + 1
+            if attempts > MAX_LOT_RETRIES:
+                return False
+            self.retries[url] = attempts
+            self.urls.append(url)
+        return True
+
+    def clear(self):
+        # Drops the queued URLs; they stay queued in run_frontier, so a resumed run still crawls them.
+        with self.lock:
+            self.urls.clear()
+
+
+def collect_lot_urls(driver, catalogue_url, max_items=1000, throttle=None):
+    # Walk the catalogue/listing pages once and gather every lot link up front.
+    By, WebDriverWait, EC = browser_tools()
+    site = adapter_for(catalogue_url)
+    lot_urls = []
+    seen = set()
+    page_url = catalogue_url
+    while page_url and len(lot_urls) < max_items:
+        if throttle:
+            throttle.wait(page_url)
+        print(f"\n[Catalogue] Loading: {page_url}")
+        driver.get(page_url)
+        try:
+            WebDriverWait(driver, PAGE_WAIT_TIMEOUT).until(
+                EC.presence_of_element_located((By.TAG_NAME, "a"))
+            )
+        except:
+            pass
+        for link in driver.find_elements(By.TAG_NAME, "a"):
+            href = link.get_attribute("href")
+            if not href or not site.lot_link_pattern.search(urlparse(href).path):
+                continue
+            href = urljoin(site.base_url or page_url, href).split("#")[0]
+            if href not in seen:
+                seen.add(href)
+                lot_urls.append(href)
+        page_url = find_next_lot_url(driver, site)
+    print(f"[Catalogue] Found {len(lot_urls)} lot URLs.")
+    return lot_urls[:max_items]
+
+def enumerate_lot_urls(start_url, count):
+    return adapter_for(start_url).enumerate_lot_urls(start_url, count)
+
+
+class Sale:
+    # One sale on a CrawlScheduler: its frontier, how many workers it may use at once and where its lots go.
+    def __init__(self, start_url, frontier, follow_next=False, workers=CRAWL_WORKERS, on_lot=None):
+        self.start_url = start_url
+        self.site = adapter_for(start_url)
+        self.frontier = frontier
+        self.follow_next = follow_next
+        self.workers = max(1, workers)
+        self.on_lot = on_lot
+        self.in_flight = 0
+        self.cancelled = False
+        self.started = time.monotonic()
+
+    @property
+    def run_id(self):
+        return self.frontier.run_id
+
+    def idle(self):
+        # Nothing queued and nothing loading, so no worker can add another lot. Call with the scheduler's lock held.
+        return self.in_flight == 0 and not len(self.frontier)
+
+
+def open_sale(start_url, max_items=1000, workers=CRAWL_WORKERS, catalogue_url=None, enumerate_lots=False,
+              on_lot=None, run_id=None, throttle=None):
+    # Seeds a Sale's frontier: from a run's checkpoint, a catalogue, enumerated lot numbers, or rel=next.
+    frontier = LotFrontier(max_items, run_id)
+    follow_next = False
+
+    queued, crawled = [], []
+    if run_id is not None:
+        conn = connect()
+        queued, crawled = load_frontier(conn, run_id)
+        conn.close()
+
+    if queued or crawled:
+        print(f"[Run {run_id}] Resuming: {len(crawled)} lots already crawled, {len(queued)} still queued.")
+        frontier.restore(crawled)
+        lot_urls = queued
+        follow_next = not (catalogue_url or enumerate_lots)
+    elif catalogue_url:
+        driver = setup_driver()
+        try:
+            lot_urls = collect_lot_urls(driver, catalogue_url, max_items, throttle)
+        finally:
+            driver.quit()
+    elif enumerate_lots:
+        lot_urls = enumerate_lot_urls(start_url, max_items)
+    else:
+        # No listing to seed from: fall back to rel=next, fanned out as links are found.
+        lot_urls = [start_url]
+        follow_next = True
+
+    for url in lot_urls:
+        frontier.add(url)
+    return Sale(start_url, frontier, follow_next, workers, on_lot)
+
+
+class CrawlScheduler:
+    # Crawls any number of sales, from any number of houses, on one shared pool of workers. Workers take lots
+    # from the sales in turn, skipping a sale whose host is still inside its rate-limit interval or that already
+    # has its own worker count busy, so one slow or strict house never leaves workers idle while other sales
+    # have lots waiting. on_sale_done(sale) is called once a sale has nothing left to crawl or was cancelled.
+    def __init__(self, workers=CRAWL_WORKERS, throttle=None, on_sale_done=None):
+        self.workers = max(1, workers)
+        self.throttle = throttle or HostThrottle()
+        get_session(self.workers)
+        self.on_sale_done = on_sale_done
+        self.sales = []
+        self.turn = 0
+        self.cancelled_runs = set()
+        self.condition = threading.Condition()
+        self.stopping = False
+        self.threads = []
+
+    def add(self, sale):
+        with self.condition:
+            if sale.run_id is not None and sale.run_id in self.cancelled_runs:
+                sale.cancelled = True
+                sale.frontier.clear()
+            done = sale.idle()
+            if not done:
+                self.sales.append(sale)
+                self.condition.notify_all()
+        if done:
+            self.finish(sale)
+
+    def cancel(self, run_id):
+        # Drops the run's queued lots; lots already loading finish first. Also applies to a sale added later.
+        with self.condition:
+            self.cancelled_runs.add(run_id)
+            done = []
+            for sale in self.sales:
+                if sale.run_id == run_id and not sale.cancelled:
+                    sale.cancelled = True
+                    sale.frontier.clear()
+                    if sale.idle():
+                        done.append(sale)
+            for sale in done:
+                self.sales.remove(sale)
+        for sale in done:
+            self.finish(sale)
+
+    def next_task(self, until_idle):
+        # Returns (sale, url) with the url's host slot already taken, or None when the scheduler stops.
+        with self.condition:
+            while not self.stopping:
+                if until_idle and not self.sales:
+                    return None
+                wait = IDLE_WAIT
+                for offset in range(len(self.sales)):
+                    index = (self.turn + offset) % len(self.sales)
+                    sale = self.sales[index]
+                    url = sale.frontier.peek()
+                    if url is None or sale.in_flight >= sale.workers:
+                        continue
+                    delay = self.throttle.ready_in(url)
+                    if delay > 0:
+                        wait = min(wait, delay)
+                        continue
+                    sale.frontier.pop()
+                    sale.in_flight += 1
+                    self.throttle.reserve(url)
+                    self.turn = index + 1
+                    return sale, url
+                self.condition.wait(wait)
+        return None
+
+    def task_done(self, sale):
+        with self.condition:
+            sale.in_flight -= 1
+            done = sale.idle() and sale in self.sales
+            if done:
+                self.sales.remove(sale)
+            self.condition.notify_all()
+        if done:
+            self.finish(sale)
+
+    def finish(self, sale):
+        minutes = (time.monotonic() - sale.started) / 60
+        lots = len(sale.frontier.seen)
+        print(f"✅ Crawl {'cancelled' if sale.cancelled else 'completed'}: {sale.start_url}: {lots} lots "
+              f"({lots / minutes if minutes else 0:.1f} lots/min).")
+        if self.on_sale_done:
+            self.on_sale_done(sale)
+
+    def work(self, worker_id, until_idle):
+        writer = get_writer()
+        driver = None  # only started if a site needs the browser fallback
+        try:
+            while True:
+                task = self.next_task(until_idle)
+                if task is None:
+                    break
+                sale, url = task
+                try:
+                    print(f"\n[Worker {worker_id}] Loading: {url}")
+                    name, bid, desc, next_url, closes_at, driver = fetch_lot(url, driver)
+                    if not name:
+                        print(f"[Worker {worker_id}] No lot found at {url}")
+                        sale.frontier.crawled(url)
+                        continue
+                    print(f"[Worker {worker_id}] Found lot: {name} - Current Bid: {bid or 'N/A'}")
+                    writer.save_item(name, bid or "N/A", desc, url, sale.run_id, sale.site.parse_bid(bid), closes_at)
+                    if sale.on_lot:
+                        sale.on_lot(url, name, bid or "N/A", desc)
+                    if sale.follow_next and not sale.cancelled:
+                        sale.frontier.add(next_url)
+                    # Queued after the next link, so a crash in between never loses the crawl cursor.
+                    sale.frontier.crawled(url)
+                except RetryLater as e:
+                    # The host is rate limiting or failing: leave it alone for a while and put the lot back,
+                    # unless the sale was cancelled meanwhile.
+                    self.throttle.defer(url, e.retry_after or RETRY_LATER_DELAY)
+                    with self.condition:
+                        requeued = not sale.cancelled and sale.frontier.retry(url)
+                    if requeued:
+                        print(f"[Worker {worker_id}] {e}; {url} requeued")
+                    else:
+                        print(f"[Worker {worker_id}] Giving up on {url} for now: {e}")
+                        event("error", stage="crawl")
+                except Exception as e:
+                    print(f"[Worker {worker_id}] Error on {url}: {e}")
+                    event("error", stage="crawl")
+                finally:
+                    self.task_done(sale)
+        finally:
+            if driver:
+                driver.quit()
+
+    def spawn(self, until_idle):
+        self.threads = [
+            threading.Thread(target=self.work, args=(i + 1, until_idle), name=f"Crawl-{i + 1}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for t in self.threads:
+            t.start()
+
+    def run(self):
+        # Crawls the sales added so far and returns once every one of them is done.
+        self.spawn(until_idle=True)
+        for t in self.threads:
+            t.join()
+
+    def start(self):
+        # Keeps the workers running in the background, for sales that are added later on.
+        self.spawn(until_idle=False)
+
+    def stop(self):
+        with self.condition:
+            self.stopping = True
+            self.condition.notify_all()
+        for t in self.threads:
+            t.join()
+
+
+def crawl_auction_items(start_url, max_items=1000, workers=CRAWL_WORKERS, catalogue_url=None, enumerate_lots=False,
+                        on_lot=None, run_id=None):
+    # on_lot(url, name, current_bid, description) is called for every saved lot, e.g. to feed JunkPipeline.
+    # With a run_id the frontier is checkpointed in run_frontier, and a run that already has one resumes from it.
+    scheduler = CrawlScheduler(workers)
+    scheduler.add(open_sale(start_url, max_items, workers, catalogue_url, enumerate_lots, on_lot, run_id,
+                            scheduler.throttle))
+    scheduler.run()
+    get_writer().flush()
+
+if __name__ == "__main__":
+    import argparse
+    from JunkMetrics import registry, run_summary
+    from JunkStore import COMPLETED, CRASHED, create_run
+
+    # Crawl only: lots are saved as pending and researched later by JunkResearcher or the research workers.
+    # Several sales, from one house or many, are crawled at the same time by one pool of workers.
+    parser = argparse.ArgumentParser(description="Scrape auction sales without researching their lots.")
+    parser.add_argument("start_urls", nargs="+", metavar="start_url", help="URL of the first lot of each sale")
+    parser.add_argument("--workers", type=int, default=CRAWL_WORKERS, help="crawl workers shared by all sales")
+    parser.add_argument("--catalogue", dest="catalogue_url", help="catalogue/listing page to collect lot URLs from")
+    parser.add_argument("--enumerate", dest="enumerate_lots", action="store_true",
+                        help="generate lot URLs by counting up from the lot number in START_URL")
+    parser.add_argument("--max-items", type=int, default=1000)
+    args = parser.parse_args()
+    if args.catalogue_url and len(args.start_urls) > 1:
+        parser.error("--catalogue belongs to a single sale")
+    options = {
+        "workers": args.workers, "catalogue_url": args.catalogue_url, "enumerate_lots": args.enumerate_lots,
+        "max_items": args.max_items,
+    }
+    runs = {create_run(start_url, options): start_url for start_url in args.start_urls}
+    writer = get_writer()
+    before = registry.snapshot()
+    completed = set()
+
+    def finish_sale(sale):
+        # Metrics are per process, so overlapping sales share them.
+        writer.save_run_metrics(sale.run_id, run_summary(before))
+        writer.finish_run(sale.run_id, COMPLETED)
+        completed.add(sale.run_id)
+
+    try:
+        scheduler = CrawlScheduler(args.workers, on_sale_done=finish_sale)
+        for run_id, start_url in runs.items():
+            scheduler.add(open_sale(start_url, args.max_items, args.workers, args.catalogue_url, args.enumerate_lots,
+                                    run_id=run_id, throttle=scheduler.throttle))
+        scheduler.run()
+    finally:
+        for run_id in set(runs) - completed:
+            writer.save_run_metrics(run_id, run_summary(before))
+            writer.finish_run(run_id, CRASHED)
+        writer.flush()
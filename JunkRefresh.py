@@ -0,0 +1,122 @@
+# JunkRefresh.py
+# Re-polls current bids for lots already in the DB instead of re-scraping the whole sale.
+# Lots that look like bargains and lots closing soonest are refreshed first; only the cheap
+# price comparison is re-run, never the LLM valuation.
+import argparse
+import queue
+import threading
+import time
+from JunkCompare import BUYER_PREMIUM, is_bargain
+from JunkReader import CRAWL_WORKERS, HostThrottle, fetch_bid
+from JunkSites import adapter_for
+from JunkStore import BARGAIN, DROPPED, RUNNING, connect, get_writer
+
+REFRESH_WORKERS = CRAWL_WORKERS
+MAX_RUN_AGE_DAYS = 14   # lots of sales started longer ago than this are not refreshed, unless still running
+DROPPED_NOTE = "Dropped: Bid rose above the bargain line.<br>"
+
+# Open, valued lots of running or recent sales: bargains first, then by closing time (unknown last), then by
+# how close the bid is to the line. Lots without a market value can never cross the line, so they are skipped.
+SELECT_LIVE_LOTS = f'''
+    SELECT id, url, current_bid, market_value, status, analysis
+    FROM lot_items
+    WHERE (closes_at IS NULL OR closes_at > ?) AND status IN ('{BARGAIN}', '{DROPPED}') AND market_value IS NOT NULL
+        AND run_id IN (SELECT id FROM runs WHERE status = '{RUNNING}' OR started_at > ?)
+    ORDER BY
+        status = '{BARGAIN}' DESC,
+        closes_at IS NULL,
+        closes_at,
+        CASE WHEN market_value > 0 THEN COALESCE(bid_value, 0) * {1 + BUYER_PREMIUM} / market_value ELSE 1e9 END
+'''
+
+
+def select_live_lots(conn, limit=None):
+    sql = SELECT_LIVE_LOTS + (" LIMIT ?" if limit else "")
+    now = time.time()
+    params = (now, now - MAX_RUN_AGE_DAYS * 86400) + ((limit,) if limit else ())
+    return conn.execute(sql, params).fetchall()
+
+def reassess(bid_value, market_value, status, analysis=None):
+    # Returns (new status, new analysis) if the refreshed bid moves the lot across the bargain line.
+    # The valuation's reasoning and sources are kept: a drop only prepends DROPPED_NOTE, which a later
+    # return to bargain removes again.
+    if market_value is None or status not in (BARGAIN, DROPPED):
+        return None, None
+    bargain = is_bargain(bid_value, market_value)
+    if bargain and status != BARGAIN:
+        if analysis and analysis.startswith(DROPPED_NOTE):
+            return BARGAIN, analysis[len(DROPPED_NOTE):]
+        return BARGAIN, f"<b>Estimated Value:</b> €{market_value}<br><b>Note:</b> bargain after bid refresh."
+    if not bargain and status == BARGAIN:
+        return DROPPED, DROPPED_NOTE + (analysis or "")
+    return None, None
+
+def refresh_worker(lots, lock, throttle, results):
+    writer = get_writer()
+    driver = None
+    try:
+        while True:
+            try:
+                item_id, url, old_bid, market_value, status, old_analysis = lots.get_nowait()
+            except queue.Empty:
+                break
+            throttle.wait(url)
+            try:
+                bid, closes_at, driver = fetch_bid(url, driver)
+            except Exception as e:
+                print(f"[Refresh] Error on {url}: {e}")
+                continue
+            if not bid:
+                continue
+            bid_value = adapter_for(url).parse_bid(bid)
+            new_status, analysis = reassess(bid_value, market_value, status, old_analysis)
+            writer.update_bid(item_id, bid, closes_at, time.time(), new_status, analysis, bid_value)
+            if new_status:
+                print(f"[Refresh] {url}: {old_bid} -> {bid} ({status} -> {new_status})")
+            with lock:
+                results["refreshed"] += 1
+                results["changed"] += bid != old_bid
+                results["status_changed"] += bool(new_status)
+    finally:
+        if driver:
+            driver.quit()
+
+def refresh_bids(limit=None, workers=REFRESH_WORKERS):
+    conn = connect()
+    lots = queue.Queue()
+    for lot in select_live_lots(conn, limit):
+        lots.put(lot)
+    conn.close()
+    started = time.monotonic()
+    results = {"refreshed": 0, "changed": 0, "status_changed": 0}
+    lock = threading.Lock()
+    throttle = HostThrottle()
+    threads = [
+        threading.Thread(target=refresh_worker, args=(lots, lock, throttle, results), daemon=True)
+        for _ in range(max(1, workers))
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    get_writer().flush()
+    print(f"✅ Refreshed {results['refreshed']} lots in {time.monotonic() - started:.1f}s: "
+          f"{results['changed']} bids changed, {results['status_changed']} crossed the bargain line.")
+    return results
+
+def watch(interval, limit=None, workers=REFRESH_WORKERS):
+    while True:
+        refresh_bids(limit, workers)
+        time.sleep(interval)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh current bids for lots already in the database.")
+    parser.add_argument("--limit", type=int, help="only refresh the N highest-priority lots")
+    parser.add_argument("--workers", type=int, default=REFRESH_WORKERS)
+    parser.add_argument("--watch", type=float, metavar="SECONDS", help="keep refreshing every SECONDS")
+    args = parser.parse_args()
+    if args.watch:
+        watch(args.watch, args.limit, args.workers)
+    else:
+        refresh_bids(args.limit, args.workers)
@@ -1,17 +1,31 @@
-import os
-import sqlite3
-import requests
+import argparse
+import json
 import re
 import time
 from concurrent.futures import ThreadPoolExecutor
-from googlesearch import search
-from openai import OpenAI, OpenAIError
 from urllib.parse import urlparse
+from JunkCache import get_cache, make_key
+from JunkClients import google_search, openai_client, openai_error
+from JunkCluster import get_clusterer, share
+from JunkCompare import is_bargain
+from JunkCondense import CHARS_PER_TOKEN, VALUATION_TOKEN_BUDGET, condense_page, pack_pages
+from JunkComparables import local_valuation, record_comparable
+from JunkFetch import get_fetcher
+from JunkFilter import get_prefilter, is_art_item
+from JunkLimits import RetryLater, backoff_delay, call_with_retry, estimate_tokens
+from JunkMetrics import event, record_llm_call, timed
+from JunkModel import get_valuation_model
+from JunkPrice import best_price, extract_value_from_reply, format_eur
+from JunkStore import BARGAIN, DROPPED, FAILED, PENDING, connect, get_writer, next_retry_at
 
-DB_NAME = "auction_items.db"
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=OPENAI_API_KEY)
-BASE_URL = "https://www.peterfrancis.co.uk"
+OPENAI_MODEL = "gpt-4o"
+# Bump these when a prompt changes so cached answers from the old prompt are not reused.
+QUERY_PROMPT_VERSION = "query-v1"
+VALUATION_PROMPT_VERSION = "valuation-v1"
+LLM_BATCH_SIZE = 20       # lots packed into one batched prompt
+SEARCH_WORKERS = 5
+BATCH_POLL_INTERVAL = 60  # seconds between status checks of an offline batch job
+VALUATION_CHAR_LIMIT = VALUATION_TOKEN_BUDGET * CHARS_PER_TOKEN
 
 exclude_patterns = [
     r"easy.?live.?auction"
@@ -29,83 +43,125 @@ def is_valid_url(url):
     except:
         return False
 
-def is_art_item(name, description):
-    return bool(re.search(r"\b(artist|painting|oil|canvas|watercolour|print|drawing|lithograph|signed)\b", f"{name} {description}", re.IGNORECASE))
-
 def generate_search_query(item, is_art=False):
+    return get_cache().cached(
+        OPENAI_MODEL, QUERY_PROMPT_VERSION, (item['name'], item['description']),
+        lambda: request_search_query(item, is_art),
+    )
+
+def chat(prompt, temperature, purpose, **kwargs):
+    # purpose names the stage for metrics: query_generation, valuation or batch.
+    try:
+        with timed(purpose):
+            response = call_with_retry(
+                "openai", openai_client().chat.completions.create, tokens=estimate_tokens(prompt),
+                model=OPENAI_MODEL,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=temperature,
+                **kwargs
+            )
+    except (openai_error(), RetryLater):
+        event("error", stage=purpose)
+        raise
+    record_llm_call(OPENAI_MODEL, purpose, response.usage)
+    return response
+
+def request_search_query(item, is_art=False):
     prompt = (
         "Given these item details, generate a broad Google search query to find comparable market values. "
         "For artwork, include artist, medium, and subject.\n\n"
         f"Title: {item['name']}\nDescription: {item['description']}\n\nReturn only the search query."
     )
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.5
-        )
+        response = chat(prompt, 0.5, "query_generation")
         query = response.choices[0].message.content.strip()
         print(f"[OpenAI] Generated Query: {query}")
         return query
-    except OpenAIError as e:
+    except openai_error() as e:
         print(f"[OpenAI Error] {e}")
         return None
 
 def extract_price_from_page(content):
-    pattern = re.compile(r'(?:€|EUR|\$|£)\s?\d{1,3}(?:[,.]\d{3})*(?:[.,]\d{2})?')
-    match = pattern.search(content)
-    if match:
-        return match.group().replace('EUR', '€').replace(',', '').strip()
-    return None
+    return format_eur(best_price(content))
 
 def analyze_market_value(scraped_text):
     prompt = (
         "Based on the following listings, estimate the item's market value in Euros and briefly explain why. "
         "If uncertain, reply 'None' and briefly explain why.\n\n"
-        f"{scraped_text[:3000]}"
+        f"{scraped_text[:VALUATION_CHAR_LIMIT]}"
     )
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.2
-        )
+        response = chat(prompt, 0.2, "valuation")
         reasoning = response.choices[0].message.content.strip()
         print(f"[OpenAI Reasoning] {reasoning}")
-        match = re.search(r"(\d+[.,]?\d*)", reasoning.replace(',', ''))
-        value = float(match.group(1)) if match else None
-        return value, reasoning
-    except OpenAIError as e:
+        return extract_value_from_reply(reasoning), reasoning
+    except openai_error() as e:
         print(f"[OpenAI Error] {e}")
         return None, "OpenAI analysis error."
 
-def get_comparable_price_and_urls(query, is_art=False):
-    combined_text = ""
-    urls_collected = []
-
+def search_comparable_urls(query, is_art=False):
+    # Rate limited and retried; a search that keeps failing raises RetryLater and the lot is requeued.
     try:
-        results = list(search(query, num_results=10))
-        for url in results:
-            if len(urls_collected) >= 3:
-                break
-            if not url or not is_valid_url(url) or is_excluded(url):
-                continue
-            if is_art and not any(site in url for site in art_sites):
-                continue
-            print(f"[Google] Checking URL: {url}")
-            response = requests.get(url, timeout=10)
-            if response.ok:
-                price = extract_price_from_page(response.text)
-                if price:
-                    urls_collected.append((url, price))
-                combined_text += response.text[:2000]
+        with timed("search"):
+            # search() is a generator: the requests only happen while it is consumed, so that is what is retried.
+            results = call_with_retry("google", lambda: list(google_search(query, num_results=10)))
+    except RetryLater:
+        event("error", stage="search")
+        raise
     except Exception as e:
         print(f"[Google Search Error] {e}")
-        time.sleep(10)
+        event("error", stage="search")
+        return []
+    return [
+        url for url in results
+        if url and is_valid_url(url) and not is_excluded(url)
+        and (not is_art or any(site in url for site in art_sites))
+    ]
+
+def fetch_comparable_pages(urls):
+    condensed_pages = []
+    urls_collected = []
+
+    # All candidates download concurrently; results are used in search-rank order as before.
+    for page in get_fetcher().fetch_many(urls):
+        if page is None:
+            continue
+        print(f"[Google] Checked URL: {page.url}")
+        if 200 <= page.status < 300:
+            price = extract_price_from_page(page.text)
+            if price:
+                record_comparable(page.url, page.text, price)
+                if len(urls_collected) < 3:
+                    urls_collected.append((page.url, price))
+            condensed_pages.append(condense_page(page.url, page.text))
 
+    # The model sees titles, prices and their context rather than raw HTML.
+    return pack_pages(condensed_pages), urls_collected
+
+def collect_comparables(query, is_art=False):
+    return fetch_comparable_pages(search_comparable_urls(query, is_art))
+
+def get_comparable_price_and_urls(query, is_art=False):
+    combined_text, urls_collected = collect_comparables(query, is_art)
     estimated_price, reasoning = analyze_market_value(combined_text)
     return estimated_price, urls_collected, reasoning
 
+def research_market_value(name, description, query, is_art=False):
+    # Keyed on the lot text, so re-scrapes and relisted lots skip the search and the gpt-4o call.
+    return get_cache().cached(
+        OPENAI_MODEL, VALUATION_PROMPT_VERSION, (name, description),
+        lambda: get_comparable_price_and_urls(query, is_art),
+        store_if=lambda result: result[0] is not None,
+    )
+
+def research_lot(name, description):
+    # Returns (value, urls, reasoning), or None when no search query could be generated.
+    is_art = is_art_item(name, description)
+    query = generate_search_query({'name': name, 'description': description}, is_art)
+    if not query:
+        return None
+    return research_market_value(name, description, query, is_art)
+
 def domain_from_url(url):
     return urlparse(url).netloc.replace("www.", "")
 
@@ -118,51 +174,381 @@ def format_analysis(price, urls, reasoning):
         return analysis
     return f"No comparable price found. Reasoning: {reasoning}"
 
+def assess_bargain(bid_value, comp_price, urls, reasoning):
+    if is_bargain(bid_value, comp_price):
+        return format_analysis(comp_price, urls, reasoning), BARGAIN
+    print("[Dropped] Not a significant bargain.")
+    return "Dropped: Not a significant bargain.", DROPPED
+
 def analyze_single_item(item):
-    item_id, name, description, current_bid = item
+    item_id, name, description, bid_value = item
     print(f"\n[Analysis] Item {item_id}: {name}")
+    comp_price = None
 
-    if re.search(r'\bafter\b', name, re.IGNORECASE):
-        analysis = "Dropped: Reproduction"
-        print("[Analysis Skipped] Dropped as reproduction.")
-    else:
-        is_art = is_art_item(name, description)
-        query = generate_search_query({'name': name, 'description': description}, is_art)
-        if not query:
-            analysis = "Failed to generate search query."
+    decision = get_prefilter().check(name, description, bid_value)
+    try:
+        if not decision.keep:
+            analysis, status = f"Dropped: {decision.reason}", DROPPED
+            print(f"[Analysis Skipped] Dropped by prefilter ({decision.rule}).")
+        elif (local := local_valuation(name)):
+            comp_price, urls, reasoning = local
+            analysis, status = assess_bargain(bid_value, comp_price, urls, reasoning)
+        elif (estimate := get_valuation_model().valuation(name, description, bid_value, item_id=item_id)):
+            comp_price, urls, reasoning = estimate
+            analysis, status = assess_bargain(bid_value, comp_price, urls, reasoning)
         else:
-            comp_price, urls, reasoning = get_comparable_price_and_urls(query, is_art)
-            bid_value = float(re.sub(r"[^\d.]", "", current_bid or "0"))
-            premium_bid = bid_value * 1.30
-
-            if comp_price and premium_bid < (0.3 * comp_price):
-                analysis = format_analysis(comp_price, urls, reasoning)
+            # Near-duplicates of a lot that was already researched are valued from its cluster.
+            result = get_clusterer().value(name, description, lambda: research_lot(name, description), item_id=item_id)
+            if result is None:
+                analysis, status = "Failed to generate search query.", FAILED
             else:
-                analysis = "Dropped: Not a significant bargain."
-                print("[Dropped] Not a significant bargain.")
+                comp_price, urls, reasoning = result
+                analysis, status = assess_bargain(bid_value, comp_price, urls, reasoning)
+    except RetryLater as e:
+        schedule_retry([item_id], e)
+        return
 
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute("UPDATE lot_items SET analysis = ? WHERE id = ?", (analysis, item_id))
-    conn.commit()
-    conn.close()
+    get_writer().update_analysis(item_id, analysis, status, comp_price)
     print(f"[Analysis Completed] Item {item_id}: {analysis}")
 
+def schedule_retry(item_ids, error, attempt=0):
+    delay = error.retry_after if error.retry_after is not None else backoff_delay(attempt + 3)
+    writer = get_writer()
+    for item_id in item_ids:
+        writer.schedule_retry(time.time() + delay, str(error), item_id=item_id)
+    print(f"[Retry] {len(item_ids)} lot(s) back on the queue in {delay:.0f}s ({error})")
+
 def analyze_items():
+    writer = get_writer()
+    conn = connect()
     while True:
-        conn = sqlite3.connect(DB_NAME)
         cursor = conn.cursor()
-        cursor.execute("SELECT id, name, description, current_bid FROM lot_items WHERE analysis IS NULL OR analysis = '' LIMIT 5")
+        cursor.execute(
+            "SELECT id, name, description, bid_value FROM lot_items "
+            "WHERE status = ? AND (retry_at IS NULL OR retry_at <= ?) LIMIT 5",
+            (PENDING, time.time()),
+        )
         items = cursor.fetchall()
-        conn.close()
 
         if not items:
-            print("Waiting for new items...")
+            stats = get_cache().stats()
+            print(f"Waiting for new items... (LLM cache: {stats['hits']} hits, {stats['misses']} misses; "
+                  f"prefilter: {get_prefilter().stats()})")
             time.sleep(10)
             continue
 
         with ThreadPoolExecutor(max_workers=5) as executor:
             executor.map(analyze_single_item, items)
+        # Results go through the writer thread; make sure they are committed before re-polling.
+        writer.flush()
+
+def chunked(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+def build_query_batch_prompt(items):
+    lots = [{"id": str(item['id']), "title": item['name'], "description": item['description']} for item in items]
+    return (
+        "For each auction lot below, generate a broad Google search query to find comparable market values. "
+        "For artwork, include artist, medium, and subject.\n"
+        'Reply with a JSON object {"results": [{"id": ..., "query": ...}]} containing one entry per lot.\n\n'
+        f"Lots (JSON):\n{json.dumps(lots)}"
+    )
+
+def build_valuation_batch_prompt(listings):
+    entries = [{"id": str(item_id), "listings": text[:VALUATION_CHAR_LIMIT]} for item_id, text in listings.items()]
+    return (
+        "For each item below, estimate its market value in Euros from the comparable listings and briefly explain why. "
+        "If uncertain, use null for the value and briefly explain why.\n"
+        'Reply with a JSON object {"results": [{"id": ..., "value": <number or null>, "reasoning": ...}]} '
+        "containing one entry per item.\n\n"
+        f"Listings (JSON):\n{json.dumps(entries)}"
+    )
+
+def parse_batch_results(content):
+    try:
+        return {str(result["id"]): result for result in json.loads(content).get("results", [])}
+    except (ValueError, AttributeError, KeyError, TypeError):
+        print(f"[OpenAI Error] Could not parse batched reply: {content[:200]}")
+        return {}
+
+def request_batch(prompt, temperature):
+    try:
+        response = chat(prompt, temperature, "batch", response_format={"type": "json_object"})
+    except openai_error() as e:
+        print(f"[OpenAI Error] {e}")
+        return {}
+    return parse_batch_results(response.choices[0].message.content)
+
+def request_batches(prompts, temperature):
+    # Live mode: one chat call per batched prompt, a few in flight at once. Returns one result dict per prompt.
+    with ThreadPoolExecutor(max_workers=SEARCH_WORKERS) as executor:
+        return list(executor.map(lambda prompt: request_batch(prompt, temperature), prompts))
+
+def query_cache_key(item):
+    return make_key(OPENAI_MODEL, QUERY_PROMPT_VERSION, item['name'], item['description'])
+
+def valuation_cache_key(item):
+    return make_key(OPENAI_MODEL, VALUATION_PROMPT_VERSION, item['name'], item['description'])
+
+def generate_search_queries(items, request=request_batches):
+    # One chat call per LLM_BATCH_SIZE lots instead of one per lot; returns {item id: query}.
+    cache = get_cache()
+    queries = {}
+    missing = []
+    for item in items:
+        query = cache.get(query_cache_key(item))
+        if query:
+            queries[item['id']] = query
+        else:
+            missing.append(item)
+
+    chunks = chunked(missing, LLM_BATCH_SIZE)
+    replies = request([build_query_batch_prompt(chunk) for chunk in chunks], 0.5) if chunks else []
+    for chunk, results in zip(chunks, replies):
+        for item in chunk:
+            query = (results.get(str(item['id'])) or {}).get("query")
+            if query:
+                queries[item['id']] = query.strip()
+                cache.set(query_cache_key(item), query.strip())
+    print(f"[OpenAI] Generated {len(queries)} queries for {len(items)} lots.")
+    return queries
+
+def analyze_market_values(listings, request=request_batches):
+    # listings: {item id: scraped text}; returns {item id: (value, reasoning)}.
+    valuations = {}
+    chunks = chunked(list(listings.items()), LLM_BATCH_SIZE)
+    replies = request([build_valuation_batch_prompt(dict(chunk)) for chunk in chunks], 0.2) if chunks else []
+    for chunk, results in zip(chunks, replies):
+        for item_id, _ in chunk:
+            result = results.get(str(item_id)) or {}
+            try:
+                value = float(result.get("value")) if result.get("value") is not None else None
+            except (TypeError, ValueError):
+                value = None
+            valuations[item_id] = (value, result.get("reasoning") or "OpenAI analysis error.")
+    return valuations
+
+def research_batch(items, request=request_batches):
+    # items: dicts with id, name, description, bid_value. Returns {item id: (analysis, status, market value)}.
+    outcomes = {}
+    to_research = []
+    clusterer = get_clusterer()
+    assignments = {}   # researched lots: their cluster, which gets their valuation
+    members = []       # near-duplicates of a lot being researched; valued once it is done
+    for item in items:
+        decision = get_prefilter().check(item['name'], item['description'], item['bid_value'])
+        if not decision.keep:
+            outcomes[item['id']] = (f"Dropped: {decision.reason}", DROPPED, None)
+        elif (local := local_valuation(item['name'])):
+            comp_price, urls, reasoning = local
+            outcomes[item['id']] = assess_bargain(item['bid_value'], comp_price, urls, reasoning) + (comp_price,)
+        elif (estimate := get_valuation_model().valuation(item['name'], item['description'], item['bid_value'],
+                                                           item_id=item['id'])):
+            comp_price, urls, reasoning = estimate
+            outcomes[item['id']] = assess_bargain(item['bid_value'], comp_price, urls, reasoning) + (comp_price,)
+        elif (assignment := clusterer.assign(item['name'], item['description'], item_id=item['id'])) is None:
+            to_research.append(item)
+        elif assignment.valuation:
+            comp_price, urls, reasoning = share(assignment.valuation, assignment.quantity)
+            outcomes[item['id']] = assess_bargain(item['bid_value'], comp_price, urls, reasoning) + (comp_price,)
+        elif assignment.researcher:
+            assignments[item['id']] = assignment
+            to_research.append(item)
+        else:
+            members.append((item, assignment))
+
+    try:
+        research_representatives(to_research, outcomes, assignments, request)
+    finally:
+        for assignment in assignments.values():
+            clusterer.release(assignment.cluster_id)
+
+    for item, assignment in members:
+        # A member whose representative found no value stays pending and is researched by the next batch.
+        valuation = clusterer.wait(assignment.cluster_id)
+        if valuation:
+            comp_price, urls, reasoning = share(valuation, assignment.quantity)
+            outcomes[item['id']] = assess_bargain(item['bid_value'], comp_price, urls, reasoning) + (comp_price,)
+    return outcomes
+
+def research_representatives(to_research, outcomes, assignments, request=request_batches):
+    # Query generation, search and valuation for the lots research_batch could not value otherwise.
+    queries = generate_search_queries(to_research, request)
+    cache = get_cache()
+    valued = {}
+    searches = {}
+    for item in to_research:
+        if item['id'] not in queries:
+            outcomes[item['id']] = ("Failed to generate search query.", FAILED, None)
+            continue
+        cached_result = cache.get(valuation_cache_key(item))
+        if cached_result:
+            valued[item['id']] = cached_result
+        else:
+            searches[item['id']] = item
+
+    with ThreadPoolExecutor(max_workers=SEARCH_WORKERS) as executor:
+        comparables = dict(zip(searches, executor.map(
+            lambda item: collect_comparables(queries[item['id']], is_art_item(item['name'], item['description'])),
+            searches.values(),
+        )))
+
+    valuations = analyze_market_values({item_id: text for item_id, (text, _) in comparables.items()}, request)
+    for item_id, (value, reasoning) in valuations.items():
+        result = (value, comparables[item_id][1], reasoning)
+        if value is not None:
+            cache.set(valuation_cache_key(searches[item_id]), result)
+        valued[item_id] = result
+
+    clusterer = get_clusterer()
+    for item in to_research:
+        if item['id'] in valued:
+            comp_price, urls, reasoning = valued[item['id']]
+            analysis, status = assess_bargain(item['bid_value'], comp_price, urls, reasoning)
+            outcomes[item['id']] = (analysis, status, comp_price)
+            if item['id'] in assignments:
+                assignment = assignments[item['id']]
+                clusterer.record(assignment.cluster_id, comp_price, assignment.quantity, urls, reasoning)
+
+def fetch_pending_items(conn, limit=None, run_id=None):
+    # Pending lots that are due, only those of run_id when one is given.
+    sql = "SELECT id, name, description, bid_value, url FROM lot_items WHERE status = ? AND (retry_at IS NULL OR retry_at <= ?)"
+    params = (PENDING, time.time())
+    if run_id is not None:
+        sql += " AND run_id = ?"
+        params += (run_id,)
+    if limit:
+        sql += " LIMIT ?"
+        params += (limit,)
+    return [
+        {'id': item_id, 'name': name, 'description': description, 'bid_value': bid_value, 'url': url}
+        for item_id, name, description, bid_value, url in conn.execute(sql, params).fetchall()
+    ]
+
+def save_outcomes(outcomes):
+    writer = get_writer()
+    for item_id, (analysis, status, market_value) in outcomes.items():
+        writer.update_analysis(item_id, analysis, status, market_value)
+        print(f"[Analysis Completed] Item {item_id}: {analysis}")
+    writer.flush()
+
+def analyze_items_batched(crawl_done=None, run_id=None):
+    # Polls forever, or with a crawl_done event, returns once it is set and no lot (of run_id, if given) is left
+    # pending, including lots waiting on the retry queue; those run out of attempts after MAX_LOT_ATTEMPTS.
+    conn = connect()
+    while True:
+        items = fetch_pending_items(conn, LLM_BATCH_SIZE, run_id)
+        if not items:
+            if crawl_done is not None and crawl_done.is_set():
+                retry_at = next_retry_at(conn, run_id)
+                if retry_at is None:
+                    conn.close()
+                    return
+                delay = max(0.0, retry_at - time.time())
+                print(f"Waiting {delay:.0f}s for lots on the retry queue...")
+                time.sleep(delay)
+                continue
+            print("Waiting for new items...")
+            if crawl_done is not None:
+                crawl_done.wait(10)
+            else:
+                time.sleep(10)
+            continue
+        try:
+            outcomes = research_batch(items)
+        except RetryLater as e:
+            schedule_retry([item['id'] for item in items], e)
+            get_writer().flush()
+            continue
+        save_outcomes(outcomes)
+
+def submit_batch_job(prompts, temperature):
+    # prompts: {custom id: prompt}. Uses the OpenAI Batch API, which trades latency for throughput and price.
+    lines = [
+        json.dumps({
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {
+                "model": OPENAI_MODEL,
+                "messages": [{"role": "user", "content": prompt}],
+                "temperature": temperature,
+                "response_format": {"type": "json_object"},
+            },
+        })
+        for custom_id, prompt in prompts.items()
+    ]
+    batch_file = call_with_retry(
+        "openai", openai_client().files.create, file=("batch.jsonl", "\n".join(lines).encode("utf-8")), purpose="batch"
+    )
+    job = call_with_retry(
+        "openai", openai_client().batches.create,
+        input_file_id=batch_file.id, endpoint="/v1/chat/completions", completion_window="24h",
+    )
+    print(f"[OpenAI Batch] Submitted job {job.id} with {len(prompts)} requests.")
+    return job.id
+
+def wait_for_batch_job(job_id, poll_interval=BATCH_POLL_INTERVAL):
+    # Returns {custom id: reply content} once the job has finished.
+    while True:
+        job = call_with_retry("openai", openai_client().batches.retrieve, job_id)
+        if job.status == "completed":
+            break
+        if job.status in ("failed", "expired", "cancelled"):
+            print(f"[OpenAI Batch] Job {job_id} {job.status}.")
+            return {}
+        print(f"[OpenAI Batch] Job {job_id} is {job.status}, checking again in {poll_interval}s.")
+        time.sleep(poll_interval)
+
+    replies = {}
+    for line in call_with_retry("openai", openai_client().files.content, job.output_file_id).text.splitlines():
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        try:
+            replies[record["custom_id"]] = record["response"]["body"]["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError):
+            print(f"[OpenAI Batch] No reply for {record.get('custom_id')}")
+    return replies
+
+def batch_job_requests(poll_interval=BATCH_POLL_INTERVAL):
+    # Offline mode: all batched prompts of a stage go into a single batch job.
+    def request(prompts, temperature):
+        try:
+            job_id = submit_batch_job({str(i): prompt for i, prompt in enumerate(prompts)}, temperature)
+            replies = wait_for_batch_job(job_id, poll_interval)
+        except openai_error() as e:
+            print(f"[OpenAI Batch Error] {e}")
+            replies = {}
+        return [parse_batch_results(replies[str(i)]) if str(i) in replies else {} for i in range(len(prompts))]
+    return request
+
+def analyze_items_offline(poll_interval=BATCH_POLL_INTERVAL):
+    # For large overnight sales: every pending lot goes through two batch jobs (queries, then valuations).
+    conn = connect()
+    items = fetch_pending_items(conn)
+    conn.close()
+    if not items:
+        print("No pending items.")
+        return
+    print(f"[OpenAI Batch] Researching {len(items)} pending lots offline.")
+    try:
+        outcomes = research_batch(items, batch_job_requests(poll_interval))
+    except RetryLater as e:
+        schedule_retry([item['id'] for item in items], e)
+        get_writer().flush()
+        return
+    save_outcomes(outcomes)
 
 if __name__ == '__main__':
-    analyze_items()
+    parser = argparse.ArgumentParser(description="Research pending lots.")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--batch", action="store_true", help=f"pack up to {LLM_BATCH_SIZE} lots into each LLM call")
+    mode.add_argument("--offline", action="store_true", help="research all pending lots through OpenAI batch jobs")
+    args = parser.parse_args()
+    if args.offline:
+        analyze_items_offline()
+    elif args.batch:
+        analyze_items_batched()
+    else:
+        analyze_items()
@@ -0,0 +1,107 @@
+# JunkSites.py
+# One adapter per auction platform: where a lot's name, bid and description sit on the page, how the next lot
+# and catalogue links are found, how bids are written and whether pages need JavaScript. The crawler, bid
+# refresher and sniper look the adapter up by host, so another house is supported by registering an adapter
+# here instead of editing their code.
+import re
+from urllib.parse import urlparse
+from JunkStore import parse_bid
+
+# The subset of CSS both the HTTP parser and Selenium understand: tag, #id, .classes and one [attribute=value].
+SELECTOR_PATTERN = re.compile(
+    r"^(?P<tag>[a-z][a-z0-9]*)?(?:#(?P<id>[\w-]+))?(?P<classes>(?:\.[\w-]+)*)"
+    r"(?:\[(?P<attribute>[\w-]+)=['\"]?(?P<value>[^'\"\]]+)['\"]?\])?$"
+)
+
+ADAPTERS = []
+
+
+class Selector:
+    def __init__(self, css):
+        match = SELECTOR_PATTERN.match(css)
+        if not match or not any(match.groups()):
+            raise ValueError(f"Unsupported selector: {css}")
+        self.css = css
+        self.tag = match["tag"]
+        self.id = match["id"]
+        self.classes = set(match["classes"].split(".")) - {""}
+        self.attribute = (match["attribute"], match["value"]) if match["attribute"] else None
+
+    def matches(self, tag, attrs):
+        # attrs as a dict, the way HTMLParser.handle_starttag's attributes are turned into one.
+        if self.tag and tag != self.tag:
+            return False
+        if self.id and attrs.get("id") != self.id:
+            return False
+        if self.classes and not self.classes <= set((attrs.get("class") or "").split()):
+            return False
+        return not self.attribute or attrs.get(self.attribute[0]) == self.attribute[1]
+
+
+class SiteAdapter:
+    # The defaults are the timed-auction markup the crawler was first written for; adapters override what differs.
+    name = "default"
+    hosts = ()
+    base_url = ""
+    name_selector = "h1.lot-desc-h1"
+    bid_selector = "#timedBid"
+    description_selector = "p.translate"
+    next_selector = "a[rel=next]"
+    lot_link_pattern = re.compile(r"/lot[s]?[/-]", re.IGNORECASE)
+    # Attributes carrying the lot's closing time (epoch seconds/ms or ISO 8601).
+    closing_time_attributes = ("data-end-time", "data-end", "data-closing-time", "data-countdown")
+    # True: always use the browser. False: never. None: try HTTP and fall back when a field is missing.
+    needs_javascript = None
+    min_interval = 1.0   # seconds between page loads to one host, across every sale and worker
+
+    def __init__(self):
+        self.selectors = {
+            field: Selector(css) for field, css in (
+                ("name", self.name_selector), ("bid", self.bid_selector),
+                ("description", self.description_selector), ("next", self.next_selector),
+            )
+        }
+
+    def matches(self, url):
+        host = urlparse(url).netloc.lower().split(":")[0].removeprefix("www.")
+        return any(host == known or host.endswith("." + known) for known in self.hosts)
+
+    def parse_bid(self, text):
+        # Bid text as shown on the page -> float, or None.
+        return parse_bid(text)
+
+    def enumerate_lot_urls(self, start_url, count):
+        # Lot pages usually differ only by the last number in the URL (lot-1, lot-2, ...).
+        matches = list(re.finditer(r"\d+", start_url))
+        if not matches:
+            return [start_url]
+        last = matches[-1]
+        first_lot = int(last.group())
+        return [
+            f"{start_url[:last.start()]}{lot_number}{start_url[last.end():]}"
+            for lot_number in range(first_lot, first_lot + count)
+        ]
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.name}>"
+
+
+def register(adapter_class):
+    ADAPTERS.append(adapter_class())
+    return adapter_class
+
+DEFAULT_ADAPTER = SiteAdapter()
+
+def adapter_for(url):
+    # The registered adapter for url's host, or the default markup for hosts nobody registered.
+    for adapter in ADAPTERS:
+        if adapter.matches(url or ""):
+            return adapter
+    return DEFAULT_ADAPTER
+
+
+@register
+class PeterFrancis(SiteAdapter):
+    name = "peterfrancis"
+    hosts = ("peterfrancis.co.uk",)
+    base_url = "https://www.peterfrancis.co.uk"
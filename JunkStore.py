@@ -0,0 +1,525 @@
+import json
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from JunkMetrics import inc, timed
+
+DB_NAME = "auction_items.db"
+BATCH_SIZE = 50        # rows per transaction on the writer thread
+FLUSH_INTERVAL = 0.5   # seconds a partial batch may wait before it is committed
+MAX_LOT_ATTEMPTS = 5   # research attempts per lot before it is marked failed
+
+# Lot pipeline status, stored in lot_items.status.
+PENDING = "pending"
+BARGAIN = "bargain"
+DROPPED = "dropped"
+FAILED = "failed"
+
+# Run status, stored in runs.status.
+RUNNING = "running"
+COMPLETED = "completed"
+CRASHED = "crashed"
+
+# Epoch seconds computed inside the writer's transaction, so rows committed later always sort later.
+NOW = "((julianday('now') - 2440587.5) * 86400.0)"
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS lot_items (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT,
+        current_bid TEXT,
+        bid_value REAL,
+        description TEXT,
+        url TEXT,
+        analysis TEXT,
+        market_value REAL,
+        status TEXT NOT NULL DEFAULT 'pending',
+        closes_at REAL,
+        bid_updated_at REAL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        retry_at REAL,
+        run_id INTEGER,
+        stage TEXT,
+        scraped_at REAL,
+        analysed_at REAL,
+        leased_until REAL,
+        leased_by INTEGER,
+        cluster_id INTEGER,
+        valued_by TEXT
+    )
+'''
+
+COLUMNS = {
+    "current_bid": "TEXT",
+    "bid_value": "REAL",
+    "description": "TEXT",
+    "analysis": "TEXT",
+    "market_value": "REAL",
+    "status": "TEXT NOT NULL DEFAULT 'pending'",
+    "closes_at": "REAL",
+    "bid_updated_at": "REAL",
+    "attempts": "INTEGER NOT NULL DEFAULT 0",
+    "retry_at": "REAL",
+    "run_id": "INTEGER",
+    "stage": "TEXT",
+    "scraped_at": "REAL",
+    "analysed_at": "REAL",
+    "leased_until": "REAL",
+    "leased_by": "INTEGER",
+    "cluster_id": "INTEGER",
+    "valued_by": "TEXT",
+}
+
+RUN_COLUMNS = {
+    "metrics": "TEXT",
+    "archived_at": "REAL",
+}
+
+# One row per crawl; run_frontier is its crawl cursor (every lot URL queued, and whether it was scraped).
+RUNS_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS runs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        start_url TEXT,
+        options TEXT,
+        status TEXT NOT NULL DEFAULT 'running',
+        started_at REAL,
+        finished_at REAL,
+        metrics TEXT,
+        archived_at REAL
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS run_frontier (
+        run_id INTEGER NOT NULL,
+        url TEXT NOT NULL,
+        state TEXT NOT NULL DEFAULT 'queued',
+        PRIMARY KEY (run_id, url)
+    )
+    ''',
+    # Work queue for JunkJobs: one scrape job per sale, claimed by one worker process at a time.
+    '''
+    CREATE TABLE IF NOT EXISTS jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind TEXT NOT NULL,
+        run_id INTEGER,
+        payload TEXT,
+        status TEXT NOT NULL DEFAULT 'queued',
+        worker_pid INTEGER,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        error TEXT,
+        created_at REAL,
+        started_at REAL,
+        finished_at REAL
+    )
+    ''',
+]
+
+COMPARABLES_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS comparables (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        url TEXT UNIQUE,
+        title TEXT,
+        snippet TEXT,
+        price REAL,
+        domain TEXT,
+        fetched_at REAL
+    )
+    ''',
+    "CREATE VIRTUAL TABLE IF NOT EXISTS comparables_fts USING fts5(title, snippet, content='comparables', content_rowid='id')",
+    '''
+    CREATE TRIGGER IF NOT EXISTS comparables_ai AFTER INSERT ON comparables BEGIN
+        INSERT INTO comparables_fts (rowid, title, snippet) VALUES (new.id, new.title, new.snippet);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS comparables_ad AFTER DELETE ON comparables BEGIN
+        INSERT INTO comparables_fts (comparables_fts, rowid, title, snippet) VALUES ('delete', old.id, old.title, old.snippet);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS comparables_au AFTER UPDATE ON comparables BEGIN
+        INSERT INTO comparables_fts (comparables_fts, rowid, title, snippet) VALUES ('delete', old.id, old.title, old.snippet);
+        INSERT INTO comparables_fts (rowid, title, snippet) VALUES (new.id, new.title, new.snippet);
+    END
+    ''',
+]
+
+# Near-duplicate lot clusters (JunkCluster): each cluster keeps its representative's MinHash signature and,
+# once valued, the market value per item; cluster_buckets is the LSH index over the signature's bands.
+CLUSTERS_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS lot_clusters (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        representative TEXT,
+        signature TEXT,
+        members INTEGER NOT NULL DEFAULT 1,
+        unit_value REAL,
+        urls TEXT,
+        reasoning TEXT,
+        created_at REAL,
+        valued_at REAL
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS cluster_buckets (
+        band INTEGER NOT NULL,
+        bucket TEXT NOT NULL,
+        cluster_id INTEGER NOT NULL,
+        PRIMARY KEY (band, bucket, cluster_id)
+    )
+    ''',
+]
+
+UPSERT_COMPARABLE = '''
+    INSERT INTO comparables (url, title, snippet, price, domain, fetched_at)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT(url) DO UPDATE SET
+        title = excluded.title,
+        snippet = excluded.snippet,
+        price = excluded.price,
+        domain = excluded.domain,
+        fetched_at = excluded.fetched_at
+'''
+
+INDEXES = [
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_lot_items_url ON lot_items (url)",
+    "CREATE INDEX IF NOT EXISTS idx_lot_items_status ON lot_items (status)",
+    "CREATE INDEX IF NOT EXISTS idx_lot_items_run ON lot_items (run_id)",
+    "CREATE INDEX IF NOT EXISTS idx_lot_items_status_id ON lot_items (status, id)",
+    "CREATE INDEX IF NOT EXISTS idx_lot_items_scraped_at ON lot_items (scraped_at)",
+    "CREATE INDEX IF NOT EXISTS idx_lot_items_analysed_at ON lot_items (analysed_at)",
+    "CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, kind, id)",
+    "CREATE INDEX IF NOT EXISTS idx_lot_items_cluster ON lot_items (cluster_id)",
+    "CREATE INDEX IF NOT EXISTS idx_cluster_buckets_cluster ON cluster_buckets (cluster_id)",
+]
+
+UPSERT_LOT = f'''
+    INSERT INTO lot_items (name, current_bid, bid_value, description, url, run_id, closes_at, stage, scraped_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, 'scraped', {NOW})
+    ON CONFLICT(url) DO UPDATE SET
+        name = excluded.name,
+        current_bid = excluded.current_bid,
+        bid_value = excluded.bid_value,
+        closes_at = COALESCE(excluded.closes_at, closes_at),
+        description = excluded.description,
+        run_id = COALESCE(excluded.run_id, run_id),
+        stage = COALESCE(stage, excluded.stage),
+        scraped_at = excluded.scraped_at
+'''
+
+UPSERT_ANALYSED_LOT = f'''
+    INSERT INTO lot_items (name, current_bid, bid_value, description, url, analysis, market_value, status, stage,
+                           scraped_at, analysed_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'analysed', {NOW}, {NOW})
+    ON CONFLICT(url) DO UPDATE SET
+        name = excluded.name,
+        current_bid = excluded.current_bid,
+        bid_value = excluded.bid_value,
+        description = excluded.description,
+        analysis = excluded.analysis,
+        market_value = excluded.market_value,
+        status = excluded.status,
+        stage = excluded.stage,
+        scraped_at = excluded.scraped_at,
+        analysed_at = excluded.analysed_at
+'''
+
+UPDATE_ANALYSIS = f'''
+    UPDATE lot_items SET analysis = ?, market_value = ?, status = ?, stage = 'analysed', analysed_at = {NOW}
+    WHERE id = ?
+'''
+UPDATE_BID = f'''
+    UPDATE lot_items SET
+        current_bid = ?,
+        bid_value = ?,
+        closes_at = COALESCE(?, closes_at),
+        bid_updated_at = ?,
+        status = COALESCE(?, status),
+        analysis = COALESCE(?, analysis),
+        analysed_at = CASE WHEN ? IS NOT NULL THEN {NOW} ELSE analysed_at END
+    WHERE id = ?
+'''
+# Back on the queue as pending with a retry time, or failed once it has used up its attempts.
+SCHEDULE_RETRY = f'''
+    UPDATE lot_items SET
+        attempts = attempts + 1,
+        retry_at = ?,
+        status = CASE WHEN attempts + 1 >= {MAX_LOT_ATTEMPTS} THEN 'failed' ELSE 'pending' END,
+        analysis = CASE WHEN attempts + 1 >= {MAX_LOT_ATTEMPTS} THEN ? ELSE NULL END,
+        analysed_at = CASE WHEN attempts + 1 >= {MAX_LOT_ATTEMPTS} THEN {NOW} ELSE analysed_at END,
+        leased_until = NULL
+    WHERE {{key}} = ?
+'''
+UPDATE_ANALYSIS_BY_URL = f'''
+    UPDATE lot_items SET analysis = ?, market_value = ?, status = ?, stage = 'analysed', analysed_at = {NOW}
+    WHERE url = ?
+'''
+UPDATE_STAGE = "UPDATE lot_items SET stage = ? WHERE url = ?"
+UPDATE_CLUSTER = "UPDATE lot_items SET cluster_id = ? WHERE {key} = ?"
+UPDATE_VALUED_BY = "UPDATE lot_items SET valued_by = ? WHERE {key} = ?"
+QUEUE_URL = "INSERT OR IGNORE INTO run_frontier (run_id, url) VALUES (?, ?)"
+MARK_CRAWLED = "UPDATE run_frontier SET state = 'done' WHERE run_id = ? AND url = ?"
+FINISH_RUN = "UPDATE runs SET status = ?, finished_at = ? WHERE id = ?"
+SAVE_RUN_METRICS = "UPDATE runs SET metrics = ? WHERE id = ?"
+
+
+def parse_bid(text):
+    if not text:
+        return None
+    value = re.sub(r"[^\d.]", "", text.replace(",", ""))
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+def status_from_analysis(analysis):
+    if not analysis:
+        return PENDING
+    if analysis.startswith("Dropped:"):
+        return DROPPED
+    if analysis.startswith("Failed"):
+        return FAILED
+    return BARGAIN
+
+def connect(db_name=DB_NAME):
+    conn = sqlite3.connect(db_name, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=30000")
+    return conn
+
+def backfill_bids(c):
+    for item_id, current_bid in c.execute(
+        "SELECT id, current_bid FROM lot_items WHERE bid_value IS NULL AND current_bid IS NOT NULL"
+    ).fetchall():
+        c.execute("UPDATE lot_items SET bid_value = ? WHERE id = ?", (parse_bid(current_bid), item_id))
+
+def dedupe_urls(c):
+    # Must run before the unique index on url is created.
+    c.execute("DELETE FROM lot_items WHERE id NOT IN (SELECT MAX(id) FROM lot_items GROUP BY url)")
+
+def rename_crashed_runs(c):
+    # Crashed runs used to share the "failed" lot status.
+    c.execute("UPDATE runs SET status = ? WHERE status = 'failed'", (CRASHED,))
+
+# One-off data migrations in the order they were added; PRAGMA user_version holds how many have run.
+# Append new steps at the end, never reorder them.
+MIGRATIONS = [backfill_bids, dedupe_urls, rename_crashed_runs]
+
+def migrate(conn):
+    # Bring databases written by older versions (free-text only, duplicate urls) up to the current schema.
+    # Missing columns are checked every time (cheap); the data migrations run once each.
+    c = conn.cursor()
+    c.execute("PRAGMA table_info(lot_items)")
+    columns = [info[1] for info in c.fetchall()]
+    for column, definition in COLUMNS.items():
+        if column not in columns:
+            c.execute(f"ALTER TABLE lot_items ADD COLUMN {column} {definition}")
+    run_columns = [info[1] for info in c.execute("PRAGMA table_info(runs)").fetchall()]
+    for column, definition in RUN_COLUMNS.items():
+        if column not in run_columns:
+            c.execute(f"ALTER TABLE runs ADD COLUMN {column} {definition}")
+    if "status" not in columns:
+        for item_id, analysis in c.execute("SELECT id, analysis FROM lot_items").fetchall():
+            c.execute("UPDATE lot_items SET status = ? WHERE id = ?", (status_from_analysis(analysis), item_id))
+    version = c.execute("PRAGMA user_version").fetchone()[0]
+    for step in MIGRATIONS[version:]:
+        step(c)
+    if version < len(MIGRATIONS):
+        c.execute(f"PRAGMA user_version = {len(MIGRATIONS)}")
+
+def init_db(db_name=DB_NAME):
+    conn = connect(db_name)
+    with conn:
+        conn.execute(SCHEMA)
+        for statement in COMPARABLES_SCHEMA + RUNS_SCHEMA + CLUSTERS_SCHEMA:
+            conn.execute(statement)
+        migrate(conn)
+        for index in INDEXES:
+            conn.execute(index)
+    return conn
+
+def reset_database(db_name=DB_NAME):
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_name + suffix):
+            os.remove(db_name + suffix)
+    print("[Database] Old database removed.")
+    init_db(db_name).close()
+    print("[Database] New database created.")
+
+def next_retry_at(conn, run_id=None):
+    # Earliest retry time among lots (of run_id, if given) waiting on the retry queue, or None.
+    sql = "SELECT MIN(retry_at) FROM lot_items WHERE status = ? AND retry_at IS NOT NULL"
+    params = (PENDING,)
+    if run_id is not None:
+        sql += " AND run_id = ?"
+        params += (run_id,)
+    return conn.execute(sql, params).fetchone()[0]
+
+
+def create_run(start_url, options, db_name=DB_NAME):
+    conn = init_db(db_name)
+    with conn:
+        run_id = conn.execute(
+            "INSERT INTO runs (start_url, options, status, started_at) VALUES (?, ?, ?, ?)",
+            (start_url, json.dumps(options), RUNNING, time.time()),
+        ).lastrowid
+    conn.close()
+    return run_id
+
+def get_run(conn, run_id):
+    row = conn.execute("SELECT id, start_url, options, status FROM runs WHERE id = ?", (run_id,)).fetchone()
+    if row is None:
+        return None
+    return {"id": row[0], "start_url": row[1], "options": json.loads(row[2] or "{}"), "status": row[3]}
+
+def load_frontier(conn, run_id):
+    # Returns (URLs still to crawl, URLs already crawled) for a run.
+    rows = conn.execute("SELECT url, state FROM run_frontier WHERE run_id = ? ORDER BY rowid", (run_id,)).fetchall()
+    return [url for url, state in rows if state != "done"], [url for url, state in rows if state == "done"]
+
+
+_FLUSH = object()
+_STOP = object()
+
+
+class StoreWriter:
+    # Single writer thread: every insert/update is queued here and committed in batches,
+    # so scraper and researcher threads never contend for the SQLite write lock.
+    def __init__(self, db_name=DB_NAME, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.db_name = db_name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.ops = queue.Queue()
+        init_db(db_name).close()
+        self.thread = threading.Thread(target=self.run, name="StoreWriter", daemon=True)
+        self.thread.start()
+
+    def execute(self, sql, params=()):
+        self.ops.put((sql, params))
+
+    def save_item(self, name, current_bid, description, url, run_id=None, bid_value=None, closes_at=None):
+        # bid_value: the bid as parsed by the site's adapter; parse_bid is used when it is not given.
+        bid_value = parse_bid(current_bid) if bid_value is None else bid_value
+        self.execute(UPSERT_LOT, (name, current_bid, bid_value, description, url, run_id, closes_at))
+
+    def save_analysed_item(self, name, current_bid, description, url, analysis, status, market_value=None):
+        self.execute(UPSERT_ANALYSED_LOT, (
+            name, current_bid, parse_bid(current_bid), description, url, analysis, market_value, status,
+        ))
+
+    def save_comparable(self, url, title, snippet, price, domain, fetched_at):
+        self.execute(UPSERT_COMPARABLE, (url, title, snippet, price, domain, fetched_at))
+
+    def update_analysis(self, item_id, analysis, status, market_value=None):
+        self.execute(UPDATE_ANALYSIS, (analysis, market_value, status, item_id))
+
+    def update_bid(self, item_id, current_bid, closes_at, updated_at, status=None, analysis=None, bid_value=None):
+        bid_value = parse_bid(current_bid) if bid_value is None else bid_value
+        self.execute(UPDATE_BID, (
+            current_bid, bid_value, closes_at, updated_at, status, analysis, status, item_id,
+        ))
+
+    def set_cluster(self, cluster_id, item_id=None, url=None):
+        key, value = ("id", item_id) if item_id is not None else ("url", url)
+        self.execute(UPDATE_CLUSTER.format(key=key), (cluster_id, value))
+
+    def set_valued_by(self, source, item_id=None, url=None):
+        key, value = ("id", item_id) if item_id is not None else ("url", url)
+        self.execute(UPDATE_VALUED_BY.format(key=key), (source, value))
+
+    def schedule_retry(self, retry_at, reason, item_id=None, url=None):
+        key, value = ("id", item_id) if item_id is not None else ("url", url)
+        self.execute(SCHEDULE_RETRY.format(key=key), (retry_at, f"Failed: {reason}", value))
+
+    def update_analysis_by_url(self, url, analysis, status, market_value=None):
+        self.execute(UPDATE_ANALYSIS_BY_URL, (analysis, market_value, status, url))
+
+    def set_stage(self, url, stage):
+        self.execute(UPDATE_STAGE, (stage, url))
+
+    def queue_url(self, run_id, url):
+        self.execute(QUEUE_URL, (run_id, url))
+
+    def mark_crawled(self, run_id, url):
+        self.execute(MARK_CRAWLED, (run_id, url))
+
+    def finish_run(self, run_id, status):
+        self.execute(FINISH_RUN, (status, time.time(), run_id))
+
+    def save_run_metrics(self, run_id, summary):
+        self.execute(SAVE_RUN_METRICS, (json.dumps(summary), run_id))
+
+    def flush(self):
+        done = threading.Event()
+        self.ops.put((_FLUSH, done))
+        done.wait()
+
+    def close(self):
+        self.ops.put((_STOP, None))
+        self.thread.join()
+
+    def run(self):
+        conn = connect(self.db_name)
+        batch = []
+        waiters = []
+        stopping = False
+        while not stopping:
+            try:
+                op = self.ops.get(timeout=self.flush_interval)
+            except queue.Empty:
+                op = None
+            while op is not None:
+                sql, params = op
+                if sql is _FLUSH:
+                    waiters.append(params)
+                elif sql is _STOP:
+                    stopping = True
+                else:
+                    batch.append(op)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    op = self.ops.get_nowait()
+                except queue.Empty:
+                    op = None
+            self.commit(conn, batch)
+            batch = []
+            for done in waiters:
+                done.set()
+            waiters = []
+        conn.close()
+
+    def commit(self, conn, batch):
+        if not batch:
+            return
+        inc("junk_db_rows_total", len(batch))
+        try:
+            with timed("db_write"), conn:
+                for sql, params in batch:
+                    conn.execute(sql, params)
+        except sqlite3.Error as e:
+            # One bad row should not lose the rest of the batch.
+            print(f"[Database] Batch failed ({e}), retrying row by row.")
+            for sql, params in batch:
+                try:
+                    with conn:
+                        conn.execute(sql, params)
+                except sqlite3.Error as row_error:
+                    print(f"[Database] Write failed: {row_error}")
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+def get_writer(db_name=DB_NAME):
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = StoreWriter(db_name)
+        return _writer
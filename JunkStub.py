@@ -0,0 +1,190 @@
+# JunkStub.py
+# Local stand-in for the OpenAI endpoints JunkProspector uses, for trying the pipeline without an API key:
+#   python JunkStub.py --port 8765 --latency 0.5
+#   OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=stub python JunkResearcher.py --batch
+# Replies are deterministic so runs can be compared.
+import argparse
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LOTS_MARKER = "Lots (JSON):\n"
+LISTINGS_MARKER = "Listings (JSON):\n"
+
+
+def stub_value(text):
+    # A stable pseudo-valuation: the first euro price in the text, else derived from a hash of it.
+    match = re.search(r"€\s?(\d+(?:\.\d+)?)", text or "")
+    if match:
+        return float(match.group(1))
+    return float(int(hashlib.sha256((text or "").encode("utf-8")).hexdigest()[:6], 16) % 500 + 10)
+
+def stub_query(title):
+    return f"{title} price sold"
+
+def answer(prompt):
+    if LOTS_MARKER in prompt:
+        lots = json.loads(prompt.split(LOTS_MARKER, 1)[1])
+        return json.dumps({"results": [{"id": lot["id"], "query": stub_query(lot["title"])} for lot in lots]})
+    if LISTINGS_MARKER in prompt:
+        entries = json.loads(prompt.split(LISTINGS_MARKER, 1)[1])
+        return json.dumps({"results": [
+            {"id": entry["id"], "value": stub_value(entry["listings"]), "reasoning": "Stub valuation."}
+            for entry in entries
+        ]})
+    if "Return only the search query" in prompt:
+        title = re.search(r"Title: (.*)", prompt)
+        return stub_query(title.group(1) if title else "item")
+    return f"Estimated market value €{stub_value(prompt):.0f}. Stub valuation."
+
+def chat_completion(body):
+    prompt = body["messages"][-1]["content"]
+    content = answer(prompt)
+    return {
+        "id": f"chatcmpl-{hashlib.sha1(prompt.encode('utf-8')).hexdigest()[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "stub"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": len(prompt) // 4,
+            "completion_tokens": len(content) // 4,
+            "total_tokens": (len(prompt) + len(content)) // 4,
+        },
+    }
+
+
+class StubState:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.files = {}
+        self.batches = {}
+        self.lock = threading.Lock()
+        self.counter = 0
+
+    def next_id(self, prefix):
+        with self.lock:
+            self.counter += 1
+            return f"{prefix}-{self.counter}"
+
+    def add_file(self, content, purpose):
+        file_id = self.next_id("file")
+        self.files[file_id] = {
+            "id": file_id, "object": "file", "bytes": len(content), "created_at": int(time.time()),
+            "filename": f"{file_id}.jsonl", "purpose": purpose, "status": "processed", "content": content,
+        }
+        return file_id
+
+    def run_batch(self, input_file_id, endpoint):
+        # Batches complete immediately: every line is answered like a live chat call.
+        output = []
+        for line in self.files[input_file_id]["content"].decode("utf-8").splitlines():
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            output.append(json.dumps({
+                "id": self.next_id("batch_req"),
+                "custom_id": request["custom_id"],
+                "response": {"status_code": 200, "body": chat_completion(request["body"])},
+                "error": None,
+            }))
+        batch_id = self.next_id("batch")
+        self.batches[batch_id] = {
+            "id": batch_id, "object": "batch", "endpoint": endpoint, "input_file_id": input_file_id,
+            "completion_window": "24h", "status": "completed", "created_at": int(time.time()),
+            "output_file_id": self.add_file("\n".join(output).encode("utf-8"), "batch_output"),
+            "request_counts": {"total": len(output), "completed": len(output), "failed": 0},
+        }
+        return self.batches[batch_id]
+
+
+def public_file(record):
+    return {k: v for k, v in record.items() if k != "content"}
+
+def extract_upload(body, content_type):
+    # Minimal multipart/form-data parsing: return the bytes of the "file" part.
+    boundary = re.search(r"boundary=\"?([^\";]+)", content_type or "")
+    if not boundary:
+        return body
+    for part in body.split(b"--" + boundary.group(1).encode("utf-8")):
+        headers, _, payload = part.partition(b"\r\n\r\n")
+        if b'name="file"' in headers:
+            return payload.rsplit(b"\r\n", 1)[0]
+    return b""
+
+
+def make_handler(state):
+    class StubHandler(BaseHTTPRequestHandler):
+        def send_json(self, payload, status=200):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def read_body(self):
+            return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+        def do_POST(self):
+            if state.latency:
+                time.sleep(state.latency)
+            body = self.read_body()
+            if self.path.endswith("/chat/completions"):
+                self.send_json(chat_completion(json.loads(body)))
+            elif self.path.endswith("/responses"):
+                payload = json.loads(body)
+                text = answer(payload.get("input", ""))
+                self.send_json({"output": [{"role": "assistant", "content": [{"type": "output_text", "text": text}]}]})
+            elif self.path.endswith("/files"):
+                file_id = state.add_file(extract_upload(body, self.headers.get("Content-Type")), "batch")
+                self.send_json(public_file(state.files[file_id]))
+            elif self.path.endswith("/batches"):
+                payload = json.loads(body)
+                self.send_json(state.run_batch(payload["input_file_id"], payload.get("endpoint")))
+            else:
+                self.send_json({"error": {"message": f"Unknown path {self.path}"}}, 404)
+
+        def do_GET(self):
+            match = re.search(r"/batches/([^/]+)$", self.path)
+            if match and match.group(1) in state.batches:
+                return self.send_json(state.batches[match.group(1)])
+            match = re.search(r"/files/([^/]+)/content$", self.path)
+            if match and match.group(1) in state.files:
+                data = state.files[match.group(1)]["content"]
+                self.send_response(200)
+                self.send_header("Content-Type", "application/octet-stream")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+                return
+            self.send_json({"error": {"message": f"Unknown path {self.path}"}}, 404)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+
+def start_stub_server(port=0, latency=0.0):
+    # Starts the stub in a background thread; returns (server, base_url for OPENAI_BASE_URL).
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(StubState(latency)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local stub of the OpenAI API.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to wait before each reply")
+    args = parser.parse_args()
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(StubState(args.latency)))
+    print(f"[Stub] OpenAI stub listening on http://127.0.0.1:{args.port}/v1")
+    server.serve_forever()
@@ -1,48 +1,237 @@
-import os
-import sqlite3
-import subprocess
-from flask import Flask, render_template, request, redirect, url_for
+import argparse
+import json
+import time
+from flask import Flask, Response, jsonify, render_template, request, redirect, stream_with_context, url_for
+from JunkArchive import CATEGORIES, Archive, parse_date
+from JunkCompare import BUYER_PREMIUM
+from JunkJobs import RESEARCH_WORKERS, SCRAPE_WORKERS, Supervisor, cancel_job, list_jobs, submit_job
+from JunkMetrics import all_metrics, prometheus_text
+from JunkStore import BARGAIN, DROPPED, FAILED, connect, init_db
 
 app = Flask(__name__)
-DB_NAME = "auction_items.db"
-
-def reset_database():
-    if os.path.exists(DB_NAME):
-        os.remove(DB_NAME)
-        print("[Database] Old database removed.")
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE lot_items (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT,
-            current_bid TEXT,
-            description TEXT,
-            url TEXT,
-            analysis TEXT
-        )
-    ''')
-    conn.commit()
-    conn.close()
-    print("[Database] New database created.")
+supervisor = None  # started by __main__; the app only queues jobs, the supervisor's workers run them
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+STREAM_POLL_INTERVAL = 0.5   # seconds; the writer commits at least this often
+PROGRESS_INTERVAL = 5        # seconds between progress events on the stream
+PROGRESS_WINDOW = 60         # lots per minute are counted over this many seconds
+
+MARGIN_SQL = f"(market_value - COALESCE(bid_value, 0) * {1 + BUYER_PREMIUM})"
+LOT_FIELDS = f"id, name, current_bid, bid_value, market_value, {MARGIN_SQL}, analysis, url, status, run_id, analysed_at"
+SORTS = {
+    # name: (sort expression, SQL direction); rows are keyset-paginated on (expression, id).
+    "margin": (f"COALESCE({MARGIN_SQL}, -1e18)", "DESC"),
+    "newest": ("id", "DESC"),
+    "bid": ("COALESCE(bid_value, 0)", "ASC"),
+}
+
+
+def lot_to_dict(row):
+    item_id, name, current_bid, bid_value, market_value, margin, analysis, url, status, run_id, analysed_at = row
+    return {
+        "id": item_id, "name": name, "current_bid": current_bid, "bid_value": bid_value,
+        "market_value": market_value, "margin": round(margin, 2) if margin is not None else None,
+        "analysis": analysis, "url": url, "status": status, "run_id": run_id, "analysed_at": analysed_at,
+    }
+
+def parse_cursor(cursor):
+    # Cursors are "<sort value>:<id>" of the last row on the previous page.
+    try:
+        value, item_id = cursor.rsplit(":", 1)
+        return float(value), int(item_id)
+    except (AttributeError, ValueError):
+        return None
+
+def query_lots(conn, statuses, run_id=None, sort="margin", cursor=None, limit=PAGE_SIZE, min_margin=None):
+    expression, direction = SORTS[sort]
+    clauses = [f"status IN ({', '.join('?' * len(statuses))})"]
+    params = list(statuses)
+    if run_id is not None:
+        clauses.append("run_id = ?")
+        params.append(run_id)
+    if min_margin is not None:
+        clauses.append(f"{MARGIN_SQL} >= ?")
+        params.append(min_margin)
+    after = parse_cursor(cursor)
+    if after:
+        op = "<" if direction == "DESC" else ">"
+        clauses.append(f"({expression} {op} ? OR ({expression} = ? AND id < ?))")
+        params.extend([after[0], after[0], after[1]])
+    sql = (f"SELECT {LOT_FIELDS}, {expression} FROM lot_items WHERE {' AND '.join(clauses)} "
+           f"ORDER BY {expression} {direction}, id DESC LIMIT ?")
+    rows = conn.execute(sql, params + [limit + 1]).fetchall()
+    items = [lot_to_dict(row[:-1]) for row in rows[:limit]]
+    next_cursor = f"{rows[limit - 1][-1]}:{rows[limit - 1][0]}" if len(rows) > limit else None
+    return items, next_cursor
+
+def pipeline_progress(conn, run_id=None, window=PROGRESS_WINDOW):
+    since = time.time() - window
+    run_clause = " AND run_id = ?" if run_id is not None else ""
+    run_params = (run_id,) if run_id is not None else ()
+    scraped = conn.execute(f"SELECT COUNT(*) FROM lot_items WHERE scraped_at > ?{run_clause}",
+                           (since,) + run_params).fetchone()[0]
+    analysed = dict(conn.execute(
+        f"SELECT status, COUNT(*) FROM lot_items WHERE analysed_at > ?{run_clause} GROUP BY status",
+        (since,) + run_params,
+    ).fetchall())
+    totals = dict(conn.execute(
+        f"SELECT status, COUNT(*) FROM lot_items WHERE 1 = 1{run_clause} GROUP BY status", run_params
+    ).fetchall())
+    per_minute = 60 / window
+    return {
+        "scraped_per_minute": round(scraped * per_minute, 1),
+        "analysed_per_minute": round(sum(analysed.values()) * per_minute, 1),
+        "dropped_per_minute": round(analysed.get(DROPPED, 0) * per_minute, 1),
+        "bargains_per_minute": round(analysed.get(BARGAIN, 0) * per_minute, 1),
+        "totals": totals,
+    }
+
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def request_run_id():
+    return request.args.get('run', type=int)
 
 @app.route('/', methods=['GET', 'POST'])
 def index():
     if request.method == 'POST':
-        start_url = request.form.get('start_url')
-        if start_url:
-            reset_database()
-            subprocess.Popen(["python", "JunkProspector.py", start_url])
+        # One sale per line; each is a new run, and results of earlier sales stay in the database.
+        start_urls = request.form.get('start_urls', '').split()
+        for start_url in start_urls:
+            submit_job(start_url)
+        if start_urls:
             return redirect(url_for('index'))
 
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute('SELECT name, current_bid, analysis, url FROM lot_items WHERE analysis IS NOT NULL AND analysis NOT LIKE "Dropped:%"')
-    items = cursor.fetchall()
+    # Rows are loaded page by page from /api/lots; new bargains arrive over /api/stream.
+    conn = connect()
+    runs = conn.execute('SELECT id, start_url, status, started_at FROM runs ORDER BY id DESC').fetchall()
+    conn.close()
+    return render_template('index.html', runs=runs, run_id=request_run_id(), sorts=list(SORTS))
+
+@app.route('/api/lots')
+def api_lots():
+    statuses = request.args.getlist('status') or [BARGAIN, FAILED]
+    sort = request.args.get('sort', 'margin')
+    if sort not in SORTS:
+        return jsonify({"error": f"sort must be one of {', '.join(SORTS)}"}), 400
+    limit = max(1, min(request.args.get('limit', PAGE_SIZE, type=int), MAX_PAGE_SIZE))
+    conn = connect()
+    items, next_cursor = query_lots(
+        conn, statuses, request_run_id(), sort, request.args.get('after'), limit,
+        request.args.get('min_margin', type=float),
+    )
+    conn.close()
+    return jsonify({"items": items, "next": next_cursor})
+
+@app.route('/api/progress')
+def api_progress():
+    conn = connect()
+    progress = pipeline_progress(conn, request_run_id())
+    conn.close()
+    return jsonify(progress)
+
+@app.route('/api/stream')
+def api_stream():
+    # Server-Sent Events: a "bargain" event for every lot the researcher commits as a bargain,
+    # and a "progress" event every PROGRESS_INTERVAL seconds.
+    run_id = request_run_id()
+    since = request.args.get('since', type=float)
+    since_id = request.args.get('since_id', type=int)
+
+    def events():
+        conn = connect()
+        # Keyset on (analysed_at, id): rows committed in one writer batch can share a timestamp.
+        last_seen = since if since is not None else time.time()
+        last_id = since_id
+        next_progress = 0.0
+        try:
+            if last_id is None:
+                # Without an id, rows stamped exactly `since` that already exist count as sent.
+                last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM lot_items").fetchone()[0]
+            while True:
+                sql = (f"SELECT {LOT_FIELDS} FROM lot_items "
+                       "WHERE (analysed_at > ? OR (analysed_at = ? AND id > ?)) AND status = ?")
+                params = [last_seen, last_seen, last_id, BARGAIN]
+                if run_id is not None:
+                    sql += " AND run_id = ?"
+                    params.append(run_id)
+                for row in conn.execute(sql + " ORDER BY analysed_at, id", params).fetchall():
+                    lot = lot_to_dict(row)
+                    last_seen, last_id = lot["analysed_at"], lot["id"]
+                    yield sse("bargain", lot)
+                if time.monotonic() >= next_progress:
+                    yield sse("progress", pipeline_progress(conn, run_id))
+                    next_progress = time.monotonic() + PROGRESS_INTERVAL
+                time.sleep(STREAM_POLL_INTERVAL)
+        finally:
+            conn.close()
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/jobs')
+def api_jobs():
+    conn = connect()
+    jobs = list_jobs(conn)
+    conn.close()
+    return jsonify({"jobs": jobs, "supervisor": supervisor.status() if supervisor else None})
+
+@app.route('/api/jobs/<int:job_id>/cancel', methods=['POST'])
+def api_cancel_job(job_id):
+    status = cancel_job(job_id)
+    if status is None:
+        return jsonify({"error": "unknown job"}), 404
+    return jsonify({"id": job_id, "status": status})
+
+@app.route('/metrics')
+def metrics():
+    # Prometheus text format: this process plus the latest snapshot saved by every worker process.
+    conn = connect()
+    snapshot = all_metrics(conn)
+    conn.close()
+    return Response(prometheus_text(snapshot), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/runs/<int:run_id>/metrics')
+def api_run_metrics(run_id):
+    conn = connect()
+    row = conn.execute('SELECT metrics FROM runs WHERE id = ?', (run_id,)).fetchone()
     conn.close()
+    if row is None:
+        return jsonify({"error": "unknown run"}), 404
+    return jsonify({"id": run_id, "metrics": json.loads(row[0]) if row[0] else None})
 
-    return render_template('index.html', items=items)
+@app.route('/api/archive/stats')
+def api_archive_stats():
+    # Price distributions, sell-through and estimate accuracy over archived sales (see JunkArchive).
+    category = request.args.get('category')
+    if category and category not in CATEGORIES:
+        return jsonify({"error": f"category must be one of {', '.join(CATEGORIES)}"}), 400
+    try:
+        since, until = parse_date(request.args.get('since')), parse_date(request.args.get('until'))
+    except ValueError:
+        return jsonify({"error": "since and until must be YYYY-MM-DD"}), 400
+    filters = {"keyword": request.args.get('keyword'), "category": category, "house": request.args.get('house'),
+               "since": since, "until": until}
+    archive = Archive()
+    if request.args.get('group') == 'category':
+        return jsonify(archive.by_category(**filters))
+    return jsonify(archive.stats(**filters))
 
 if __name__ == '__main__':
-    reset_database()
-    app.run(debug=True)
+    parser = argparse.ArgumentParser(description="JunkProspector web interface.")
+    parser.add_argument("--scrape-workers", type=int, default=SCRAPE_WORKERS)
+    parser.add_argument("--research-workers", type=int, default=RESEARCH_WORKERS)
+    parser.add_argument("--no-supervisor", action="store_true",
+                        help="only queue jobs; run `python JunkJobs.py supervise` separately")
+    args = parser.parse_args()
+    init_db().close()
+    if not args.no_supervisor:
+        supervisor = Supervisor(args.scrape_workers, args.research_workers)
+        supervisor.start()
+    try:
+        # No reloader: it would start a second supervisor in the reloader's child process.
+        app.run(debug=True, threaded=True, use_reloader=False)
+    finally:
+        if supervisor:
+            supervisor.stop()
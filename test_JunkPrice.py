@@ -0,0 +1,28 @@
+# test_JunkPrice.py
+import pytest
+import JunkPrice
+from JunkPrice import DEFAULT_RATES, extract_value_from_reply
+
+
+@pytest.fixture(autouse=True)
+def offline_rates(monkeypatch):
+    # Keeps to_eur from fetching the ECB table.
+    monkeypatch.setattr(JunkPrice._rates, "rates", dict(DEFAULT_RATES))
+
+def test_reply_value_ignores_listing_count():
+    assert extract_value_from_reply("Based on 3 listings, the value is around 80 euros.") == 80.0
+
+def test_reply_value_ignores_year():
+    value = extract_value_from_reply("Comparable 1960s Waterford pieces sell for 40 to 60 euros")
+    assert value != 1960.0
+    assert value == 60.0
+
+@pytest.mark.parametrize("reply, value", [
+    ("Estimated value: €120", 120.0),
+    ("Worth about 45 EUR.", 45.0),
+    ("250", 250.0),
+    ("None", None),
+    ("Found 4 listings but no prices.", None),
+])
+def test_reply_value(reply, value):
+    assert extract_value_from_reply(reply) == value